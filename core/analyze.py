@@ -1,4 +1,5 @@
 import logging
+import multiprocessing
 import subprocess
 import argparse
 import json
@@ -12,11 +13,24 @@ from slither.core.declarations import Function
 from slither.core.variables.state_variable import StateVariable
 from slither.core.declarations import Contract
 
-from slither.printers.summary.constructor_calls import _get_source_code
-from slither.tools.possible_paths.possible_paths import find_target_paths
 from slither.utils.function import get_function_id
 
-from utils.detectors import get_detectors, get_slitherin_detectors, run_all_detectors
+from utils.detectors import (
+    FORK_LOCK,
+    DEFAULT_SCAN_PROFILE,
+    DETECTOR_TIMEOUT,
+    run_all_detectors,
+    select_detectors,
+)
+from utils.cache import (
+    get_cached_compilation,
+    get_compilation_key,
+    get_compile_kwargs,
+    load_slither_config,
+)
+from utils.callgraph import CallGraphIndex
+from utils.source import SourceProvider
+from utils.semgrep import DEFAULT_SEMGREP_CONFIG, SemgrepScan, simplify_findings
 
 from prompt import PromptClass
 from property import PropertyMatchClass
@@ -27,40 +41,92 @@ python analyze.py files/out/mainet:0x1337/your_target_dir/TargetContract.sol --t
 target_compile: path to the solidity file that's a target of AnalyticsClass
 taret_name: name of the contract in the solidity file to analyze (NOT the *.sol filename)
 config_dir: path to the directory containing the crytic.config.json file, no need to specify if not using cryticCompile
+--no_cache: skip the files/out/.compilations cache and always compile with solc
 
 returns *_sessionData.json file in the files/out directory
 
+--all_contracts: analyze every contract in the compilation unit, output in contracts_data
+--workers: number of worker processes for --all_contracts, defaults to cpu count
+--scan_profile: detectors to run, "full", "fast", "high-impact-only" or comma separated detector names
+
 best to use full path for all arguments 
 """
 
+SLITHER_CONSTRUCTORS = [
+    "slitherConstructorConstantVariables()",
+    "slitherConstructorVariables()",
+]
+
+# NOTE: Set in every forked worker by the pool initializer, workers inherit the already built Slither object
+_worker_analyzer = None
+
+
+def _init_contract_worker(analyzer):
+    global _worker_analyzer
+    _worker_analyzer = analyzer
+
+
+def _analyze_contract_worker(contract_index: int):
+    contract = _worker_analyzer.slither.contracts[contract_index]
+    try:
+        return _worker_analyzer.analyze_contract_section(contract)
+    except Exception as e:
+        print(f"Error analyzing contract {contract.name}: {e}")
+        return {"error": str(e)}
+
 
 class AnalyticsClass:
-    def __init__(self, target_compile: str, target_name: str, config_dir: str = None):
+    def __init__(
+        self,
+        target_compile: str,
+        target_name: str,
+        config_dir: str = None,
+        use_cache: bool = True,
+        detector_workers: int = None,
+        detector_timeout: float = DETECTOR_TIMEOUT,
+        scan_profile=DEFAULT_SCAN_PROFILE,
+    ):
         self.name = target_name
+        self.scan_profile = scan_profile
+        self.detector_workers = detector_workers
+        self.detector_timeout = detector_timeout
 
-        if config_dir:
-            config_dir = os.path.join(config_dir, "slither.config.json")
-            with open(config_dir, "r") as config_file:
-                solc_args_content = config_file.read()
-                config = json.loads(solc_args_content)
-        else:
-            config = {}
+        config = load_slither_config(config_dir)
+
+        # NOTE: Hash of sources, solc version and config, also used for stage fingerprints
+        self.source_key = get_compilation_key(target_compile, config, config_dir)
 
         try:
-            self.slither = Slither(target_compile, **config)
+            # NOTE: use_cache reuses solc output of identical sources/config from files/out/.compilations
+            if use_cache:
+                compilation = get_cached_compilation(
+                    target_compile, config, config_dir, self.source_key
+                )
+                self.slither = Slither(compilation, **config)
+            else:
+                self.slither = Slither(
+                    target_compile, **get_compile_kwargs(config, config_dir)
+                )
             print("Slither (AnalyticsClass.init) initialized successfully!")
         except Exception as e:
             print("Error initializing Slither (AnalyticsClass.init):", e)
             raise e
 
-        self.property_check = PropertyMatchClass(self.slither)
+        # NOTE: Shared with PropertyMatchClass, every source slice is built once per run
+        self.source_provider = SourceProvider()
+        self.property_check = PropertyMatchClass(self.slither, self.source_provider)
         self.root_contract = None
         self.root_contract_path = None
+        self.call_graph = None
+        self.semgrep_scan = None
+        self.semgrep_rules_version = None
         self.output_variables = []
         self.output_functions = []
         self.output_contract = {}
         self.output_sources = {}
         self.output_scan = []
+        self.output_detector_timings = []
+        self.output_contracts = {}
         self.output_full = {}
 
     def get_prompts(self, function_data: dict, prompter: PromptClass):
@@ -107,7 +173,9 @@ class AnalyticsClass:
         )
 
         return "\n\n".join(
-            _get_source_code(x).lstrip() for x in all_internal_calls if x
+            self.source_provider.get_source_code(x).lstrip()
+            for x in all_internal_calls
+            if x
         )
 
     def get_modifier_functions(self, function: Function):
@@ -115,7 +183,7 @@ class AnalyticsClass:
             self.root_contract.get_function_from_full_name(x.full_name)
             for x in function.modifiers
         ]
-        return [_get_source_code(x) for x in modifier_calls if x]
+        return [self.source_provider.get_source_code(x) for x in modifier_calls if x]
 
     def get_low_level_calls(self, function: Function) -> bool:
         nodes = function.nodes
@@ -129,6 +197,7 @@ class AnalyticsClass:
     ###################################################################################
 
     def analyze_variable(self, variable: StateVariable):
+        variable_body = self.source_provider.content(variable)
         data = {
             "is_variable": True,
             "contract_name": variable.contract.name,
@@ -136,9 +205,9 @@ class AnalyticsClass:
             "variable_selector": str(hex(get_function_id(variable.full_name))),
             "variable_full_name": variable.full_name,
             "variable_canonical_name": variable.canonical_name,
-            "variable_body": variable.source_mapping.content,
+            "variable_body": variable_body,
             "variable_type": (
-                variable.source_mapping.content.split()[0]
+                variable_body.split()[0]
                 if not variable._type.is_dynamic
                 else "mapping"
             ),
@@ -159,7 +228,10 @@ class AnalyticsClass:
 
     def analyze_function(self, function: Function, inherited=False):
         summary = function.get_summary()
-        paths = find_target_paths(self.slither, [function])
+
+        if self.call_graph is None:
+            self.call_graph = CallGraphIndex(self.slither)
+        paths = self.call_graph.find_target_paths([function])
 
         data = {
             "contract_name": summary[0],
@@ -182,13 +254,13 @@ class AnalyticsClass:
                 if isinstance(call[1], Function)
             ],  # required for preprocess_all_reachable_from
             "cyclomatic_complexity": summary[8],
-            "function_body": _get_source_code(function).lstrip(),
+            "function_body": self.source_provider.get_source_code(function).lstrip(),
             "line_numbers": [
                 function.source_mapping.lines[0],
                 function.source_mapping.lines[-1],
             ],
             "modifiers_body": (
-                [_get_source_code(x) for x in function.modifiers]
+                [self.source_provider.get_source_code(x) for x in function.modifiers]
                 if function.modifiers
                 else []
             ),
@@ -203,7 +275,9 @@ class AnalyticsClass:
             "is_empty": function.is_empty,
             "variables": [var.name for var in function.variables],
             "contains_asm": function.contains_assembly,
-            "expressions": [var.source_mapping.content for var in function.expressions],
+            "expressions": [
+                self.source_provider.content(var) for var in function.expressions
+            ],
             "is_shadowed": function.is_shadowed,
             "shadows": function.shadows,
             "function_type": function.function_type.value,
@@ -246,7 +320,7 @@ class AnalyticsClass:
             ],
             "structures": [struct.name for struct in contract.structures],
             "structures_types": [
-                variable.source_mapping.content
+                self.source_provider.content(variable)
                 for struct in contract.structures
                 for variable in struct.elems_ordered
             ],
@@ -297,10 +371,12 @@ class AnalyticsClass:
         return data
 
     def run_slither_scan(self):
-        detectors = get_detectors()
-        slitherin_detectors = get_slitherin_detectors()
-        all_detectors = list(set(detectors + slitherin_detectors))
-        _, results_detectors, _ = run_all_detectors(self.slither, all_detectors)
+        # NOTE: scan_profile is a SCAN_PROFILES name or a list of detector ARGUMENTs
+        all_detectors = select_detectors(self.scan_profile)
+        _, results_detectors, _, detector_timings = run_all_detectors(
+            self.slither, all_detectors, self.detector_workers, self.detector_timeout
+        )
+        self.output_detector_timings = detector_timings
 
         def extract_contract_signature_and_nodes(elements):
             nodes = []
@@ -356,91 +432,187 @@ class AnalyticsClass:
 
         self.output_scan.extend(simplified_results)
 
-    def run_semgrep_scan(self, path_to_scan, config="p/smart-contracts"):
-        try:
-            command = ["semgrep", "--config", config, "--json", path_to_scan]
-            result = subprocess.run(command, capture_output=True, text=True, check=True)
-
-            if result.stdout:
-                scan_results = json.loads(result.stdout)
-                findings = scan_results.get("results", [])
-
-                simplified_results = [
-                    {
-                        "description": finding["extra"]["message"],
-                        "check": finding["check_id"],
-                        "impact": finding["extra"]["severity"],
-                        "path": f"{finding['path']}#{finding['start']['line']}-{finding['end']['line']}",
-                        "confidence": "",
-                        "contract": "",
-                    }
-                    for finding in findings
-                ]
-
-                self.output_scan.extend(simplified_results)
+    def start_semgrep_scan(self, path_to_scan, config=DEFAULT_SEMGREP_CONFIG):
+        # NOTE: Runs in the background, joined with join_semgrep_scan() after detectors finish
+        self.semgrep_scan = SemgrepScan(path_to_scan, config).start()
 
+    def join_semgrep_scan(self):
+        if self.semgrep_scan is None:
+            return
+
+        try:
+            findings = self.semgrep_scan.results()
+            self.semgrep_rules_version = self.semgrep_scan.rules_version
+            self.output_scan.extend(simplify_findings(findings))
         except subprocess.CalledProcessError as e:
             print(f"Semgrep scan failed with error: {e}")
         except json.JSONDecodeError as e:
             print(f"Failed to decode JSON output from Semgrep: {e}")
+        finally:
+            self.semgrep_scan = None
+
+    def run_semgrep_scan(self, path_to_scan, config=DEFAULT_SEMGREP_CONFIG):
+        self.start_semgrep_scan(path_to_scan, config)
+        self.join_semgrep_scan()
+
+    def analyze_contract_section(self, contract: Contract):
+        """
+        Analyzes functions, variables and contract data of any contract in the compilation unit.
+        Root contract outputs are left untouched, the section is returned as a separate dict.
+        """
+        root_state = (
+            self.root_contract,
+            self.output_functions,
+            self.output_variables,
+            self.output_contract,
+        )
 
+        self.root_contract = contract
+        self.property_check.set_root_contract(contract)
+        self.output_functions = []
+        self.output_variables = []
+        self.output_contract = {}
 
-    def run_analysis(self):
-        for contract in self.slither.contracts:
+        try:
+            # NOTE: Only declared functions, inherited ones have their own section
+            for function in contract.functions_declared:
+                if function.full_name not in SLITHER_CONSTRUCTORS:
+                    self.analyze_function(function)
 
-            path_to_source = contract.source_mapping.filename.absolute
-            with open(
-                path_to_source, encoding="utf8", newline="", errors="replace"
-            ) as source_file:
-                source_code = source_file.read()
-            self.output_sources[contract.name] = {
-                "path": path_to_source,
-                "source_code": source_code,
+            for variable in contract.state_variables_declared:
+                self.analyze_variable(variable)
+
+            self.analyze_contract(contract)
+
+            section = {
+                "contract_data": self.output_contract,
+                "functions_data": self.output_functions,
+                "variables_data": self.output_variables,
             }
+        finally:
+            (
+                self.root_contract,
+                self.output_functions,
+                self.output_variables,
+                self.output_contract,
+            ) = root_state
+            self.property_check.set_root_contract(self.root_contract)
+
+        return section
+
+    def run_contracts_analysis(self, workers: int = None):
+        """
+        Analyzes every contract of the compilation unit, spreading contracts over forked workers.
+        Falls back to sequential analysis where fork is not available.
+        """
+        contracts = self.slither.contracts
+
+        if "fork" in multiprocessing.get_all_start_methods() and workers != 1:
+            # NOTE: Fork initargs are inherited, not pickled, concurrent analyses each pass their own analyzer
+            with FORK_LOCK:
+                pool = multiprocessing.get_context("fork").Pool(
+                    processes=workers,
+                    initializer=_init_contract_worker,
+                    initargs=(self,),
+                )
+            with pool:
+                sections = pool.map(_analyze_contract_worker, range(len(contracts)))
+        else:
+            sections = []
+            for contract in contracts:
+                try:
+                    sections.append(self.analyze_contract_section(contract))
+                except Exception as e:
+                    print(f"Error analyzing contract {contract.name}: {e}")
+                    sections.append({"error": str(e)})
+
+        self.output_contracts = {}
+        for contract, section in zip(contracts, sections):
+            # NOTE: Same contract name may be declared in multiple files
+            name = contract.name
+            if name in self.output_contracts:
+                name = f"{contract.name}:{contract.source_mapping.filename.short}"
+            self.output_contracts[name] = section
+
+        print("Contracts analyzed:", len(self.output_contracts))
+
+        return self.output_contracts
+
+    def run_function_analysis(self, all_contracts: bool = False, workers: int = None):
+        """
+        Analysis stage only: sources, functions, variables and contract data, no detectors or semgrep.
+        """
+        try:
+            # NOTE: Built once, every analyze_function() reads all_paths_to_function from it
+            self.call_graph = CallGraphIndex(self.slither)
+
+            for contract in self.slither.contracts:
+
+                path_to_source = contract.source_mapping.filename.absolute
+                with open(
+                    path_to_source, encoding="utf8", newline="", errors="replace"
+                ) as source_file:
+                    source_code = source_file.read()
+                self.output_sources[contract.name] = {
+                    "path": path_to_source,
+                    "source_code": source_code,
+                }
+
+                # TODO: Currently it parses only root contract deployed at the address
+                if contract.name == self.name:
+                    self.root_contract = contract
+                    self.root_contract_path = path_to_source
+                    self.property_check.set_root_contract(contract)
+
+                    # contract Test is A,B,C - sometimes A,B,C may be main entry points
+                    contracts_inherited = [
+                        parent
+                        for parent in contract.immediate_inheritance
+                        if not parent.is_interface
+                    ]
+
+                    for inherited in contracts_inherited:
+                        for function in inherited.functions:
+                            if function.contract_declarer.is_interface:
+                                continue
+                            if function.full_name not in SLITHER_CONSTRUCTORS:
+                                self.analyze_function(function, True)
+
+                    # main contract functions
+                    functions_declared = [
+                        function for function in contract.functions_declared
+                    ]
+
+                    for function in contract.functions:
+                        if function.full_name not in SLITHER_CONSTRUCTORS:
+                            if function in functions_declared:
+                                self.analyze_function(function)
 
-            # TODO: Currently it parses only root contract deployed at the address
-            if contract.name == self.name:
-                self.root_contract = contract
-                self.root_contract_path = path_to_source
-                self.property_check.set_root_contract(contract)
-
-                # contract Test is A,B,C - sometimes A,B,C may be main entry points
-                contracts_inherited = [
-                    parent
-                    for parent in contract.immediate_inheritance
-                    if not parent.is_interface
-                ]
-
-                for inherited in contracts_inherited:
-                    for function in inherited.functions:
-                        if function.contract_declarer.is_interface:
-                            continue
-                        if (
-                            function.full_name
-                            != "slitherConstructorConstantVariables()"
-                            and function.full_name != "slitherConstructorVariables()"
-                        ):
-                            self.analyze_function(function, True)
-
-                # main contract functions
-                functions_declared = [
-                    function for function in contract.functions_declared
-                ]
-
-                for function in contract.functions:
-                    if (
-                        function.full_name != "slitherConstructorConstantVariables()"
-                        and function.full_name != "slitherConstructorVariables()"
-                    ):
-                        if function in functions_declared:
-                            self.analyze_function(function)
-
-                print("Functions analyzed for contract:", contract.name)
-
-                for variable in contract.state_variables:
-                    self.analyze_variable(variable)
-
-                self.analyze_contract(contract)
+                    print("Functions analyzed for contract:", contract.name)
+
+                    for variable in contract.state_variables:
+                        self.analyze_variable(variable)
+
+                    self.analyze_contract(contract)
+
+            if all_contracts:
+                self.run_contracts_analysis(workers)
+        finally:
+            # NOTE: Slices stay cached, only the mmaps of the source files are released
+            self.source_provider.close()
+
+    def run_analysis(
+        self, all_contracts: bool = False, workers: int = None, run_semgrep: bool = True
+    ):
+        # NOTE: semgrep only needs the root file, it overlaps with function analysis and detectors
+        root_contract = self.load_target_contract(self.name)
+        if run_semgrep and root_contract is not None:
+            try:
+                self.start_semgrep_scan(root_contract.source_mapping.filename.absolute)
+            except Exception as e:
+                logging.error(f"Semgrep detection failed: {e}", exc_info=True)
+
+        self.run_function_analysis(all_contracts, workers)
 
         try:
             self.run_slither_scan()
@@ -448,7 +620,7 @@ class AnalyticsClass:
             logging.error(f"Slither detection failed: {e}", exc_info=True)
 
         try:
-            self.run_semgrep_scan(self.root_contract_path)
+            self.join_semgrep_scan()
         except Exception as e:
             logging.error(f"Semgrep detection failed: {e}", exc_info=True)
 
@@ -458,8 +630,12 @@ class AnalyticsClass:
             "variables_data": self.output_variables,
             "source_code": self.output_sources,
             "scan_results": self.output_scan,
+            "detector_timings": self.output_detector_timings,
         }
-        
+
+        if all_contracts:
+            self.output_full["contracts_data"] = self.output_contracts
+
         return self.output_full
 
     def load_target_contract(self, target_name: str):
@@ -493,23 +669,45 @@ if __name__ == "__main__":
         "config_dir",
         nargs='?',
         default="",
-        help="Path to the directory containing the config file for solc, changes cwd(), only for cryticCompile",
+        help="Path to the directory containing the config file for solc, solc runs in it, only for cryticCompile",
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Always compile with solc, skip the files/out/.compilations cache",
+    )
 
-    # NOTE: Move to the directory where .config.json file is located, otherwise Slither/Crytic won't compile
-    if args.config_dir:
-        os.chdir(args.config_dir)
+    parser.add_argument(
+        "--all_contracts",
+        action="store_true",
+        help="Analyze every contract in the compilation unit, not only target_name",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for --all_contracts, defaults to cpu count",
+    )
+
+    parser.add_argument(
+        "--scan_profile",
+        default=DEFAULT_SCAN_PROFILE,
+        help="full, fast, high-impact-only or comma separated detector names",
+    )
+
+    args = parser.parse_args()
 
     analyzer = AnalyticsClass(
         args.target_compile,
         args.target_name,
         args.config_dir,
+        use_cache=not args.no_cache,
+        scan_profile=args.scan_profile,
     )
     prompter = PromptClass()
     prompter.load_prompt_strategy("open_ended_0.1_unguided")
-    data = analyzer.run_analysis()
+    data = analyzer.run_analysis(args.all_contracts, args.workers)
 
     script_dir = os.path.dirname(os.path.realpath(__file__))
     name = args.target_name + "_sessionData.json"
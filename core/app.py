@@ -1,32 +1,75 @@
-from flask import Flask, jsonify, request, render_template
+from flask import Flask, Response, jsonify, request, render_template, send_file
 import numpy as np
 from analyze import AnalyticsClass
 from analyze import PromptClass
 from downloader import DownloaderClass
 from netmap import ContractMap
 from netmap import ContractMapScan
+from netmap import get_block_number
 import networkx as nx
-from itertools import combinations
 from web3 import Web3
 import re
 import shutil
 import os
-import json
 
+from utils.cache import get_compilation_key, load_slither_config
+from utils.detectors import DEFAULT_SCAN_PROFILE, select_detectors
+from utils.semgrep import SemgrepScan, get_rule_bundle, is_semgrep_result, simplify_findings
+from utils.stages import STAGES, get_stage_fingerprints, get_stale_stages
+from utils.compact import compact_session, expand_session
+from utils.session_cache import (
+    get_cached_session,
+    get_cached_session_index,
+    get_session_cache_stats,
+)
+from utils.query_index import SessionIndex
+from utils.reachability import parse_depth
+from utils.code_search import DEFAULT_SEARCH_LIMIT, SEARCH_KINDS, search
+from utils.corpus import DEFAULT_CORPUS_LIMIT, index_saved_session, query_corpus
+from utils.jobs import DEFAULT_JOB_LIST_LIMIT, JOB_STATES, JOB_WORKERS, JobQueue
+from utils.session_index import normalize_target
+from utils.single_flight import SingleFlight
 from utils.data import (
+    COMPRESSED_ENCODINGS,
     SUPPORTED_NETWORK,
     check_if_source_exists,
     check_if_supported_network_in_url,
+    ensure_compressed_siblings,
+    get_compressed_sibling,
+    get_session_root_file,
     get_target_from_url,
     load_source,
+    paginate_records,
+    parse_fields,
+    project_records,
+    rebuild_session_index,
+    register_session,
+    save_source,
+    session_index,
+    unregister_session,
 )
 
 app = Flask(__name__)
 app_dir = os.path.dirname(os.path.realpath(__file__))
 ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
 
+# NOTE: Started by the first /jobs request, not at import (the debug reloader imports the app twice)
+job_queue = JobQueue()
+
+# NOTE: JOB_WORKERS builds run at once, each one forks at most its share of the cpus for detectors
+BUILD_DETECTOR_WORKERS = max((os.cpu_count() or 1) // JOB_WORKERS, 1)
+
+# Builds of generate_session_data() in flight, keyed by lowercase network:address
+session_builds = SingleFlight()
+
 
-def generate_session_data(path, api_key=None):
+def generate_session_data(
+    path,
+    api_key=None,
+    all_contracts=False,
+    scan_profile=DEFAULT_SCAN_PROFILE,
+    run_semgrep=True,
+):
     if not path:
         return "Missing target network:0x...", 400
 
@@ -41,12 +84,60 @@ def generate_session_data(path, api_key=None):
     if not Web3.is_address(address):
         return f"Invalid Ethereum address: {address}", 400
 
+    try:
+        select_detectors(scan_profile)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    # NOTE: Concurrent requests for the same target wait for one build and share its result
+    return session_builds.run(
+        normalize_target(path),
+        _build_session_data,
+        path,
+        api_key,
+        all_contracts,
+        scan_profile,
+        run_semgrep,
+    )
+
+
+def _build_session_data(path, api_key, all_contracts, scan_profile, run_semgrep):
     session_data_path = check_if_source_exists(path)
 
     if session_data_path:
-        data = load_source(session_data_path)
-        return data
+        data = get_cached_session(session_data_path)
+        return data, 200
+
+    try:
+        source = download_source(path, api_key)
+    except Exception as e:
+        return {"error": str(e)}, 400
+
+    try:
+        data = analyze_source(
+            path,
+            source,
+            all_contracts,
+            scan_profile,
+            run_semgrep,
+            detector_workers=BUILD_DETECTOR_WORKERS,
+        )
+    except Exception as e:
+        print(f"Error running AnalyticsClass: {e}")
+        discard_source(source)
+        return {"error": str(e)}, 400
+
+    write_session_data(source, data)
+
+    return data, 200
+
 
+def download_source(path, api_key=None):
+    """
+    Downloads and restructures the verified sources of a network:address target, returns the DownloaderClass.
+    The session directory is deleted again when the download fails.
+    """
+    source = None
     try:
         if api_key:
             source = DownloaderClass(path, api_key)
@@ -58,37 +149,51 @@ def generate_session_data(path, api_key=None):
         print(f"Error while downloading source: {e}")
         print(f"Verify contract address, network or etherscan API_KEY ...")
 
-        if os.path.exists(source.output_dir):
-            try:
-                shutil.rmtree(source.output_dir)
-            except Exception as e:
-                print(f"Error deleting directory: {e}")
-        else:
-            print(f"Directory does not exist: {source.output_dir}")
+        if source:
+            discard_source(source)
 
-        return {"error": str(e)}, 400
+        raise
+
+    return source
 
-    try:
-        target = AnalyticsClass(
-            source.crytic_root_file,  # target path/Contract.sol
-            source.root_contract,  # target Contract name (of crytic_root_file)
-            source.output_dir,  # where to find slither.config.json
-        )
-        target.run_analysis()
-    except Exception as e:
-        print(f"Error running AnalyticsClass: {e}")
-        return {"error": str(e)}, 400
 
+def discard_source(source):
+    """
+    Deletes the session directory of a build that failed before its sessionData.json was written.
+    """
+    if not os.path.exists(source.output_dir):
+        print(f"Directory does not exist: {source.output_dir}")
+        return
     try:
-        prompter = PromptClass()
-        all_strategies = prompter.get_all_prompt_strategies()
-        for function_data in target.output_functions:
-            function_data["description"] = get_function_description(
-                source.root_contract, function_data
-            )
-            function_data["prompts"] = {strategy: "" for strategy in all_strategies}
+        unregister_session(source.output_dir)
+        shutil.rmtree(source.output_dir)
     except Exception as e:
-        print(f"Error generating available strategies: {str(e)}")
+        print(f"Error deleting directory: {e}")
+
+
+def analyze_source(
+    path,
+    source,
+    all_contracts=False,
+    scan_profile=DEFAULT_SCAN_PROFILE,
+    run_semgrep=True,
+    detector_workers=None,
+):
+    """
+    Compiles and analyzes downloaded sources, returns the session data. Doesn't write anything,
+    so it can run in a worker process (see run_pipeline in runner.py).
+    detector_workers: processes forked for detectors (and all_contracts), defaults to cpu count.
+    """
+    target = AnalyticsClass(
+        source.crytic_root_file,  # target path/Contract.sol
+        source.root_contract,  # target Contract name (of crytic_root_file)
+        source.output_dir,  # where to find slither.config.json
+        detector_workers=detector_workers,
+        scan_profile=scan_profile,
+    )
+    target.run_analysis(all_contracts, workers=detector_workers, run_semgrep=run_semgrep)
+
+    add_function_descriptions(source.root_contract, target.output_functions)
 
     data = {
         "network_info": source.contract_info,
@@ -97,17 +202,59 @@ def generate_session_data(path, api_key=None):
         "variables_data": target.output_variables,
         "source_code": target.output_sources,
         "scan_results": target.output_scan,
+        "detector_timings": target.output_detector_timings,
     }
 
+    if all_contracts:
+        data["contracts_data"] = target.output_contracts
+
+    block_number = get_block_number()
+    apply_contract_map(path, data)
+
+    # NOTE: Inputs of every stage, refresh_session_data() reruns only the stages that changed
+    data["scan_profile"] = scan_profile
+    data["stage_fingerprints"] = get_stage_fingerprints(
+        target.source_key, scan_profile, target.semgrep_rules_version, block_number
+    )
+
+    return data
+
+
+def write_session_data(source, data):
+    """
+    Writes sessionData.json of a built session and adds it to the session and search indexes.
+    """
+    # NOTE: sessionData.json is created only here
+    session_data_path = os.path.join(source.output_dir, "sessionData.json")
+    save_source(session_data_path, data)
+    register_session(source.output_dir, data)
+    index_saved_session(session_data_path, data)
+    return session_data_path
+
+
+def add_function_descriptions(root_contract, functions_data):
+    try:
+        prompter = PromptClass()
+        all_strategies = prompter.get_all_prompt_strategies()
+        for function_data in functions_data:
+            function_data["description"] = get_function_description(
+                root_contract, function_data
+            )
+            function_data["prompts"] = {strategy: "" for strategy in all_strategies}
+    except Exception as e:
+        print(f"Error generating available strategies: {str(e)}")
+
+
+def apply_contract_map(path, data):
     try:
         contract_map = ContractMap(path, data)
         contract_map.run_map()
 
         # NOTE: Generates data for a single contract only!
-        target.output_contract["external_calls"] = contract_map.external_calls
-        target.output_contract["external_addresses"] = contract_map.external_addresses
+        data["contract_data"]["external_calls"] = contract_map.external_calls
+        data["contract_data"]["external_addresses"] = contract_map.external_addresses
 
-        for var in target.output_variables:
+        for var in data["variables_data"]:
             for key, value in contract_map.external_addresses.items():
                 if var["variable_name"] == key:
                     var["address"] = value
@@ -115,15 +262,153 @@ def generate_session_data(path, api_key=None):
     except Exception as e:
         print(f"Error fetching variable addresses: {e}")
 
-    # NOTE: sessionData.json is created only here
-    with open(os.path.join(source.output_dir, "sessionData.json"), "w") as f:
-        json.dump(data, f, indent=4)
+
+def refresh_session_data(path, scan_profile=None, stages=None):
+    """
+    Reruns only the stages of an existing session whose inputs changed (see utils/stages.py).
+    stages: list of stage names to rerun regardless of their fingerprints.
+    """
+    session_data_path = check_if_source_exists(path)
+    if not session_data_path:
+        return generate_session_data(
+            path, scan_profile=scan_profile or DEFAULT_SCAN_PROFILE
+        )
+
+    # NOTE: Same key as builds, a session is never written by a refresh and a build (or two refreshes) at once
+    return session_builds.run(
+        normalize_target(path) or path,
+        _refresh_session_data,
+        path,
+        session_data_path,
+        scan_profile,
+        stages,
+    )
+
+
+def _refresh_session_data(path, session_data_path, scan_profile, stages):
+    data = load_source(session_data_path)
+    scan_profile = scan_profile or data.get("scan_profile") or DEFAULT_SCAN_PROFILE
+
+    try:
+        select_detectors(scan_profile)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    root_contract = data["network_info"]["contract_name"]
+    output_dir = data["network_info"]["data_directory"]
+    root_file = get_session_root_file(data)
+
+    try:
+        config = load_slither_config(output_dir)
+        source_key = get_compilation_key(root_file, config, output_dir)
+    except Exception as e:
+        print(f"Error fingerprinting session sources: {e}")
+        return {"error": str(e)}, 400
+
+    _, rules_version = get_rule_bundle()
+
+    stored = data.get("stage_fingerprints", {})
+    current = get_stage_fingerprints(source_key, scan_profile, rules_version, None)
+    # NOTE: The RPC is asked only when the contract map reruns (with the analysis or on request)
+    current["contract_map"] = stored.get("contract_map")
+
+    stale = get_stale_stages(stored, current)
+    for stage in stages or []:
+        if stage in STAGES and stage not in stale:
+            stale.append(stage)
+
+    if not stale:
+        print(f"Session up to date: {path}")
+        return data, 200
+
+    print(f"Refreshing stages {stale} for: {path}")
+
+    if "contract_map" in stale:
+        block_number = get_block_number()
+        # NOTE: RPC unreachable, keep the fingerprint of previously resolved addresses
+        if block_number is not None:
+            current["contract_map"] = get_stage_fingerprints(
+                source_key, scan_profile, rules_version, block_number
+            )["contract_map"]
+
+    # NOTE: semgrep only needs the root file, it overlaps with the Slither stages
+    semgrep_scan = None
+    if "semgrep" in stale:
+        try:
+            semgrep_scan = SemgrepScan(root_file).start()
+        except Exception as e:
+            print(f"Error starting semgrep scan: {e}")
+
+    try:
+        # NOTE: Slither is built only for the stages that need it
+        if "analysis" in stale or "detectors" in stale:
+            target = AnalyticsClass(
+                root_file,
+                root_contract,
+                output_dir,
+                detector_workers=BUILD_DETECTOR_WORKERS,
+                scan_profile=scan_profile,
+            )
+
+        if "analysis" in stale:
+            # NOTE: all_contracts sessions keep contracts_data consistent with the root contract
+            all_contracts = "contracts_data" in data
+            target.run_function_analysis(all_contracts, BUILD_DETECTOR_WORKERS)
+            add_function_descriptions(root_contract, target.output_functions)
+            data["contract_data"] = target.output_contract
+            data["functions_data"] = target.output_functions
+            data["variables_data"] = target.output_variables
+            data["source_code"] = target.output_sources
+            if all_contracts:
+                data["contracts_data"] = target.output_contracts
+
+        if "detectors" in stale:
+            target.run_slither_scan()
+            data["scan_results"] = [
+                entry
+                for entry in data.get("scan_results", [])
+                if is_semgrep_result(entry)
+            ] + target.output_scan
+            data["detector_timings"] = target.output_detector_timings
+    except Exception as e:
+        print(f"Error refreshing session data: {e}")
+        if semgrep_scan is not None:
+            semgrep_scan.process.kill()
+        return {"error": str(e)}, 400
+
+    if semgrep_scan is not None:
+        try:
+            findings = simplify_findings(semgrep_scan.results())
+            data["scan_results"] = [
+                entry
+                for entry in data.get("scan_results", [])
+                if not is_semgrep_result(entry)
+            ] + findings
+        except Exception as e:
+            # NOTE: Previous findings and fingerprint are kept, the next refresh scans again
+            print(f"Semgrep scan failed with error: {e}")
+            current["semgrep"] = stored.get("semgrep")
+    elif "semgrep" in stale:
+        current["semgrep"] = stored.get("semgrep")
+
+    if "contract_map" in stale:
+        apply_contract_map(path, data)
+
+    data["scan_profile"] = scan_profile
+    data["stage_fingerprints"] = current
+    save_source(session_data_path, data)
+    register_session(os.path.dirname(session_data_path), data)
+    index_saved_session(session_data_path, data)
 
     return data, 200
 
 
-def compile_from_network(path, crawl=None):
-    data, status_code = generate_session_data(path)
+def compile_from_network(
+    path, crawl=None, scan_profile=DEFAULT_SCAN_PROFILE, run_semgrep=True
+):
+    data, status_code = generate_session_data(
+        path, scan_profile=scan_profile, run_semgrep=run_semgrep
+    )
 
     if status_code != 200:
         return data, status_code
@@ -131,7 +416,7 @@ def compile_from_network(path, crawl=None):
     # NOTE: Only used on first compilation
     if crawl:
         try:
-            contract_map_scan = ContractMapScan(crawl)
+            contract_map_scan = ContractMapScan(crawl, scan_profile)
             contract_map_scan.get_external_sources()
         except Exception as e:
             print(f"Error running ContractMapScan: {e}")
@@ -139,6 +424,63 @@ def compile_from_network(path, crawl=None):
     return data, status_code
 
 
+
+def _get_job_session_data_path(path, data, status_code):
+    """
+    Returns the result of a build job: the target and the sessionData.json written for it.
+    """
+    if status_code != 200:
+        return data, status_code
+    return {"path": path, "session_data_path": check_if_source_exists(path)}, 200
+
+
+def run_compile_job(params):
+    """
+    Job version of the "/" POST for network:address and explorer URL targets, existing sessions finish at once.
+    """
+    path = params.get("path") or ""
+    if sort_path(path) == "network_url_target":
+        path = get_target_from_url(path)
+        if not path:
+            return "Invalid URL target", 400
+    if sort_path(path) != "network_target":
+        return f"Unsupported job target: {path}", 400
+
+    if check_if_source_exists(path):
+        return _get_job_session_data_path(path, None, 200)
+
+    data, status_code = compile_from_network(
+        path,
+        params.get("crawl") or None,
+        params.get("scan_profile") or DEFAULT_SCAN_PROFILE,
+        params.get("semgrep", True),
+    )
+    return _get_job_session_data_path(path, data, status_code)
+
+
+def run_generate_job(params):
+    path = params.get("path")
+    data, status_code = generate_session_data(
+        path,
+        all_contracts=bool(params.get("all_contracts", False)),
+        scan_profile=params.get("scan_profile") or DEFAULT_SCAN_PROFILE,
+    )
+    return _get_job_session_data_path(path, data, status_code)
+
+
+def run_refresh_job(params):
+    path = params.get("path")
+    data, status_code = refresh_session_data(
+        path, params.get("scan_profile"), params.get("stages")
+    )
+    return _get_job_session_data_path(path, data, status_code)
+
+
+job_queue.register("compile", run_compile_job)
+job_queue.register("generate", run_generate_job)
+job_queue.register("refresh", run_refresh_job)
+
+
 # region Endpoints
 ###################################################################################
 ###################################################################################
@@ -149,6 +491,11 @@ def index():
 
             path = request.form["path"]
             crawl = request.form["crawl"]
+            scan_profile = request.form.get("scan_profile") or DEFAULT_SCAN_PROFILE
+            # NOTE: runner.py --semgrep_batch scans all targets with one semgrep process afterwards
+            run_semgrep = request.form.get("semgrep") != "false"
+            # NOTE: The UI requests the compact format and stores it as is in localStorage
+            compact = request.form.get("format") == "compact"
 
             if crawl == "":
                 crawl = None
@@ -159,30 +506,41 @@ def index():
             if path_type == "network_url_target":
                 network_address = get_target_from_url(path)
                 if network_address:
-                    data, status_code = compile_from_network(network_address, crawl)
+                    data, status_code = compile_from_network(
+                        network_address, crawl, scan_profile, run_semgrep
+                    )
                     if status_code == 400:
                         return data, status_code
                     else:
-                        return jsonify(data)
+                        return session_response(data, compact)
                 else:
                     return "Invalid URL target", 400
 
             # target input <network>:<address>
             if path_type == "network_target":
-                existing_data = _get_session_data(path)
+                session_data_path = check_if_source_exists(path)
+                if session_data_path and compact:
+                    return send_session_file(session_data_path)
+                existing_data = _get_session_data(path, expand=not compact)
                 if existing_data:
-                    return jsonify(existing_data)
-                data, status_code = compile_from_network(path, crawl)
+                    return session_response(existing_data, compact)
+                data, status_code = compile_from_network(
+                    path, crawl, scan_profile, run_semgrep
+                )
                 if status_code != 200:
                     return data, status_code
                 else:
-                    return jsonify(data)
+                    return session_response(data, compact)
 
             # target input ~/files/out/path/to/dir
             if path_type == "dir_target":
                 session_data_path = os.path.join(path, "sessionData.json")
+                if os.path.isfile(session_data_path) and compact:
+                    return send_session_file(session_data_path)
                 if os.path.isfile(session_data_path):
-                    return jsonify(load_source(session_data_path))
+                    return session_response(
+                        load_source(session_data_path, expand=not compact), compact
+                    )
                 else:
                     return "Invalid directory target", 400
 
@@ -202,7 +560,11 @@ def index():
 @app.route("/generate_session_data", methods=["POST"])
 def generate_session_data_endpoint():
     path = request.json.get("path")
-    data, status_code = generate_session_data(path)
+    all_contracts = bool(request.json.get("all_contracts", False))
+    scan_profile = request.json.get("scan_profile") or DEFAULT_SCAN_PROFILE
+    data, status_code = generate_session_data(
+        path, all_contracts=all_contracts, scan_profile=scan_profile
+    )
 
     if status_code != 200:
         return (
@@ -213,6 +575,19 @@ def generate_session_data_endpoint():
     return jsonify(data)
 
 
+@app.route("/refresh_session", methods=["POST"])
+def refresh_session():
+    path = request.json.get("path")
+    scan_profile = request.json.get("scan_profile")
+    stages = request.json.get("stages")
+    data, status_code = refresh_session_data(path, scan_profile, stages)
+
+    if status_code != 200:
+        return jsonify(data), status_code
+
+    return jsonify(data)
+
+
 @app.route("/protocol_analysis", methods=["GET"])
 def protocol_analysis():
     crawl_level = int(0)
@@ -426,13 +801,53 @@ def protocol_view_html():
 @app.route("/get_session_data", methods=["GET"])
 def get_session_data():
     path = request.args.get("path")
-    data = _get_session_data(path)
+    compact = request.args.get("format") == "compact"
+
+    # NOTE: fields/offset/limit page through functions_data, other session keys are returned whole
+    if _is_paged_request(request.args):
+        session_data_path = _get_session_data_path(path)
+        if not session_data_path:
+            return "Session data not found", 404
+        data = dict(get_cached_session(session_data_path))
+        try:
+            page = _get_page(data.get("functions_data", []), request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        data["functions_data"] = page["results"]
+        data["functions_total"] = page["total"]
+        return session_response(data, compact)
+
+    # NOTE: The stored file is already compact, it's served without parsing
+    if compact:
+        session_data_path = _get_session_data_path(path)
+        if session_data_path:
+            return send_session_file(session_data_path)
+
+    data = _get_session_data(path, expand=not compact)
     if data:
-        return jsonify(data)
+        return session_response(data, compact)
     else:
         return "Session data not found", 404
 
 
+@app.route("/get_function", methods=["GET"])
+def get_function():
+    """
+    Returns full records of one function (by canonical or full name), used to expand paged results.
+    """
+    session_data_path = _get_session_data_path(request.args.get("path"))
+    name = request.args.get("function")
+    if not session_data_path or not name:
+        return jsonify({"error": "Session data not found"}), 404
+
+    functions = [
+        function
+        for function in get_cached_session(session_data_path).get("functions_data", [])
+        if name in (function.get("function_canonical_name"), function.get("function_full_name"))
+    ]
+    return jsonify(functions)
+
+
 @app.route("/report", methods=["GET"])
 def report():
     return render_template("report.html")
@@ -440,21 +855,48 @@ def report():
 
 @app.route("/list_sessions", methods=["GET"])
 def list_sessions():
+    """
+    Lists session summaries (see summarize_session in utils/data.py), newest first by default.
+    Query: prefix (of directory or contract name, case-insensitive), sort (summary field or findings.<impact>),
+    order (asc/desc), fields, offset, limit. Returns {"results", "total", "offset", "limit"}.
+    """
     try:
-        base_path = os.path.join(app_dir, "files", "out")
+        base_path = session_index.files_dir
         if not os.path.exists(base_path):
             return jsonify({"error": f"Directory {base_path} does not exist"}), 500
 
-        directories = next(os.walk(base_path))[1]
-        result = {
-            directory: os.path.join(base_path, directory) for directory in directories
-        }
-        return jsonify(result)
+        options = request.args
+        sort_key = options.get("sort") or "timestamp"
+        if sort_key not in SESSION_SORT_KEYS and not sort_key.startswith("findings."):
+            return jsonify({"error": f"Unsupported sort: {sort_key}"}), 400
+        descending = (options.get("order") or ("desc" if sort_key == "timestamp" else "asc")) == "desc"
+
+        prefix = (options.get("prefix") or "").lower()
+        summaries = [
+            dict(summary, path=os.path.join(base_path, summary["directory"]))
+            for summary in session_index.get_session_summaries()
+            if summary["directory"].lower().startswith(prefix)
+            or (summary.get("contract_name") or "").lower().startswith(prefix)
+        ]
+        summaries.sort(key=lambda summary: _get_sort_value(summary, sort_key), reverse=descending)
+
+        return jsonify(_get_page(summaries, options))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error listing sessions: {e}")
         return jsonify({"error": "Failed to list sessions", "details": str(e)}), 500
 
 
+@app.route("/rebuild_session_index", methods=["POST"])
+def rebuild_session_index_endpoint():
+    try:
+        return jsonify({"sessions": rebuild_session_index()})
+    except Exception as e:
+        print(f"Error rebuilding session index: {e}")
+        return jsonify({"error": "Failed to rebuild session index", "details": str(e)}), 500
+
+
 @app.route("/prompt", methods=["POST"])
 def prompt():
     try:
@@ -481,23 +923,154 @@ def prompt():
 @app.route("/filter", methods=["POST"])
 def filter():
     data = request.json
-    sessionData = data.get("sessionData")
+    sessionData, session_data_path = _get_filter_session_data(data)
     search_criteria = data.get("searchCriteria")
 
-    filtered_functions = filter_functions(sessionData, search_criteria)
+    if sessionData is None:
+        return jsonify({"error": "Session data not found"}), 404
+
+    # NOTE: Sessions served from the cache reuse their query index
+    index = get_cached_session_index(session_data_path) if session_data_path else None
+    try:
+        filtered_functions = filter_functions(sessionData, search_criteria, index)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify(filtered_functions)
+    return paged_response(filtered_functions, data)
 
 
 @app.route("/filter_scan", methods=["POST"])
 def filter_scan():
     data = request.json
-    sessionData = data.get("sessionData")
+    sessionData, _ = _get_filter_session_data(data)
     search_criteria = data.get("searchCriteria")
 
+    if sessionData is None:
+        return jsonify({"error": "Session data not found"}), 404
+
     filtered_scan = filter_results(sessionData["scan_results"], search_criteria)
 
-    return jsonify(filtered_scan)
+    return paged_response(filtered_scan, data)
+
+
+@app.route("/code_search", methods=["GET"])
+def code_search():
+    pattern = request.args.get("q")
+    regex = request.args.get("regex") == "true"
+    ignore_case = request.args.get("ignore_case") == "true"
+    kind = request.args.get("kind") or None
+    session = request.args.get("session") or None
+
+    if not pattern:
+        return jsonify({"error": "Missing search pattern q"}), 400
+    if kind and kind not in SEARCH_KINDS:
+        return jsonify({"error": f"Unknown kind {kind}, expected one of {SEARCH_KINDS}"}), 400
+
+    try:
+        limit = int(request.args.get("limit", DEFAULT_SEARCH_LIMIT))
+        hits = search(pattern, regex, ignore_case, kind, session, limit)
+    except (re.error, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"hits": hits, "count": len(hits)})
+
+
+@app.route("/session_cache_stats", methods=["GET"])
+def session_cache_stats():
+    return jsonify(get_session_cache_stats())
+
+
+@app.route("/build_stats", methods=["GET"])
+def build_stats():
+    """
+    Session builds started, requests coalesced into a running build, and waiters per build in flight.
+    """
+    return jsonify(session_builds.stats())
+
+
+@app.route("/corpus_query", methods=["POST"])
+def corpus_query():
+    data = request.json
+    search_criteria = data.get("searchCriteria") or {}
+    table = data.get("table") or "functions"
+
+    try:
+        offset = int(data.get("offset", 0))
+        limit = int(data.get("limit", DEFAULT_CORPUS_LIMIT))
+        results, total = query_corpus(search_criteria, table, offset, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"results": results, "total": total, "offset": offset, "limit": limit})
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """
+    Queues a session build and returns its job id at once, poll /jobs/<job_id> and fetch /jobs/<job_id>/result.
+    Body (JSON or form): path, kind ("compile" like the "/" POST, "generate", "refresh"),
+    crawl, scan_profile, semgrep, all_contracts, stages.
+    """
+    params = dict(request.get_json(silent=True) or request.form)
+    kind = params.pop("kind", None) or "compile"
+    if not params.get("path"):
+        return jsonify({"error": "Missing target path"}), 400
+    # NOTE: Form values are strings, like the "/" POST only "false" disables semgrep
+    if isinstance(params.get("semgrep"), str):
+        params["semgrep"] = params["semgrep"] != "false"
+
+    try:
+        job_id = job_queue.submit(kind, params)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(job_queue.get(job_id)), 202
+
+
+@app.route("/jobs", methods=["GET"])
+def list_jobs():
+    state = request.args.get("state")
+    if state and state not in JOB_STATES:
+        return jsonify({"error": f"Unsupported job state: {state}"}), 400
+
+    job_queue.start()
+    try:
+        limit = int(request.args.get("limit", DEFAULT_JOB_LIST_LIMIT))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"jobs": job_queue.list(state, limit), "stats": job_queue.stats()})
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job_queue.start()
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+    return jsonify(job)
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id):
+    """
+    Returns the session built by a finished job (format=compact serves the stored file),
+    the error and status code of a failed job, or the job itself with 202 while it is queued or running.
+    """
+    job_queue.start()
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+    if job["state"] == "failed":
+        return jsonify({"error": job["error"]}), job["status_code"] or 500
+    if job["state"] != "done":
+        return jsonify(job), 202
+
+    session_data_path = job["result"].get("session_data_path")
+    if not session_data_path or not os.path.isfile(session_data_path):
+        return jsonify({"error": f"Session of job {job_id} no longer exists"}), 404
+    if request.args.get("format") == "compact":
+        return send_session_file(session_data_path)
+    return jsonify(get_cached_session(session_data_path))
 
 
 # endregion
@@ -544,209 +1117,52 @@ def filter_results(scan_data, search_criteria):
     return filtered_results
 
 
-def filter_functions(search_data, search_criteria):
+def filter_functions(search_data, search_criteria, index=None):
+    """
+    Returns functions of the session matching search_criteria, index is the cached SessionIndex
+    of the session when available, otherwise one is built for this call.
+    find_target_reachable/all_reachable_from follow reachable_depth calls (direct calls by default, "all" for any depth).
+    """
     functions_data = search_data.get("functions_data")
     scan_data = search_data.get("scan_results")
-    function_name = search_criteria.get("functionName")
-    filtered_functions = []
 
-    # Preprocess scan_data based on impact criterion
+    if index is None:
+        index = SessionIndex(functions_data)
+
     impact = search_criteria.get("impact")
     find_target_reachable = search_criteria.get("find_target_reachable")
     all_reachable_from = search_criteria.get("all_reachable_from")
+    depth = parse_depth(search_criteria.get("reachable_depth"))
+
+    restrict_to = None
 
     if find_target_reachable:
-        find_target_matches = preprocess_find_target_reachable(
-            functions_data, find_target_reachable
+        restrict_to = _intersect(
+            restrict_to,
+            index.reachability.reaching(find_target_reachable, depth),
         )
-    else:
-        find_target_matches = None
 
     if all_reachable_from:
-        all_reachable_from_matches = preprocess_all_reachable_from(
-            functions_data, all_reachable_from
+        restrict_to = _intersect(
+            restrict_to,
+            index.reachability.reachable_from(all_reachable_from, depth),
         )
-    else:
-        all_reachable_from_matches = None
 
     if impact:
         impact_matches = preprocess_scan_data_for_impact(scan_data, impact)
-    else:
-        impact_matches = None
-
-    for function in functions_data:
-        matches_criteria = True
-
-        if function_name and function_name not in function.get(
-            "function_canonical_name"
-        ):
-            matches_criteria = False
-
-        if (
-            search_criteria.get("visibility")
-            and function.get("visibility") != search_criteria["visibility"]
-        ):
-            matches_criteria = False
+        restrict_to = _intersect(restrict_to, index.ids_for_full_names(impact_matches))
 
-        if search_criteria.get("priority") and function.get("priority") != int(
-            search_criteria["priority"]
-        ):
-            matches_criteria = False
+    return index.search(search_criteria, restrict_to)
 
-        if "hasModifiers" in search_criteria:
-            has_modifiers = bool(function.get("modifiers"))
-            if (search_criteria["hasModifiers"] == "true") != has_modifiers:
-                matches_criteria = False
-
-        if "hasInternalCalls" in search_criteria:
-            has_internal_calls = bool(function.get("internal_calls"))
-            if (search_criteria["hasInternalCalls"] == "true") != has_internal_calls:
-                matches_criteria = False
-
-        if "hasExternalCalls" in search_criteria:
-            has_external_calls = bool(function.get("external_calls"))
-            if (search_criteria["hasExternalCalls"] == "true") != has_external_calls:
-                matches_criteria = False
-
-        if "isInheritedFunction" in search_criteria:
-            is_inherited = search_criteria["isInheritedFunction"] == "true"
-            if bool(function.get("contract_inherited")) != is_inherited:
-                matches_criteria = False
-
-        if "containsAsm" in search_criteria:
-            contains_asm = search_criteria["containsAsm"] == "true"
-            if bool(function.get("contains_asm")) != contains_asm:
-                matches_criteria = False
-
-        if "lowLvlCall" in search_criteria:
-            low_lvl_call = search_criteria["lowLvlCall"] == "true"
-            if bool(function.get("low_level_calls")) != low_lvl_call:
-                matches_criteria = False
-
-        if "in_contract" in search_criteria:
-            in_contract = search_criteria["in_contract"]
-            if not function.get("contract_name") in in_contract:
-                matches_criteria = False
-
-        if "writing_to" in search_criteria:
-            writing_to = search_criteria["writing_to"]
-            if not any(
-                var in writing_to for var in function.get("state_vars_written", [])
-            ):
-                matches_criteria = False
-
-        if "reading_from" in search_criteria:
-            reading_from = search_criteria["reading_from"]
-            if not any(
-                var in reading_from for var in function.get("state_vars_read", [])
-            ):
-                matches_criteria = False
-
-        if "calling_external_contract" in search_criteria:
-            calling_external_contract = search_criteria["calling_external_contract"]
-            if not any(
-                contract in calling_external_contract
-                for contract in function.get("external_calls", [])
-            ):
-                matches_criteria = False
-
-        # NOTE: function_body workaround, requires a PR to slihter to search in structs
-        if "using_structure" in search_criteria:
-            using_structure = search_criteria["using_structure"]
-            if not any(
-                structure in function.get("function_body", "")
-                for structure in using_structure
-            ):
-                matches_criteria = False
-
-        # NOTE: function_body workaround, requires a PR to slihter to search in events
-        if "emitting" in search_criteria:
-            emitting = search_criteria["emitting"]
-            if not any(
-                event in function.get("function_body", "") for event in emitting
-            ):
-                matches_criteria = False
-
-        if all_reachable_from_matches is not None:
-            # Check if there's a match for the current function in the all_reachable_from_matches list
-            if not any(
-                function.get("function_full_name") in reachable.values()
-                for reachable in all_reachable_from_matches
-            ):
-                matches_criteria = False
-
-        if find_target_matches is not None:
-            # Check if there's a match for the current function in the find_target_matches list
-            if not any(
-                function.get("function_full_name") in target_match.values()
-                for target_match in find_target_matches
-            ):
-                matches_criteria = False
-
-        # Adjusted impact criterion check
-        if impact_matches is not None:
-            # Check if there's a match for the current function in the impact_matches dictionary
-            if not impact_matches.get(function.get("function_full_name")):
-                matches_criteria = False
-
-        if matches_criteria:
-            # If all criteria match, append the function
-            filtered_functions.append(function)
 
-    return filtered_functions
+def _intersect(ids, other_ids):
+    return other_ids if ids is None else ids & other_ids
 
 
 def filter_variables(search_data, search_criteria):
     pass
 
 
-def preprocess_all_reachable_from(functions_data, targets):
-    # Initialize a set to keep track of all functions that are reachable from any of the targets
-    all_reachable_from_any_target = set()
-
-    # Iterate over each target to accumulate reachable functions
-    for target in targets:
-        for function in functions_data:
-            if function.get("function_full_name") == target:
-                # Update the set with reachable functions for this target
-                all_internal = set(function.get("internal_calls", []))
-                all_external = set(function.get("external_calls_functions", []))
-                all_calls = all_internal.union(all_external)
-                all_reachable_from_any_target.update(all_calls)
-
-    # Filter the functions_data to include only functions that are reachable from at least one of the targets
-    filtered_functions = [
-        function
-        for function in functions_data
-        if function.get("function_full_name") in all_reachable_from_any_target
-    ]
-
-    return filtered_functions
-
-
-def preprocess_find_target_reachable(functions_data, targets):
-    # Initialize a set to keep track of all functions that are reachable from any of the targets
-    all_reaching_target = set()
-
-    # Iterate over each target to accumulate reachable functions
-    for target in targets:
-        for function in functions_data:
-            all_internal = set(function.get("internal_calls", []))
-            all_external = set(function.get("external_calls_functions", []))
-            all_calls = all_internal.union(all_external)
-            if target in all_calls:
-                all_reaching_target.add(function.get("function_full_name"))
-
-    # Filter the functions_data to include only functions that are reachable from at least one of the targets
-    filtered_functions = [
-        function
-        for function in functions_data
-        if function.get("function_full_name") in all_reaching_target
-    ]
-
-    return filtered_functions
-
-
 def preprocess_scan_data_for_impact(scan_data, impact):
     # Maps function full names to whether they have a matching impact entry in scan_data
     impact_matches = {}
@@ -756,17 +1172,140 @@ def preprocess_scan_data_for_impact(scan_data, impact):
     return impact_matches
 
 
-def _get_session_data(path):
+def _get_session_data(path, expand=True):
     """
     Returns the session data from files/out/$network:address if it exists, otherwise returns None.
     """
     session_data_path = check_if_source_exists(path)
     if session_data_path:
-        data = load_source(session_data_path)
-        return data
+        # NOTE: Compact data is only needed for responses, it isn't worth caching
+        if expand:
+            return get_cached_session(session_data_path)
+        return load_source(session_data_path, expand=False)
     return None
 
 
+def _get_session_data_path(path):
+    """
+    Returns sessionData.json of a network:address target or a session directory, otherwise returns None.
+    """
+    if not path:
+        return None
+    if os.path.isdir(path):
+        session_data_path = os.path.join(path, "sessionData.json")
+        return session_data_path if os.path.isfile(session_data_path) else None
+    return check_if_source_exists(path)
+
+
+def _get_filter_session_data(request_data):
+    """
+    Returns (session, session_data_path) to filter, the server-side cached copy for {"path": ...} requests,
+    the posted session (without a path) for the older {"sessionData": ...} form.
+    """
+    if request_data.get("sessionData"):
+        return expand_session(request_data["sessionData"]), None
+
+    session_data_path = _get_session_data_path(request_data.get("path"))
+    if session_data_path:
+        return get_cached_session(session_data_path), session_data_path
+    return None, None
+
+
+SESSION_SORT_KEYS = [
+    "directory",
+    "target",
+    "network",
+    "address",
+    "contract_name",
+    "function_count",
+    "findings_total",
+    "size",
+    "timestamp",
+]
+
+
+def _get_sort_value(summary, sort_key):
+    # NOTE: findings.<impact> sorts by the count of one impact, sessions without it count 0
+    if sort_key.startswith("findings."):
+        return summary.get("findings", {}).get(sort_key.split(".", 1)[1], 0)
+    value = summary.get(sort_key)
+    return value.lower() if isinstance(value, str) else (value or 0)
+
+
+def _is_paged_request(options):
+    return any(options.get(key) not in (None, "") for key in ("fields", "offset", "limit"))
+
+
+def _get_page(records, options):
+    offset = int(options.get("offset") or 0)
+    limit = options.get("limit")
+    limit = int(limit) if limit not in (None, "") else None
+    return {
+        "results": project_records(
+            paginate_records(records, offset, limit), parse_fields(options.get("fields"))
+        ),
+        "total": len(records),
+        "offset": offset,
+        "limit": limit,
+    }
+
+
+def paged_response(records, options):
+    """
+    jsonify() for result lists, requests with fields/offset/limit get {"results", "total", "offset", "limit"}
+    with only the requested fields of each record, other requests get the plain list.
+    """
+    if not _is_paged_request(options):
+        return jsonify(records)
+    try:
+        return jsonify(_get_page(records, options))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def send_session_file(session_data_path):
+    """
+    Serves sessionData.json as stored (compact format, or regular for unconverted sessions) straight from disk.
+    Uses the precompressed sibling for the best encoding the client accepts, ETag is the file mtime and size,
+    GET requests with a matching If-None-Match get 304.
+    """
+    encoding = None
+    for candidate in COMPRESSED_ENCODINGS:
+        if candidate not in request.accept_encodings:
+            continue
+        if get_compressed_sibling(session_data_path, candidate) is None:
+            # NOTE: Sessions written before siblings existed get them on first request
+            ensure_compressed_siblings(session_data_path)
+        if get_compressed_sibling(session_data_path, candidate):
+            encoding = candidate
+            break
+
+    stat = os.stat(session_data_path)
+    etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}-{encoding or 'identity'}"
+
+    if request.method == "GET" and request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        file_path = get_compressed_sibling(session_data_path, encoding) if encoding else session_data_path
+        response = send_file(
+            file_path, mimetype="application/json", conditional=False, etag=False
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def session_response(data, compact=False):
+    """
+    jsonify() for session data, compact=True returns the compact format (see utils/compact.py).
+    """
+    return jsonify(compact_session(data) if compact else expand_session(data))
+
+
 def sort_path(path):
     # Check if target is a GitHub repository
     if re.match(r"^https://github\.com/[^/]+/[^/]+/?$", path):
@@ -837,4 +1376,8 @@ def get_function_description(main_contract, function_data):
 # endregion
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    debug = True
+    # NOTE: Resumes jobs left queued or running at boot, the debug reloader parent never serves requests
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        job_queue.start()
+    app.run(host="0.0.0.0", port=5000, debug=debug)
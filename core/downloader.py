@@ -1,8 +1,10 @@
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 import os
 import argparse
 import shutil
 import datetime
+import multiprocessing
 from crytic_compile import CryticCompile
 
 """
@@ -11,6 +13,19 @@ python downloader.py <network>:<address>
 """
 
 
+def download_source_code(target_name: str, output_dir: str, api_keys: dict):
+    """
+    Downloads (and test compiles) the verified sources of target_name into output_dir/crytic-export.
+    Runs in a child process, returns (error message or None, bytecode_only).
+    """
+    try:
+        os.chdir(output_dir)
+        crytic_object = CryticCompile(target_name, **api_keys)
+        return None, crytic_object.bytecode_only
+    except Exception as e:
+        return str(e), False
+
+
 class DownloaderClass:
     # target_string is <network>:<address>
     def __init__(self, target_string: str, api_key: str = None):
@@ -46,9 +61,6 @@ class DownloaderClass:
         # absolute path of the self.root_contract contract file
         self.crytic_root_file = str()
         
-        # crytic-compile access
-        self.crytic_object = None
-
         # create directory <network>:<address> in the working_dir
         if ":" in target_string:
             self.target_name = target_string
@@ -60,26 +72,25 @@ class DownloaderClass:
             os.makedirs(self.output_dir, exist_ok=True)
 
     def get_source_code(self):
-        os.chdir(self.output_dir)
-
-        if self.api_key:
-            try:
-                self.crytic_object = CryticCompile(self.target_name, **self.api_keys)
-                if self.crytic_object.bytecode_only:
-                    raise Exception(
-                        "Downloader.get_source_code(api_key) Error: Bytecode only accessible"
-                    )
-            except Exception as e:
-                raise Exception(f"Downloader.get_source_code(api_key) Error: {e}")
-        else:
-            try:
-                self.crytic_object = CryticCompile(self.target_name)
-                if self.crytic_object.bytecode_only:
-                    raise Exception(
-                        "Downloader.get_source_code(api_key) Error: Bytecode only accessible"
-                    )
-            except Exception as e:
-                raise Exception(f"Downloader.get_source_code() Error: {e}")
+        # NOTE: crytic-compile compiles single-file sources relative to the working directory,
+        # the download runs in a child process so the working directory of this process never changes
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            error, bytecode_only = executor.submit(
+                download_source_code,
+                self.target_name,
+                str(self.output_dir),
+                self.api_keys if self.api_key else {},
+            ).result()
+
+        if error:
+            if self.api_key:
+                raise Exception(f"Downloader.get_source_code(api_key) Error: {error}")
+            raise Exception(f"Downloader.get_source_code() Error: {error}")
+        if bytecode_only:
+            raise Exception(
+                "Downloader.get_source_code(api_key) Error: Bytecode only accessible"
+            )
 
     def restructure_for_crytic_compile(self):
 
@@ -131,6 +142,10 @@ class DownloaderClass:
 
         shutil.rmtree(self.output_dir / "crytic-export")
         new_dir_name = f"{self.output_dir.parent}/{self.output_dir.name}:{single_contract_name if single_dir_type else contract_name}"
+        # NOTE: Left behind by a build that failed after the download, targets with a session are never downloaded again
+        if os.path.exists(new_dir_name):
+            print(f"Removing stale session directory: {new_dir_name}")
+            shutil.rmtree(new_dir_name)
         os.rename(self.output_dir, new_dir_name)
         self.output_dir = Path(new_dir_name)
         self.root_contract = single_contract_name if single_dir_type else contract_name
@@ -151,16 +166,16 @@ class DownloaderClass:
 
         self.contract_info = contract_info
 
-        # crytic_root_file is the absolute path of the target contract_name.sol file found in the current directory or its subdirectories
+        # crytic_root_file is the absolute path of the target contract_name.sol file found in output_dir or its subdirectories
         try:
-            for file_path in Path.cwd().rglob(
+            for file_path in self.output_dir.rglob(
                 f"{single_contract_name if single_dir_type else contract_name}.sol"
             ):
                 self.crytic_root_file = str(file_path)
                 break
         except Exception as e:
             raise Exception(
-                f"File {contract_name}.sol not found in the current directory or its subdirectories: {e}"
+                f"File {contract_name}.sol not found in {self.output_dir} or its subdirectories: {e}"
             )
 
     def run_crytic(self):
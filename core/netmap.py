@@ -8,9 +8,8 @@ from runner import run_external_targets, run_analysis
 from utils.data import (
     check_if_source_exists,
     find_all_session_data_paths,
-    get_session_data,
-    load_source,
 )
+from utils.session_cache import get_cached_session
 
 """
 
@@ -21,6 +20,8 @@ python netmap.py mainet:0x29d2bcf0d70f95ce16697e645e2b76d218d66109
 EXCEPTIONS = ["msg.value", "msg.sender", "new ", "this.", "address(", "abi."]
 TYPE_EXCEPTIONS = ["uint", "int", "bool", "bytes", "string", "mapping"]
 ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+# TODO: Add support for CONFIG file
+RPC_URL = "https://eth.llamarpc.com"
 app_dir = os.path.dirname(os.path.realpath(__file__))
 base_path = os.path.join(app_dir, "files", "out")
 
@@ -63,6 +64,17 @@ def generate_address_abi(variables_data):
     return variable_call, abi
 
 
+def get_block_number():
+    """
+    Returns the latest block of the RPC used for address resolution, None if the RPC is unreachable.
+    """
+    try:
+        return Web3(Web3.HTTPProvider(RPC_URL)).eth.block_number
+    except Exception as e:
+        print(f"Error fetching block number: {e}")
+        return None
+
+
 """
 
 Use ContractMap to generate external_addresses, _calls (and other) data for ContractMapScan to use.
@@ -77,7 +89,8 @@ crawl_level: int, number of levels to crawl external calls sources
 
 
 class ContractMapScan:
-    def __init__(self, crawl_level=None):
+    def __init__(self, crawl_level=None, scan_profile=None):
+        self.scan_profile = scan_profile
         self.session_data_paths = find_all_session_data_paths()
         self.session_external_addresses = []
         self.session_external_addresses_paths = {}
@@ -92,7 +105,7 @@ class ContractMapScan:
     def get_external_sources(self):
         external_addresses_found = []
         for session_data_path in self.session_data_paths:
-            session_data = get_session_data(session_data_path)
+            session_data = get_cached_session(session_data_path)
             external_addresses_found.append(
                 session_data["contract_data"]["external_addresses"]
             )
@@ -109,7 +122,9 @@ class ContractMapScan:
                     if address != ZERO_ADDRESS:
                         if self.crawl_level != 1:
                             try:
-                                run_analysis(external_target, self.crawl_level)
+                                run_analysis(
+                                    external_target, self.crawl_level, self.scan_profile
+                                )
                             except Exception as e:
                                 print(
                                     "Error: get_external_sources.run_analysis(external_target):",
@@ -118,7 +133,7 @@ class ContractMapScan:
                                 continue
                         else:
                             try:
-                                run_external_targets(external_target)
+                                run_external_targets(external_target, self.scan_profile)
                             except Exception as e:
                                 print(
                                     "Error: get_external_sources.run_external_targets(external_target)"
@@ -130,7 +145,7 @@ class ContractMapScan:
 
     def gen_protocol_graph(self):
         for path in self.session_data_paths:
-            session_data = load_source(path)
+            session_data = get_cached_session(path)
             target_address = session_data.get("network_info", {}).get(
                 "contract_address", ""
             )
@@ -210,8 +225,7 @@ returns: external_addresses, external_calls as a part of the sessionData object
 class ContractMap:
     def __init__(self, target_address: str = None, session_data: dict = None):
 
-        # TODO: Add support for CONFIG file
-        self.w3 = Web3(Web3.HTTPProvider("https://eth.llamarpc.com"))
+        self.w3 = Web3(Web3.HTTPProvider(RPC_URL))
 
         if target_address:
             session_data_path = check_if_source_exists(target_address)
@@ -232,7 +246,7 @@ class ContractMap:
                 abi=self.abi_variable,
             )
         elif session_data_path:
-            self.session_data = get_session_data(session_data_path)
+            self.session_data = get_cached_session(session_data_path)
             self.variable_call, self.abi_variable = generate_address_abi(
                 self.session_data["variables_data"]
             )
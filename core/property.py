@@ -2,11 +2,12 @@ from typing import List
 from slither.core.declarations import Function
 from slither.core.declarations import Contract
 
-from slither.printers.summary.constructor_calls import _get_source_code
+from utils.source import SourceProvider
 
 class PropertyMatchClass:
-    def __init__(self, slither):
+    def __init__(self, slither, source_provider: SourceProvider = None):
         self.slither = slither
+        self.source_provider = source_provider or SourceProvider()
         self.root_contract = None
         self.prompt_codes = []
 
@@ -23,7 +24,7 @@ class PropertyMatchClass:
 
     def is_eth_function(self, function: Function) -> List[int]:
         eth_scenario = []
-        function_body = _get_source_code(function)
+        function_body = self.source_provider.get_source_code(function)
         # contract._fallback_function and _receive_function
         if self.root_contract.fallback_function:
             eth_scenario.append(0)
@@ -42,7 +43,7 @@ class PropertyMatchClass:
 
     def is_eip20_function(self, function: Function) -> List[int]:
         eth_scenario = []
-        function_body = _get_source_code(function)
+        function_body = self.source_provider.get_source_code(function)
 
         # contract is ERC20
         transfer = self.root_contract.get_function_from_signature(
@@ -67,7 +68,7 @@ class PropertyMatchClass:
 
     def is_uniswap_function(self, function: Function) -> List[int]:
         eth_scenario = []
-        function_body = _get_source_code(function)
+        function_body = self.source_provider.get_source_code(function)
         uniswap_functions = ["swapExactETHForTokens", "swapExactTokensForETH"]
         # calls uniswap-like contracts (interface implemented)
         if any(keyword in function_body for keyword in uniswap_functions):
@@ -84,7 +85,7 @@ class PropertyMatchClass:
 
     def is_signature_used(self, function: Function) -> List[int]:
         eth_scenario = []
-        function_body = _get_source_code(function)
+        function_body = self.source_provider.get_source_code(function)
         # signature check
         if "ecrecover" in function_body:
             eth_scenario.append(9)
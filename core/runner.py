@@ -5,18 +5,39 @@ import time
 import json
 import os
 import csv
+import queue
+import threading
+import multiprocessing
 from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from urllib.parse import quote
+
+from utils.data import check_if_source_exists
+from utils.ledger import DEFAULT_MAX_ATTEMPTS, LEDGER_DB_PATH, BatchLedger, run_resumable
+from utils.semgrep import run_semgrep_batch_for_sessions
 from datetime import datetime
 
 """
-python runner.py --bountyId <name> --csv <file_path> --target <network>:<address> --crawl_level <level>
+python runner.py --bountyId <name> --csv <file_path> --target <network>:<address> --crawl_level <level> --scan_profile <profile> --semgrep_batch
 
 bountyId: name of the bounty from immunefi_data.db, will only work with <network>:<address> targets
 csv: file path to a csv file containing <network>:<address> targets in single column
 target: single target to run against the app, will only work with <network>:<address>
 crawl_level: crawl the target to a certain level, default is None
-
-requires app.py to be running on 127.0.0.1:5000
+scan_profile: detectors to run, "full" (default), "fast", "high-impact-only" or comma separated detector names
+semgrep_batch: skip semgrep per target, scan all targets with one semgrep process after the run
+jobs: queue the targets as app.py jobs (POST /jobs) instead of one blocking request per target
+wait: with --jobs, poll the queued jobs until they finish and log the failed ones
+pipeline: build the targets in this process without app.py, download -> compile/analysis -> write stages
+workers: compile/analysis worker processes for --pipeline, defaults to cpu count
+download_workers: concurrent downloads for --pipeline (still at most 5 Etherscan requests per second)
+ledger: checkpoint database of the run, default files/out/.batch/ledger.db, a rerun skips targets that are done
+or failed permanently and retries transient failures (rate limits, network, crashed workers) with backoff
+max_attempts: attempts per target before a transient failure is given up, default 3
+retry_failed: forget permanently failed targets of the ledger and try them again
+no_ledger: run every target without the ledger (not used with --jobs, jobs are kept by app.py)
+
+requires app.py to be running on 127.0.0.1:5000 (except with --pipeline)
 
 creates sessionData.json in files/out/<network>:<address> directory
 cli version of front end application
@@ -28,6 +49,10 @@ LOCAL_DB_PATH = os.path.join(
 )
 TARGETS_DIRECTORY = os.path.join(app_dir, "files", "out")
 
+# Etherscan API limit shared by all download workers of run_pipeline
+DOWNLOADS_PER_SECOND = 5
+DOWNLOAD_WORKERS = 4
+
 
 def connect_db():
     conn = sqlite3.connect(LOCAL_DB_PATH)
@@ -82,7 +107,7 @@ def log_error_to_file(message):
         writer.writerow(message.split(","))
 
 
-def run_analysis(targets, crawl=None):
+def run_analysis(targets, crawl=None, scan_profile=None, semgrep_batch=False, ledger=None):
     url = "http://127.0.0.1:5000/"
     timestamps = deque(maxlen=5)
 
@@ -103,8 +128,15 @@ def run_analysis(targets, crawl=None):
         timestamps.append(time.time())
 
         payload = "path={}&crawl={}".format(target, crawl)
+        if scan_profile:
+            payload += "&scan_profile={}".format(quote(scan_profile))
+        if semgrep_batch:
+            payload += "&semgrep=false"
         print("Executing payload:", payload)
 
+        if ledger:
+            ledger.start(target)
+        response = None
         try:
             response = requests.post(url, data=payload, headers=headers)
             if response.status_code != 200:
@@ -120,9 +152,72 @@ def run_analysis(targets, crawl=None):
             error_message = f"{datetime.now():%Y-%m-%d %H:%M:%S},{target},{str(e)}"
             print("Error run_analysis():", error_message)
             log_error_to_file(error_message)
+            if ledger:
+                # NOTE: Classified by the app error, not by the generic exception above
+                ledger.fail(target, "request", response.text if response is not None else e)
+            continue
+
+        if ledger:
+            ledger.succeed(target)
+
+
+def submit_jobs(targets, crawl=None, scan_profile=None, semgrep_batch=False, wait=False):
+    """
+    Queues targets on the app job queue, returns {job_id: target}. With wait, polls until all jobs finished.
+    """
+    url = "http://127.0.0.1:5000/jobs"
+
+    if isinstance(targets, str):
+        targets = [targets]
+
+    jobs = {}
+    for target in targets:
+        payload = {"path": target, "kind": "compile", "crawl": crawl, "scan_profile": scan_profile}
+        if semgrep_batch:
+            payload["semgrep"] = False
+
+        try:
+            response = requests.post(url, json=payload)
+            if response.status_code != 202:
+                raise Exception(response.text)
+            jobs[response.json()["id"]] = target
+            print(f"Queued {target}: job {response.json()['id']}")
+        except Exception as e:
+            error_message = f"{datetime.now():%Y-%m-%d %H:%M:%S},{target},{str(e)}"
+            print("Error submit_jobs():", error_message)
+            log_error_to_file(error_message)
+
+    if wait:
+        wait_for_jobs(jobs)
+
+    return jobs
 
 
-def run_external_targets(targets):
+def wait_for_jobs(jobs, poll_interval=5):
+    pending = dict(jobs)
+    while pending:
+        for job_id, target in list(pending.items()):
+            try:
+                job = requests.get(f"http://127.0.0.1:5000/jobs/{job_id}").json()
+            except Exception as e:
+                print(f"Error polling job {job_id}: {e}")
+                continue
+
+            if job.get("state") in ("queued", "running"):
+                continue
+            del pending[job_id]
+            if job.get("state") == "failed":
+                error_message = f"{datetime.now():%Y-%m-%d %H:%M:%S},{target},{job.get('error')}"
+                print("Error wait_for_jobs():", error_message)
+                log_error_to_file(error_message)
+            else:
+                print(f"Finished {target}")
+
+        if pending:
+            time.sleep(poll_interval)
+
+
+def run_external_targets(targets, scan_profile=None):
     url = "http://127.0.0.1:5000/generate_session_data"
     timestamps = deque(maxlen=5)
 
@@ -142,7 +237,7 @@ def run_external_targets(targets):
 
         timestamps.append(time.time())
 
-        payload = json.dumps({"path": target})
+        payload = json.dumps({"path": target, "scan_profile": scan_profile})
         print("Executing payload:", payload)
 
         try:
@@ -157,6 +252,258 @@ def run_external_targets(targets):
             log_error_to_file(error_message)
 
 
+def run_semgrep_batch(targets):
+    """
+    Scans root files of all targets with sessions in files/out with one semgrep process.
+    """
+    session_data_paths = []
+    for target in targets:
+        session_data_path = check_if_source_exists(target)
+        if session_data_path:
+            session_data_paths.append(session_data_path)
+
+    try:
+        run_semgrep_batch_for_sessions(session_data_paths)
+    except Exception as e:
+        error_message = f"{datetime.now():%Y-%m-%d %H:%M:%S},semgrep_batch,{str(e)}"
+        print("Error run_semgrep_batch():", error_message)
+        log_error_to_file(error_message)
+
+
+class RateLimiter:
+    """
+    Blocks callers so that at most max_calls pass within any period seconds.
+    """
+
+    def __init__(self, max_calls, period=1.0):
+        self.max_calls = max_calls
+        self.period = period
+        self.timestamps = deque(maxlen=max_calls)
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            if len(self.timestamps) == self.max_calls:
+                elapsed = time.time() - self.timestamps[0]
+                if elapsed < self.period:
+                    time.sleep(self.period - elapsed)
+            self.timestamps.append(time.time())
+
+
+# NOTE: Marks the end of a stage queue
+_STAGE_DONE = None
+
+_stats_lock = threading.Lock()
+
+
+def _count(stats, key):
+    with _stats_lock:
+        stats[key] += 1
+
+
+def _analyze_target(target, source, scan_profile, run_semgrep, detector_workers):
+    # NOTE: Imported in the worker, app.py imports netmap which imports this module
+    from app import analyze_source
+
+    start = time.time()
+    data = analyze_source(
+        target,
+        source,
+        scan_profile=scan_profile,
+        run_semgrep=run_semgrep,
+        detector_workers=detector_workers,
+    )
+    return data, time.time() - start
+
+
+def _log_pipeline_error(stage, target, error, ledger=None):
+    error_message = f"{datetime.now():%Y-%m-%d %H:%M:%S},{target},{stage}: {str(error)}"
+    print("Error run_pipeline():", error_message)
+    log_error_to_file(error_message)
+    if ledger:
+        state = ledger.fail(target, stage, error)
+        print(f"Ledger: {target} {state}")
+
+
+def _download_stage(pending, sources, limiter, stats, api_key, ledger=None):
+    from app import download_source
+
+    while True:
+        try:
+            target = pending.get_nowait()
+        except queue.Empty:
+            return
+
+        if check_if_source_exists(target):
+            print(f"Skipping {target}: session exists")
+            _count(stats, "skipped")
+            if ledger:
+                ledger.succeed(target)
+            continue
+
+        if ledger:
+            ledger.start(target)
+        limiter.wait()
+        start = time.time()
+        try:
+            source = download_source(target, api_key)
+        except Exception as e:
+            _log_pipeline_error("download", target, e, ledger)
+            _count(stats, "failed")
+            continue
+
+        stats["timings"][target] = {"download": time.time() - start}
+        # NOTE: Blocks while the analysis stage is busy, downloads never run far ahead of it
+        sources.put((target, source))
+
+
+def _analysis_stage(sources, results, workers, stats, scan_profile, run_semgrep, ledger=None):
+    from app import discard_source
+
+    context = multiprocessing.get_context("spawn")
+    pending = {}
+    # NOTE: Every worker forks its own detector processes, together they stay within the cpu count
+    detector_workers = max((os.cpu_count() or 1) // workers, 1)
+
+    def forward(done):
+        for future in done:
+            target, source = pending.pop(future)
+            try:
+                data, elapsed = future.result()
+            except Exception as e:
+                _log_pipeline_error("analysis", target, e, ledger)
+                _count(stats, "failed")
+                # NOTE: A retry downloads again, the partial session directory would be in its way
+                discard_source(source)
+                continue
+            stats["timings"][target]["analysis"] = elapsed
+            results.put((target, source, data))
+
+    def submit(executor, target, source):
+        try:
+            future = executor.submit(
+                _analyze_target, target, source, scan_profile, run_semgrep, detector_workers
+            )
+        except Exception as e:
+            # NOTE: A broken pool fails every remaining target, the queues still drain
+            _log_pipeline_error("analysis", target, e, ledger)
+            _count(stats, "failed")
+            discard_source(source)
+            return
+        pending[future] = (target, source)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            finished = False
+            while not finished or pending:
+                if not finished and len(pending) < workers:
+                    try:
+                        item = sources.get(timeout=0.5)
+                    except queue.Empty:
+                        item = False
+                    if item is _STAGE_DONE:
+                        finished = True
+                    elif item:
+                        submit(executor, *item)
+
+                if pending:
+                    # NOTE: Only blocks when the pool is full or nothing is left to submit
+                    done, _ = wait(
+                        pending,
+                        timeout=0 if not finished and len(pending) < workers else None,
+                        return_when=FIRST_COMPLETED,
+                    )
+                    forward(done)
+    finally:
+        results.put(_STAGE_DONE)
+
+
+def run_pipeline(
+    targets,
+    scan_profile=None,
+    semgrep_batch=False,
+    workers=None,
+    download_workers=DOWNLOAD_WORKERS,
+    api_key=None,
+    ledger=None,
+):
+    """
+    Builds sessions in this process without app.py: rate limited download threads, compile/analysis
+    in a process pool of workers processes, sessions written by this thread. Stages are connected
+    by bounded queues. Returns counts of written, skipped and failed targets.
+    With a BatchLedger every attempt, failure and the stage timings of written targets are recorded.
+    """
+    from app import write_session_data
+    from utils.detectors import DEFAULT_SCAN_PROFILE
+
+    if isinstance(targets, str):
+        targets = [targets]
+
+    workers = workers or os.cpu_count() or 1
+    scan_profile = scan_profile or DEFAULT_SCAN_PROFILE
+    run_semgrep = not semgrep_batch
+
+    pending = queue.Queue()
+    for target in dict.fromkeys(targets):
+        pending.put(target)
+    sources = queue.Queue(maxsize=workers * 2)
+    results = queue.Queue(maxsize=workers)
+    stats = {"written": 0, "skipped": 0, "failed": 0, "timings": {}}
+    limiter = RateLimiter(DOWNLOADS_PER_SECOND)
+
+    start = time.time()
+    downloaders = [
+        threading.Thread(
+            target=_download_stage,
+            args=(pending, sources, limiter, stats, api_key, ledger),
+            daemon=True,
+        )
+        for _ in range(max(download_workers, 1))
+    ]
+    analysis = threading.Thread(
+        target=_analysis_stage,
+        args=(sources, results, workers, stats, scan_profile, run_semgrep, ledger),
+        daemon=True,
+    )
+    for thread in downloaders + [analysis]:
+        thread.start()
+
+    def close_sources():
+        for thread in downloaders:
+            thread.join()
+        sources.put(_STAGE_DONE)
+
+    threading.Thread(target=close_sources, daemon=True).start()
+
+    # Write stage
+    while True:
+        item = results.get()
+        if item is _STAGE_DONE:
+            break
+        target, source, data = item
+        write_start = time.time()
+        try:
+            write_session_data(source, data)
+        except Exception as e:
+            _log_pipeline_error("write", target, e, ledger)
+            _count(stats, "failed")
+            continue
+        timings = stats["timings"][target]
+        timings["write"] = time.time() - write_start
+        timings["total"] = timings["download"] + timings["analysis"] + timings["write"]
+        if ledger:
+            ledger.succeed(target, timings)
+        stats["written"] += 1
+        print(f"Written {target} ({stats['written']} done)")
+
+    analysis.join()
+    print(
+        f"run_pipeline: {stats['written']} written, {stats['skipped']} skipped, "
+        f"{stats['failed']} failed in {time.time() - start:.1f}s"
+    )
+    return stats
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Run targets against the app and filter the results"
@@ -165,6 +512,64 @@ if __name__ == "__main__":
     parser.add_argument("--target", help="Single target to run against the app")
     parser.add_argument("--csv", help="CSV file containing targets")
     parser.add_argument("--crawl_level", help="Crawl the target", default=None)
+    parser.add_argument(
+        "--scan_profile",
+        help="Detectors to run: full, fast, high-impact-only or comma separated names",
+        default=None,
+    )
+    parser.add_argument(
+        "--semgrep_batch",
+        action="store_true",
+        help="Run semgrep once over all targets after the run instead of per target",
+    )
+    parser.add_argument(
+        "--jobs",
+        action="store_true",
+        help="Queue targets as app.py jobs instead of one blocking request per target",
+    )
+    parser.add_argument(
+        "--wait",
+        action="store_true",
+        help="With --jobs, wait until all queued jobs finished",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Build targets in this process (download, compile/analysis, write stages), app.py not needed",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Compile/analysis worker processes for --pipeline, defaults to cpu count",
+    )
+    parser.add_argument(
+        "--download_workers",
+        type=int,
+        default=DOWNLOAD_WORKERS,
+        help="Concurrent downloads for --pipeline",
+    )
+    parser.add_argument(
+        "--ledger",
+        default=LEDGER_DB_PATH,
+        help="Checkpoint database, a rerun skips finished targets and retries transient failures",
+    )
+    parser.add_argument(
+        "--max_attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help="Attempts per target before a transient failure is given up",
+    )
+    parser.add_argument(
+        "--retry_failed",
+        action="store_true",
+        help="Try permanently failed targets of the ledger again",
+    )
+    parser.add_argument(
+        "--no_ledger",
+        action="store_true",
+        help="Run every target, don't record or skip anything in the ledger",
+    )
     args = parser.parse_args()
 
     if args.target:
@@ -174,4 +579,49 @@ if __name__ == "__main__":
     else:
         targets = get_targets(args.bountyId)
 
-    run_analysis(targets, args.crawl_level)
+    ledger = None
+    if not args.no_ledger and not args.jobs:
+        ledger = BatchLedger(args.ledger, args.max_attempts)
+        if args.retry_failed:
+            ledger.reset(["failed_permanent"])
+
+    if args.pipeline:
+        if args.crawl_level:
+            print("--crawl_level is not supported with --pipeline, crawl afterwards through app.py")
+
+        def run_pass(batch):
+            run_pipeline(
+                batch,
+                args.scan_profile,
+                args.semgrep_batch,
+                args.workers,
+                args.download_workers,
+                ledger=ledger,
+            )
+
+        if ledger:
+            run_resumable(targets, ledger, run_pass)
+        else:
+            run_pass(targets)
+    elif args.jobs:
+        # NOTE: The semgrep batch needs the sessions, so it waits for the jobs
+        submit_jobs(
+            targets,
+            args.crawl_level,
+            args.scan_profile,
+            args.semgrep_batch,
+            wait=args.wait or args.semgrep_batch,
+        )
+    elif ledger:
+        run_resumable(
+            targets,
+            ledger,
+            lambda batch: run_analysis(
+                batch, args.crawl_level, args.scan_profile, args.semgrep_batch, ledger
+            ),
+        )
+    else:
+        run_analysis(targets, args.crawl_level, args.scan_profile, args.semgrep_batch)
+
+    if args.semgrep_batch:
+        run_semgrep_batch(targets)
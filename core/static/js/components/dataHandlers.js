@@ -9,6 +9,7 @@ import { initializeLoadData } from "./navigation.js";
 import {
   sortPath,
   getSessionData,
+  getStoredSessionData,
   initScanDropdowns,
   getTargetFromUrl,
 } from "./utils.js";
@@ -36,17 +37,23 @@ export function loadData() {
     window.history.pushState(path, "", `/?session_id=${path}`);
     initializeLoadData(path);
   } else {
-    fetch("/", {
-      method: "POST",
-      headers: {
-        "Content-Type": "application/x-www-form-urlencoded",
-      },
-      body:
-        "path=" +
-        encodeURIComponent(path) +
-        "&crawl=" +
-        encodeURIComponent(crawl),
-    })
+    const request =
+      sortPath(path) === "network_target"
+        ? runJob(path, crawl)
+        : fetch("/", {
+            method: "POST",
+            headers: {
+              "Content-Type": "application/x-www-form-urlencoded",
+            },
+            body:
+              "path=" +
+              encodeURIComponent(path) +
+              "&crawl=" +
+              encodeURIComponent(crawl) +
+              "&format=compact",
+          });
+
+    request
       .then((response) => {
         if (!response.ok) {
           return response.text().then((text) => {
@@ -55,9 +62,10 @@ export function loadData() {
         }
         return response.json();
       })
-      .then((data) => {
-        localStorage.setItem(path, JSON.stringify(data));
+      .then((compactData) => {
+        localStorage.setItem(path, JSON.stringify(compactData));
         window.history.pushState(path, "", `/?session_id=${path}`);
+        var data = getSessionData(path);
 
         displayScanResultsSection(data.scan_results);
         initScanDropdowns();
@@ -82,13 +90,70 @@ export function loadData() {
   }
 }
 
+// Builds run as server-side jobs (see /jobs in app.py), the request returns at once
+// and the job is polled until its session can be fetched
+const JOB_POLL_INTERVAL = 1000;
+
+function runJob(path, crawl) {
+  return fetch("/jobs", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({ path, crawl, kind: "compile" }),
+  })
+    .then((response) => {
+      if (!response.ok) {
+        return response.text().then((text) => {
+          throw new Error(text);
+        });
+      }
+      return response.json();
+    })
+    .then((job) => waitForJob(job.id));
+}
+
+function waitForJob(jobId) {
+  return fetch(`/jobs/${jobId}/result?format=compact`).then((response) => {
+    if (response.status !== 202) {
+      return response;
+    }
+    return new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL)).then(
+      () => waitForJob(jobId)
+    );
+  });
+}
+
+// Filters run against the server-side copy of the session, the stored session
+// is only posted when the server doesn't have it (404)
+function postFilter(url, searchCriteria, session_path, options = {}) {
+  const post = (body) =>
+    fetch(url, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify(body),
+    });
+
+  return post({ searchCriteria, path: session_path, ...options }).then((response) => {
+    if (response.status !== 404) {
+      return response.json();
+    }
+    // NOTE: Compact data is sent as stored, the server expands it
+    const sessionData = getStoredSessionData(session_path);
+    return post({ searchCriteria, sessionData, ...options }).then((fallback) =>
+      fallback.json()
+    );
+  });
+}
+
 export function filterData() {
   var form = document.getElementById("searchForm");
   var formData = new FormData(form);
   var searchCriteria = Object.fromEntries(formData.entries());
   const urlParams = new URLSearchParams(window.location.search);
   let session_path = urlParams.get("session_id");
-  var sessionData = getSessionData(session_path);
   // Ugly hack because we wrap everything in <form>> in html
   delete searchCriteria["findAction[]"];
   delete searchCriteria["findTarget[]"];
@@ -111,14 +176,8 @@ export function filterData() {
       searchCriteria[actionObj.action] = actionObj.targets;
     }
   });
-  fetch("/filter", {
-    method: "POST",
-    headers: {
-      "Content-Type": "application/json",
-    },
-    body: JSON.stringify({ searchCriteria, sessionData }),
-  })
-    .then((response) => response.json())
+  // NOTE: Server records are rendered as is, overloads and inherited copies share a canonical name
+  postFilter("/filter", searchCriteria, session_path)
     .then((data) => {
       document.getElementById("functionDisplay").innerHTML =
         createFunctionDataView(data);
@@ -135,16 +194,8 @@ export function filterScanResults() {
 
   const urlParams = new URLSearchParams(window.location.search);
   let session_path = urlParams.get("session_id");
-  var sessionData = getSessionData(session_path);
 
-  fetch("/filter_scan", {
-    method: "POST",
-    headers: {
-      "Content-Type": "application/json",
-    },
-    body: JSON.stringify({ searchCriteria, sessionData }),
-  })
-    .then((response) => response.json())
+  postFilter("/filter_scan", searchCriteria, session_path)
     .then((data) => {
       displayScanResultsSection(data);
       document.getElementById("scanResultsContainer").style.display = "block";
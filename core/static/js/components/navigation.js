@@ -5,10 +5,12 @@ import {
   createSourceCodeView,
 } from "./ui.js";
 
-import { initScanDropdowns } from "./utils.js";
+import { initScanDropdowns, getSessionData } from "./utils.js";
 
 export async function fetchSessionData(sessionPath) {
-  return fetch(`/get_session_data?path=${encodeURIComponent(sessionPath)}`)
+  return fetch(
+    `/get_session_data?path=${encodeURIComponent(sessionPath)}&format=compact`
+  )
     .then((response) => {
       if (!response.ok) {
         console.warn(`Could not fetch session data: ${response.statusText}`);
@@ -60,7 +62,9 @@ export function populateSessionStorageDropdown() {
   defaultOption.text = "available_contract_sources";
   select.appendChild(defaultOption);
 
-  fetch("/list_sessions")
+  fetch(
+    "/list_sessions?sort=directory&fields=directory,target,contract_name,function_count,findings_total"
+  )
     .then((response) => {
       if (!response.ok) {
         return response.text().then((text) => {
@@ -69,12 +73,11 @@ export function populateSessionStorageDropdown() {
       }
       return response.json();
     })
-    .then((directories) => {
-      Object.entries(directories).forEach(([directory]) => {
+    .then((sessions) => {
+      sessions.results.forEach((session) => {
         var option = document.createElement("option");
-        var parts = directory.split(":");
-        option.value = parts.slice(0, 2).join(":");
-        option.text = directory;
+        option.value = session.target;
+        option.text = `${session.directory} (${session.function_count} functions, ${session.findings_total} findings)`;
         select.appendChild(option);
       });
     })
@@ -92,7 +95,7 @@ export function initializePageWithData() {
   const sessionID = urlParams.get("session_id");
 
   if (sessionID) {
-    const sessionData = JSON.parse(localStorage.getItem(sessionID));
+    const sessionData = getSessionData(sessionID);
     if (sessionData) {
       // hljs.highlightAll();
       displayScanResultsSection(sessionData.scan_results);
@@ -116,7 +119,7 @@ export function initializePageWithData() {
 }
 
 export function initializeLoadData(path) {
-  const localData = JSON.parse(localStorage.getItem(path));
+  const localData = getSessionData(path);
   console.log("Local data found for ID:", path, localData);
   if (localData) {
     displayScanResultsSection(localData.scan_results);
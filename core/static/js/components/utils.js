@@ -19,10 +19,74 @@ export const SUPPORTED_NETWORKS = {
   "polyzk:": "zkevm.polygonscan.com",
 };
 
+// Sessions are stored in localStorage in the compact format (see core/utils/compact.py),
+// expanded copies are kept per session so repeated lookups don't re-resolve every span
+const expandedSessions = {};
+
 export function getSessionData(session_path) {
+  const raw = localStorage.getItem(session_path);
+  if (raw === null) {
+    return null;
+  }
+
+  const cached = expandedSessions[session_path];
+  if (cached && cached.raw === raw) {
+    return cached.data;
+  }
+
+  const data = expandSession(JSON.parse(raw));
+  expandedSessions[session_path] = { raw, data };
+  return data;
+}
+
+export function getStoredSessionData(session_path) {
   return JSON.parse(localStorage.getItem(session_path));
 }
 
+function resolveCompactValue(value, sources, strings) {
+  if (Array.isArray(value)) {
+    return value.map((item) => resolveCompactValue(item, sources, strings));
+  }
+  if (value === null || typeof value !== "object") {
+    return value;
+  }
+
+  const keys = Object.keys(value);
+  if (keys.length === 1) {
+    if (keys[0] === "$lit") {
+      const literal = {};
+      for (const key of Object.keys(value.$lit)) {
+        literal[key] = resolveCompactValue(value.$lit[key], sources, strings);
+      }
+      return literal;
+    }
+    if (keys[0] === "$s") {
+      const [index, start, length, padding] = value.$s;
+      const text = sources[index].slice(start, start + length);
+      return padding ? " ".repeat(padding) + text : text;
+    }
+    if (keys[0] === "$t") {
+      return strings[value.$t];
+    }
+    if (keys[0] === "$f") {
+      return sources[value.$f];
+    }
+  }
+
+  const resolved = {};
+  for (const key of keys) {
+    resolved[key] = resolveCompactValue(value[key], sources, strings);
+  }
+  return resolved;
+}
+
+export function expandSession(data) {
+  if (!data || data.format !== "compact") {
+    return data;
+  }
+  return resolveCompactValue(data.data, data.sources, data.strings);
+}
+
 export function isValidHttpUrl(string) {
   let url;
 
@@ -0,0 +1,154 @@
+import os
+import json
+import hashlib
+import subprocess
+import threading
+from pathlib import Path
+from crytic_compile import CryticCompile
+from crytic_compile.utils.zip import load_from_zip, save_to_zip
+
+"""
+Content-addressed cache of crytic-compile outputs
+
+Compilations are stored as crytic-compile archives in files/out/.compilations/<key>.zip,
+key is a sha256 of all *.sol sources of the target, the solc version and the crytic config.
+"""
+
+utils_dir = os.path.dirname(os.path.realpath(__file__))
+core_dir = os.path.dirname(utils_dir)
+COMPILATION_CACHE_DIR = os.path.join(core_dir, "files", "out", ".compilations")
+
+# NOTE: Bump when the archive layout changes so old entries are never loaded
+COMPILATION_CACHE_VERSION = "1"
+
+
+def load_slither_config(config_dir: str = None) -> dict:
+    """
+    Returns slither.config.json of the session directory, empty config without config_dir.
+    """
+    if not config_dir:
+        return {}
+
+    with open(os.path.join(config_dir, "slither.config.json"), "r") as config_file:
+        return json.loads(config_file.read())
+
+
+def get_compile_kwargs(config: dict, config_dir: str = None) -> dict:
+    """
+    Returns crytic-compile arguments for the target, the config with the session directory as working directory
+    of crytic-compile and solc, relative remappings resolve without changing the process working directory.
+    """
+    if not config_dir:
+        return dict(config)
+    config_dir = os.path.realpath(config_dir)
+    return {**config, "cwd": config_dir, "solc_working_dir": config_dir}
+
+
+def get_solc_version(config: dict) -> str:
+    """
+    Returns the solc version used for the compilation.
+    Prefers the version pinned in crytic config, falls back to SOLC_VERSION and `solc --version`.
+    """
+    version = config.get("solc_solcs_select") or os.environ.get("SOLC_VERSION")
+    if version:
+        return version
+
+    try:
+        result = subprocess.run(
+            ["solc", "--version"], capture_output=True, text=True, check=True
+        )
+        return result.stdout.strip().splitlines()[-1]
+    except Exception:
+        return ""
+
+
+def get_source_root(target_compile: str, config_dir: str = None) -> str:
+    """
+    Returns the directory holding all sources of the target.
+    """
+    if config_dir:
+        return os.path.realpath(config_dir)
+    if os.path.isdir(target_compile):
+        return os.path.realpath(target_compile)
+    return os.path.dirname(os.path.realpath(target_compile))
+
+
+def get_compilation_key(
+    target_compile: str, config: dict, config_dir: str = None
+) -> str:
+    """
+    Hashes the target path, every *.sol file under the source root, the solc version and crytic config.
+    """
+    source_root = get_source_root(target_compile, config_dir)
+    digest = hashlib.sha256()
+    digest.update(COMPILATION_CACHE_VERSION.encode())
+
+    # NOTE: Archives reference sources by absolute path, same sources moved elsewhere are a miss
+    digest.update(os.path.realpath(target_compile).encode())
+    digest.update(get_solc_version(config).encode())
+    digest.update(json.dumps(config, sort_keys=True).encode())
+
+    for source_file in sorted(Path(source_root).rglob("*.sol")):
+        digest.update(str(source_file.relative_to(source_root)).encode())
+        digest.update(source_file.read_bytes())
+
+    return digest.hexdigest()
+
+
+def get_compilation_cache_path(key: str) -> str:
+    return os.path.join(COMPILATION_CACHE_DIR, f"{key}.zip")
+
+
+def load_compilation(key: str):
+    """
+    Returns the cached CryticCompile object for the key, otherwise returns None.
+    """
+    cache_path = get_compilation_cache_path(key)
+    if not os.path.isfile(cache_path):
+        return None
+
+    try:
+        compilations = load_from_zip(cache_path)
+    except Exception as e:
+        print(f"load_compilation: corrupted cache entry {cache_path}: {e}")
+        os.remove(cache_path)
+        return None
+
+    return compilations[0] if compilations else None
+
+
+def save_compilation(key: str, compilation: CryticCompile):
+    """
+    Stores the compilation under the key, write is atomic so parallel compiles can't corrupt an entry.
+    """
+    os.makedirs(COMPILATION_CACHE_DIR, exist_ok=True)
+    cache_path = get_compilation_cache_path(key)
+    # NOTE: Unique per thread too, builds of one process compile the same sources concurrently
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        save_to_zip([compilation], tmp_path)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"save_compilation: failed to cache compilation {key}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def get_cached_compilation(
+    target_compile: str, config: dict, config_dir: str = None, key: str = None
+) -> CryticCompile:
+    """
+    Returns CryticCompile object for the target, compiles with solc only on a cache miss.
+    """
+    key = key or get_compilation_key(target_compile, config, config_dir)
+    compilation = load_compilation(key)
+
+    if compilation is not None:
+        print(f"Compilation cache hit: {key[:12]}")
+        return compilation
+
+    print(f"Compilation cache miss: {key[:12]}")
+    compilation = CryticCompile(target_compile, **get_compile_kwargs(config, config_dir))
+    save_compilation(key, compilation)
+    return compilation
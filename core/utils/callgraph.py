@@ -0,0 +1,97 @@
+from typing import Dict, List, Optional, Set, Tuple
+from slither.core.declarations import Function
+from slither.tools.possible_paths.possible_paths import all_function_definitions
+
+"""
+Reverse call graph of a compilation unit, built once per AnalyticsClass.run_analysis
+
+find_target_paths() scans every function of every contract on each recursion step,
+CallGraphIndex keeps the same walk but only visits the callers of the current target.
+Results are identical to slither.tools.possible_paths.possible_paths.find_target_paths
+"""
+
+
+class CallGraphIndex:
+    def __init__(self, slither):
+        self.slither = slither
+
+        # position of a function in the find_target_paths scan order
+        self.function_order: Dict[Function, int] = {}
+
+        # callee -> callers, callers kept in scan order
+        self.callers: Dict[Function, List[Function]] = {}
+
+        # function -> function + base definitions
+        self.definitions: Dict[Function, Set[Function]] = {}
+
+        self.build()
+
+    def build(self):
+        for contract in self.slither.contracts:
+            for function in contract.functions_and_modifiers_declared:
+                # NOTE: Same function may be listed by multiple contracts, keep the first position
+                if function in self.function_order:
+                    continue
+                self.function_order[function] = len(self.function_order)
+
+                # Same call set as possible_paths.__find_target_paths (except for low level)
+                called_functions_list = [
+                    f for (_, f) in function.high_level_calls if isinstance(f, Function)
+                ]
+                called_functions_list += [f for (_, f) in function.library_calls]
+                called_functions_list += [
+                    f for f in function.internal_calls if isinstance(f, Function)
+                ]
+
+                for called_function in set(called_functions_list):
+                    self.callers.setdefault(called_function, []).append(function)
+
+    def get_definitions(self, function: Function) -> Set[Function]:
+        if function not in self.definitions:
+            self.definitions[function] = set(all_function_definitions(function))
+        return self.definitions[function]
+
+    def get_callers(self, function: Function) -> List[Function]:
+        """
+        Returns all functions calling the function or any of its base definitions, in scan order.
+        """
+        callers = {
+            caller
+            for definition in self.get_definitions(function)
+            for caller in self.callers.get(definition, [])
+        }
+        return sorted(callers, key=self.function_order.get)
+
+    def _find_target_paths(
+        self, target_function: Function, current_path: Optional[List[Function]] = None
+    ) -> Set[Tuple[Function, ...]]:
+        current_path = current_path if current_path else []
+        results: Set[Tuple[Function, ...]] = set()
+
+        current_path = [target_function] + current_path
+
+        for function in self.get_callers(target_function):
+            if function in current_path:
+                continue
+
+            path_results = self._find_target_paths(function, current_path.copy())
+            if path_results:
+                results = results.union(path_results)
+
+        if target_function.visibility in ["public", "external"] and len(current_path) > 1:
+            results.add(tuple(current_path))
+
+        return results
+
+    def find_target_paths(
+        self, target_functions: List[Function]
+    ) -> Set[Tuple[Function, ...]]:
+        """
+        Drop-in replacement for possible_paths.find_target_paths using the prebuilt index.
+        """
+        results: Set[Tuple[Function, ...]] = set()
+
+        for target_function in target_functions:
+            results = results.union(self._find_target_paths(target_function))
+
+        return results
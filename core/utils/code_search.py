@@ -0,0 +1,291 @@
+import os
+import re
+import sqlite3
+from typing import List
+
+from utils.data import files_dir, find_all_session_data_paths, load_source
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+"""
+Trigram code search over function bodies and source files of every session in files/out
+
+Documents are kept in an SQLite FTS5 table with the trigram tokenizer (files/out/.search/code_search.db).
+A search takes the literal parts of the pattern (the pattern itself for substring searches) as trigram
+queries to select candidate documents, only candidates are matched with the regex to produce line hits.
+Sessions are (re)indexed when generate_session_data writes them, update_index() catches up on the rest.
+"""
+
+SEARCH_DIR = os.path.join(files_dir, ".search")
+SEARCH_DB_PATH = os.path.join(SEARCH_DIR, "code_search.db")
+
+SEARCH_KINDS = ["function", "source"]
+DEFAULT_SEARCH_LIMIT = 100
+
+# FTS5 trigram queries need at least 3 characters
+MIN_TRIGRAM_LITERAL = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session TEXT PRIMARY KEY,
+    session_data_path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT,
+    first_line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_session ON documents (session);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_text USING fts5(body, tokenize='trigram');
+"""
+
+
+def connect(db_path: str = SEARCH_DB_PATH) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def get_session_name(session_data_path: str) -> str:
+    return os.path.basename(os.path.dirname(os.path.realpath(session_data_path)))
+
+
+def get_session_documents(data: dict) -> List[tuple]:
+    """
+    Returns (kind, name, path, first_line, body) of every function and source file of a session.
+    """
+    source_code = data.get("source_code", {})
+    documents = []
+
+    for function in data.get("functions_data", []):
+        body = function.get("function_body")
+        if not body:
+            continue
+        contract_name = function.get("contract_name")
+        line_numbers = function.get("line_numbers") or [1]
+        documents.append(
+            (
+                "function",
+                function.get("function_canonical_name") or function.get("function_full_name", ""),
+                source_code.get(contract_name, {}).get("path"),
+                line_numbers[0],
+                body,
+            )
+        )
+
+    # NOTE: Contracts declared in the same file share one source document
+    seen_paths = set()
+    for contract_name, source in source_code.items():
+        path = source.get("path")
+        if path in seen_paths or not source.get("source_code"):
+            continue
+        seen_paths.add(path)
+        documents.append(("source", contract_name, path, 1, source["source_code"]))
+
+    return documents
+
+
+def _remove_session(connection: sqlite3.Connection, session: str):
+    connection.execute(
+        "DELETE FROM documents_text WHERE rowid IN (SELECT id FROM documents WHERE session = ?)",
+        (session,),
+    )
+    connection.execute("DELETE FROM documents WHERE session = ?", (session,))
+    connection.execute("DELETE FROM sessions WHERE session = ?", (session,))
+
+
+def index_session(session_data_path: str, data: dict = None, db_path: str = SEARCH_DB_PATH):
+    """
+    Replaces the documents of one session in the index, data is loaded from session_data_path when not given.
+    """
+    session = get_session_name(session_data_path)
+    stat = os.stat(session_data_path)
+    if data is None:
+        data = load_source(session_data_path)
+
+    connection = connect(db_path)
+    try:
+        with connection:
+            _remove_session(connection, session)
+            for kind, name, path, first_line, body in get_session_documents(data):
+                cursor = connection.execute(
+                    "INSERT INTO documents (session, kind, name, path, first_line) VALUES (?, ?, ?, ?, ?)",
+                    (session, kind, name, path, first_line),
+                )
+                connection.execute(
+                    "INSERT INTO documents_text (rowid, body) VALUES (?, ?)",
+                    (cursor.lastrowid, body),
+                )
+            connection.execute(
+                "INSERT INTO sessions (session, session_data_path, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                (session, os.path.realpath(session_data_path), stat.st_mtime_ns, stat.st_size),
+            )
+    finally:
+        connection.close()
+
+
+def update_index(rebuild: bool = False, db_path: str = SEARCH_DB_PATH) -> int:
+    """
+    Indexes sessions that are new or changed since they were indexed and drops deleted ones.
+    Returns the count of (re)indexed sessions.
+    """
+    session_data_paths = {
+        get_session_name(path): path for path in find_all_session_data_paths()
+    }
+
+    connection = connect(db_path)
+    try:
+        with connection:
+            if rebuild:
+                connection.execute("DELETE FROM documents_text")
+                connection.execute("DELETE FROM documents")
+                connection.execute("DELETE FROM sessions")
+
+            indexed = {
+                session: (mtime_ns, size)
+                for session, mtime_ns, size in connection.execute(
+                    "SELECT session, mtime_ns, size FROM sessions"
+                )
+            }
+            for session in indexed.keys() - session_data_paths.keys():
+                _remove_session(connection, session)
+    finally:
+        connection.close()
+
+    updated = 0
+    for session, session_data_path in session_data_paths.items():
+        stat = os.stat(session_data_path)
+        if indexed.get(session) == (stat.st_mtime_ns, stat.st_size):
+            continue
+        try:
+            index_session(session_data_path, db_path=db_path)
+            updated += 1
+        except Exception as e:
+            print(f"update_index: failed to index {session_data_path}: {e}")
+
+    return updated
+
+
+def _literal_runs(parsed) -> List[str]:
+    """
+    Returns runs of literal characters every match of the parsed pattern must contain.
+    Only top-level literals are used, anything optional or alternative ends a run.
+    """
+    runs = []
+    current = []
+
+    for op, value in parsed:
+        if op == sre_parse.LITERAL:
+            current.append(chr(value))
+            continue
+        if op == sre_parse.SUBPATTERN:
+            runs.extend(_literal_runs(value[-1]))
+        elif op == sre_parse.MAX_REPEAT or op == sre_parse.MIN_REPEAT:
+            minimum, _, item = value
+            if minimum > 0:
+                runs.extend(_literal_runs(item))
+        runs.append("".join(current))
+        current = []
+
+    runs.append("".join(current))
+    return [run for run in runs if run]
+
+
+def get_required_literals(pattern: str, regex: bool = False) -> List[str]:
+    if not regex:
+        return [pattern]
+    try:
+        return _literal_runs(sre_parse.parse(pattern))
+    except Exception:
+        return []
+
+
+def _match_query(literals: List[str]) -> str:
+    terms = [
+        '"' + literal.replace('"', '""') + '"'
+        for literal in literals
+        if len(literal) >= MIN_TRIGRAM_LITERAL
+    ]
+    return " AND ".join(terms)
+
+
+def search(
+    pattern: str,
+    regex: bool = False,
+    ignore_case: bool = False,
+    kind: str = None,
+    session: str = None,
+    limit: int = DEFAULT_SEARCH_LIMIT,
+    db_path: str = SEARCH_DB_PATH,
+) -> List[dict]:
+    """
+    Returns line hits of a substring (or regex) search over all indexed sessions.
+    Each hit: session, kind, name, path, line, text. Raises re.error for invalid regexes.
+    """
+    expression = re.compile(
+        pattern if regex else re.escape(pattern), re.IGNORECASE if ignore_case else 0
+    )
+    match_query = _match_query(get_required_literals(pattern, regex))
+
+    query = (
+        "SELECT documents.session, documents.kind, documents.name, documents.path, "
+        "documents.first_line, documents_text.body FROM documents "
+        "JOIN documents_text ON documents_text.rowid = documents.id"
+    )
+    conditions, parameters = [], []
+    if match_query:
+        conditions.append("documents_text MATCH ?")
+        parameters.append(match_query)
+    if kind:
+        conditions.append("documents.kind = ?")
+        parameters.append(kind)
+    if session:
+        conditions.append("documents.session = ?")
+        parameters.append(session)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY documents.id"
+
+    hits = []
+    connection = connect(db_path)
+    try:
+        for session_name, document_kind, name, path, first_line, body in connection.execute(
+            query, parameters
+        ):
+            lines = None
+            line_index, position, last_line = 0, 0, None
+            for match in expression.finditer(body):
+                line_index += body.count("\n", position, match.start())
+                position = match.start()
+                if line_index == last_line:
+                    continue
+                last_line = line_index
+
+                if lines is None:
+                    lines = body.split("\n")
+                hits.append(
+                    {
+                        "session": session_name,
+                        "kind": document_kind,
+                        "name": name,
+                        "path": path,
+                        "line": first_line + line_index,
+                        "text": lines[line_index].strip(),
+                    }
+                )
+                if limit and len(hits) >= limit:
+                    return hits
+    finally:
+        connection.close()
+
+    return hits
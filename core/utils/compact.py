@@ -0,0 +1,174 @@
+"""
+Compact sessionData format
+
+{"format": "compact", "version": 2, "sources": [...], "strings": [...], "data": {...}}
+
+sources: every source file text once, source_code entries point to it with {"$f": index}
+strings: long strings not found in any source file, stored once and referenced with {"$t": index}
+spans: long strings found in a source file (function_body, modifiers_body, expressions, variable_body...)
+       are stored as {"$s": [source, start, length]} or {"$s": [source, start, length, padding]},
+       padding is the count of leading spaces (_get_source_code adds starting_column spaces)
+literals: dicts of the data whose only key is a reference key are stored as {"$lit": dict}
+
+Offsets are str indices, sources with characters outside the BMP are never used for spans
+so the same offsets work with JavaScript (UTF-16) String.slice in the browser.
+"""
+
+COMPACT_FORMAT = "compact"
+COMPACT_VERSION = 2
+
+REFERENCE_KEYS = ("$s", "$t", "$f", "$lit")
+
+# Shorter strings are kept inline, a span reference is ~20 bytes
+MIN_SPAN_LENGTH = 48
+
+# NOTE: Sources are indexed by GRAM_LENGTH characters at every GRAM_STEP-th offset, every occurrence
+# of a string of at least GRAM_STEP + GRAM_LENGTH - 1 characters covers one indexed offset
+GRAM_LENGTH = 16
+GRAM_STEP = 16
+
+
+def is_compact(data) -> bool:
+    return isinstance(data, dict) and data.get("format") == COMPACT_FORMAT
+
+
+def _has_non_bmp(text: str) -> bool:
+    return any(ord(char) > 0xFFFF for char in text)
+
+
+class _Compactor:
+    def __init__(self):
+        self.sources = []
+        self.source_index = {}
+        self.grams = {}
+        self.strings = []
+        self.string_index = {}
+        self.encoded = {}
+
+    def add_source(self, text: str) -> int:
+        if text not in self.source_index:
+            self.source_index[text] = len(self.sources)
+            if not _has_non_bmp(text):
+                for offset in range(0, len(text) - GRAM_LENGTH + 1, GRAM_STEP):
+                    self.grams.setdefault(text[offset : offset + GRAM_LENGTH], []).append(
+                        (len(self.sources), offset)
+                    )
+            self.sources.append(text)
+        return self.source_index[text]
+
+    def find_span(self, text: str):
+        """
+        Returns (source, start) of an occurrence of text in the indexed sources, None if there is none.
+        """
+        if len(text) < GRAM_STEP + GRAM_LENGTH - 1:
+            return None
+        for shift in range(GRAM_STEP):
+            for index, offset in self.grams.get(text[shift : shift + GRAM_LENGTH], ()):
+                start = offset - shift
+                if start >= 0 and self.sources[index].startswith(text, start):
+                    return index, start
+        return None
+
+    def encode_string(self, value: str):
+        if len(value) < MIN_SPAN_LENGTH:
+            return value
+
+        if value not in self.encoded:
+            stripped = value.lstrip(" ")
+            padding = len(value) - len(stripped)
+
+            found = self.find_span(stripped)
+            if found:
+                span = [*found, len(stripped)]
+                if padding:
+                    span.append(padding)
+                self.encoded[value] = {"$s": span}
+            else:
+                if value not in self.string_index:
+                    self.string_index[value] = len(self.strings)
+                    self.strings.append(value)
+                self.encoded[value] = {"$t": self.string_index[value]}
+
+        return self.encoded[value]
+
+    def encode(self, value):
+        if isinstance(value, str):
+            return self.encode_string(value)
+        if isinstance(value, dict):
+            encoded = {key: self.encode(item) for key, item in value.items()}
+            if len(value) == 1 and next(iter(value)) in REFERENCE_KEYS:
+                return {"$lit": encoded}
+            return encoded
+        if isinstance(value, list):
+            return [self.encode(item) for item in value]
+        return value
+
+
+def compact_session(data: dict) -> dict:
+    """
+    Converts regular (or already compact) session data into the compact format.
+    """
+    if is_compact(data):
+        return data
+
+    compactor = _Compactor()
+    source_code = data.get("source_code", {})
+
+    # NOTE: Sources go first so every body can be found in them
+    compacted_source_code = {}
+    for name, entry in source_code.items():
+        compacted_entry = {
+            key: compactor.encode(value)
+            for key, value in entry.items()
+            if key != "source_code"
+        }
+        compacted_entry["source_code"] = {"$f": compactor.add_source(entry["source_code"])}
+        compacted_source_code[name] = compacted_entry
+
+    body = {
+        key: compacted_source_code if key == "source_code" else compactor.encode(value)
+        for key, value in data.items()
+    }
+
+    return {
+        "format": COMPACT_FORMAT,
+        "version": COMPACT_VERSION,
+        "sources": compactor.sources,
+        "strings": compactor.strings,
+        "data": body,
+    }
+
+
+def resolve_value(value, sources: list, strings: list):
+    """
+    Resolves span/string/source references (and literals) in any part of compact data.
+    """
+    if isinstance(value, dict):
+        if len(value) == 1:
+            if "$lit" in value:
+                return {
+                    key: resolve_value(item, sources, strings)
+                    for key, item in value["$lit"].items()
+                }
+            if "$s" in value:
+                index, start, length, *padding = value["$s"]
+                text = sources[index][start : start + length]
+                return " " * padding[0] + text if padding else text
+            if "$t" in value:
+                return strings[value["$t"]]
+            if "$f" in value:
+                return sources[value["$f"]]
+        return {key: resolve_value(item, sources, strings) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_value(item, sources, strings) for item in value]
+    return value
+
+
+def expand_session(data: dict) -> dict:
+    """
+    Converts compact session data back into the regular format, regular data is returned as is.
+    The whole tree is resolved at once, the expanded data shares no state with the compact one.
+    """
+    if not is_compact(data):
+        return data
+    return resolve_value(data["data"], data["sources"], data["strings"])
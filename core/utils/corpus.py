@@ -0,0 +1,516 @@
+import os
+import json
+import sqlite3
+from typing import List, Tuple
+
+from utils.data import files_dir, find_all_session_data_paths, load_source
+from utils.code_search import get_session_name, index_session
+from utils.query_index import FLAG_CRITERIA, MEMBER_CRITERIA
+
+"""
+Cross-session SQLite database of function, variable, contract and scan records (files/out/.search/corpus.db)
+
+Every session is loaded into plain tables with one row per record, list fields used by searchCriteria
+(state variables, modifiers, external contracts, calls) go to indexed relation tables. Sessions are
+(re)loaded when generate_session_data writes them, update_corpus() catches up on the rest.
+query_corpus() answers the searchCriteria vocabulary of filter_functions/filter_results over all sessions,
+the file is also meant to be opened directly with datasette.
+"""
+
+CORPUS_DB_PATH = os.path.join(files_dir, ".search", "corpus.db")
+CORPUS_TABLES = ["functions", "scan_results"]
+DEFAULT_CORPUS_LIMIT = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session TEXT PRIMARY KEY,
+    session_data_path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    network TEXT,
+    address TEXT,
+    contract_name TEXT,
+    scan_profile TEXT
+);
+CREATE TABLE IF NOT EXISTS contracts (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    contract_name TEXT NOT NULL,
+    is_root INTEGER NOT NULL,
+    is_upgradeable INTEGER,
+    immediate_inheritance TEXT,
+    events TEXT,
+    structures TEXT,
+    ercs TEXT
+);
+CREATE TABLE IF NOT EXISTS functions (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    contract_name TEXT,
+    function_full_name TEXT,
+    function_canonical_name TEXT,
+    function_selector TEXT,
+    visibility TEXT,
+    priority INTEGER,
+    has_modifiers INTEGER,
+    has_internal_calls INTEGER,
+    has_external_calls INTEGER,
+    contract_inherited INTEGER,
+    contains_asm INTEGER,
+    low_level_calls INTEGER,
+    cyclomatic_complexity INTEGER,
+    first_line INTEGER,
+    last_line INTEGER,
+    function_body TEXT
+);
+CREATE TABLE IF NOT EXISTS function_state_vars (
+    function_id INTEGER NOT NULL,
+    variable TEXT NOT NULL,
+    access TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS function_modifiers (
+    function_id INTEGER NOT NULL,
+    modifier TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS function_external_calls (
+    function_id INTEGER NOT NULL,
+    contract TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS function_calls (
+    function_id INTEGER NOT NULL,
+    callee TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS variables (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    contract_name TEXT,
+    variable_name TEXT,
+    variable_canonical_name TEXT,
+    variable_type TEXT,
+    variable_visibility TEXT,
+    variable_is_constant INTEGER,
+    variable_is_immutable INTEGER,
+    variable_body TEXT
+);
+CREATE TABLE IF NOT EXISTS scan_results (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    tool TEXT,
+    check_name TEXT,
+    impact TEXT,
+    confidence TEXT,
+    contract TEXT,
+    full_name TEXT,
+    path TEXT,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS contracts_session ON contracts (session);
+CREATE INDEX IF NOT EXISTS functions_session ON functions (session, function_full_name);
+CREATE INDEX IF NOT EXISTS functions_visibility ON functions (visibility, priority);
+CREATE INDEX IF NOT EXISTS functions_contract ON functions (contract_name);
+CREATE INDEX IF NOT EXISTS function_state_vars_variable ON function_state_vars (variable, access);
+CREATE INDEX IF NOT EXISTS function_state_vars_function ON function_state_vars (function_id);
+CREATE INDEX IF NOT EXISTS function_modifiers_modifier ON function_modifiers (modifier);
+CREATE INDEX IF NOT EXISTS function_modifiers_function ON function_modifiers (function_id);
+CREATE INDEX IF NOT EXISTS function_external_calls_contract ON function_external_calls (contract);
+CREATE INDEX IF NOT EXISTS function_external_calls_function ON function_external_calls (function_id);
+CREATE INDEX IF NOT EXISTS function_calls_callee ON function_calls (callee);
+CREATE INDEX IF NOT EXISTS function_calls_function ON function_calls (function_id);
+CREATE INDEX IF NOT EXISTS variables_session ON variables (session);
+CREATE INDEX IF NOT EXISTS variables_name ON variables (variable_name);
+CREATE INDEX IF NOT EXISTS scan_results_session ON scan_results (session, full_name);
+CREATE INDEX IF NOT EXISTS scan_results_impact ON scan_results (impact, check_name);
+"""
+
+# searchCriteria flag -> functions column (see FLAG_CRITERIA in utils/query_index.py)
+FLAG_COLUMNS = {
+    "hasModifiers": "has_modifiers",
+    "hasInternalCalls": "has_internal_calls",
+    "hasExternalCalls": "has_external_calls",
+    "isInheritedFunction": "contract_inherited",
+    "containsAsm": "contains_asm",
+    "lowLvlCall": "low_level_calls",
+}
+
+# searchCriteria key -> (relation table, column, extra condition)
+RELATION_CRITERIA = {
+    "writing_to": ("function_state_vars", "variable", "access = 'write'"),
+    "reading_from": ("function_state_vars", "variable", "access = 'read'"),
+    "with_modifier": ("function_modifiers", "modifier", None),
+    "calling_external_contract": ("function_external_calls", "contract", None),
+    "find_target_reachable": ("function_calls", "callee", None),
+}
+
+FUNCTION_COLUMNS = (
+    "functions.session, functions.contract_name, functions.function_full_name, "
+    "functions.function_canonical_name, functions.function_selector, functions.visibility, "
+    "functions.priority, functions.first_line, functions.last_line"
+)
+
+SCAN_COLUMNS = (
+    "session, tool, check_name AS 'check', impact, confidence, contract, full_name, path, description"
+)
+
+
+def connect(db_path: str = CORPUS_DB_PATH) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def _as_list(value) -> list:
+    # NOTE: The UI sends lists, a single value is accepted from API callers
+    return value if isinstance(value, list) else [value]
+
+
+def _member_condition(column: str, wanted) -> Tuple[str, list]:
+    """
+    Same matching as SessionIndex.lookup: a list matches values equal to one of its items,
+    a string matches values contained in it.
+    """
+    if isinstance(wanted, str):
+        return f"instr(?, {column}) > 0", [wanted]
+    return f"{column} IN ({', '.join(['?'] * len(wanted))})", list(wanted)
+
+
+def _remove_session(connection: sqlite3.Connection, session: str):
+    function_ids = "SELECT id FROM functions WHERE session = ?"
+    for table in ["function_state_vars", "function_modifiers", "function_external_calls", "function_calls"]:
+        connection.execute(f"DELETE FROM {table} WHERE function_id IN ({function_ids})", (session,))
+    for table in ["functions", "variables", "contracts", "scan_results", "sessions"]:
+        connection.execute(f"DELETE FROM {table} WHERE session = ?", (session,))
+
+
+def _insert_function(connection: sqlite3.Connection, session: str, function: dict):
+    line_numbers = function.get("line_numbers") or [None, None]
+    cursor = connection.execute(
+        "INSERT INTO functions (session, contract_name, function_full_name, function_canonical_name, "
+        "function_selector, visibility, priority, has_modifiers, has_internal_calls, has_external_calls, "
+        "contract_inherited, contains_asm, low_level_calls, cyclomatic_complexity, first_line, last_line, "
+        "function_body) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            session,
+            function.get("contract_name"),
+            function.get("function_full_name"),
+            function.get("function_canonical_name"),
+            function.get("function_selector"),
+            function.get("visibility"),
+            function.get("priority"),
+            # NOTE: FLAG_COLUMNS follows the column order of the functions table
+            *[bool(function.get(FLAG_CRITERIA[criterion])) for criterion in FLAG_COLUMNS],
+            function.get("cyclomatic_complexity"),
+            line_numbers[0],
+            line_numbers[-1],
+            function.get("function_body"),
+        ),
+    )
+    function_id = cursor.lastrowid
+
+    relations = [
+        ("function_state_vars", [(var, "read") for var in function.get("state_vars_read") or []]),
+        ("function_state_vars", [(var, "write") for var in function.get("state_vars_written") or []]),
+        ("function_modifiers", [(modifier,) for modifier in function.get("modifiers") or []]),
+        ("function_external_calls", [(contract,) for contract in function.get("external_calls") or []]),
+        (
+            "function_calls",
+            [
+                (callee,)
+                for callee in set(function.get("internal_calls") or [])
+                | set(function.get("external_calls_functions") or [])
+            ],
+        ),
+    ]
+    for table, rows in relations:
+        rows = [row for row in rows if isinstance(row[0], str)]
+        if rows:
+            placeholders = ", ".join(["?"] * (len(rows[0]) + 1))
+            connection.executemany(
+                f"INSERT INTO {table} VALUES ({placeholders})",
+                [(function_id, *row) for row in rows],
+            )
+
+
+def load_session(session_data_path: str, data: dict = None, db_path: str = CORPUS_DB_PATH):
+    """
+    Replaces the records of one session in the corpus, data is loaded from session_data_path when not given.
+    """
+    session = get_session_name(session_data_path)
+    stat = os.stat(session_data_path)
+    if data is None:
+        data = load_source(session_data_path)
+
+    network_info = data.get("network_info", {})
+    root_contract = network_info.get("contract_name")
+
+    connection = connect(db_path)
+    try:
+        with connection:
+            _remove_session(connection, session)
+            connection.execute(
+                "INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    session,
+                    os.path.realpath(session_data_path),
+                    stat.st_mtime_ns,
+                    stat.st_size,
+                    network_info.get("contract_network"),
+                    network_info.get("contract_address"),
+                    root_contract,
+                    data.get("scan_profile"),
+                ),
+            )
+
+            # NOTE: contracts_data (all_contracts sessions) holds one analysis section per contract
+            contracts = {
+                name: section.get("contract_data") or {}
+                for name, section in (data.get("contracts_data") or {}).items()
+            }
+            if data.get("contract_data"):
+                contracts[data["contract_data"].get("contract_name")] = data["contract_data"]
+            for contract_name, contract in contracts.items():
+                connection.execute(
+                    "INSERT INTO contracts (session, contract_name, is_root, is_upgradeable, "
+                    "immediate_inheritance, events, structures, ercs) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        session,
+                        contract_name,
+                        contract_name == root_contract,
+                        contract.get("is_upgradeable"),
+                        json.dumps(contract.get("immediate_inheritance", [])),
+                        json.dumps(contract.get("events", [])),
+                        json.dumps(contract.get("structures", [])),
+                        json.dumps(contract.get("ercs", [])),
+                    ),
+                )
+
+            for function in data.get("functions_data", []):
+                _insert_function(connection, session, function)
+
+            connection.executemany(
+                "INSERT INTO variables (session, contract_name, variable_name, variable_canonical_name, "
+                "variable_type, variable_visibility, variable_is_constant, variable_is_immutable, "
+                "variable_body) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        session,
+                        variable.get("contract_name"),
+                        variable.get("variable_name"),
+                        variable.get("variable_canonical_name"),
+                        variable.get("variable_type"),
+                        variable.get("variable_visibility"),
+                        variable.get("variable_is_constant"),
+                        variable.get("variable_is_immutable"),
+                        variable.get("variable_body"),
+                    )
+                    for variable in data.get("variables_data", [])
+                ],
+            )
+
+            connection.executemany(
+                "INSERT INTO scan_results (session, tool, check_name, impact, confidence, contract, "
+                "full_name, path, description) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        session,
+                        entry.get("tool", "slither"),
+                        entry.get("check"),
+                        entry.get("impact"),
+                        entry.get("confidence"),
+                        entry.get("contract"),
+                        entry.get("full_name"),
+                        entry.get("path"),
+                        entry.get("description"),
+                    )
+                    for entry in data.get("scan_results", [])
+                ],
+            )
+    finally:
+        connection.close()
+
+
+def index_saved_session(session_data_path, data):
+    """
+    Updates cross-session indexes after a session is written, indexing errors never fail the session.
+    """
+    try:
+        index_session(session_data_path, data)
+    except Exception as e:
+        print(f"Error indexing session for code search: {e}")
+
+    try:
+        load_session(session_data_path, data)
+    except Exception as e:
+        print(f"Error loading session into the corpus database: {e}")
+
+
+def update_corpus(rebuild: bool = False, db_path: str = CORPUS_DB_PATH) -> int:
+    """
+    Loads sessions that are new or changed since they were loaded and drops deleted ones.
+    Returns the count of (re)loaded sessions.
+    """
+    session_data_paths = {
+        get_session_name(path): path for path in find_all_session_data_paths()
+    }
+
+    connection = connect(db_path)
+    try:
+        with connection:
+            loaded = {
+                session: (mtime_ns, size)
+                for session, mtime_ns, size in connection.execute(
+                    "SELECT session, mtime_ns, size FROM sessions"
+                )
+            }
+            removed = loaded.keys() if rebuild else loaded.keys() - session_data_paths.keys()
+            for session in removed:
+                _remove_session(connection, session)
+    finally:
+        connection.close()
+
+    updated = 0
+    for session, session_data_path in session_data_paths.items():
+        stat = os.stat(session_data_path)
+        if not rebuild and loaded.get(session) == (stat.st_mtime_ns, stat.st_size):
+            continue
+        try:
+            load_session(session_data_path, db_path=db_path)
+            updated += 1
+        except Exception as e:
+            print(f"update_corpus: failed to load {session_data_path}: {e}")
+
+    return updated
+
+
+def _function_conditions(search_criteria: dict) -> Tuple[List[str], list]:
+    conditions, parameters = [], []
+
+    if search_criteria.get("session"):
+        conditions.append("functions.session = ?")
+        parameters.append(search_criteria["session"])
+
+    if search_criteria.get("network"):
+        conditions.append(
+            "functions.session IN (SELECT session FROM sessions WHERE network = ?)"
+        )
+        parameters.append(search_criteria["network"])
+
+    if search_criteria.get("functionName"):
+        conditions.append("instr(functions.function_canonical_name, ?) > 0")
+        parameters.append(search_criteria["functionName"])
+
+    if search_criteria.get("visibility"):
+        conditions.append("functions.visibility = ?")
+        parameters.append(search_criteria["visibility"])
+
+    if search_criteria.get("priority"):
+        conditions.append("functions.priority = ?")
+        parameters.append(int(search_criteria["priority"]))
+
+    for criterion, column in FLAG_COLUMNS.items():
+        if criterion in search_criteria:
+            conditions.append(f"functions.{column} = ?")
+            parameters.append(search_criteria[criterion] == "true")
+
+    if "in_contract" in search_criteria:
+        condition, values = _member_condition(
+            "functions.contract_name", search_criteria["in_contract"]
+        )
+        conditions.append(condition)
+        parameters.extend(values)
+
+    for criterion, (table, column, extra) in RELATION_CRITERIA.items():
+        if criterion not in search_criteria:
+            continue
+        if criterion in MEMBER_CRITERIA:
+            where, values = _member_condition(column, search_criteria[criterion])
+        else:
+            values = _as_list(search_criteria[criterion])
+            where = f"{column} IN ({', '.join(['?'] * len(values))})"
+        if extra:
+            where += f" AND {extra}"
+        conditions.append(f"functions.id IN (SELECT function_id FROM {table} WHERE {where})")
+        parameters.extend(values)
+
+    if "all_reachable_from" in search_criteria:
+        values = _as_list(search_criteria["all_reachable_from"])
+        conditions.append(
+            "EXISTS (SELECT 1 FROM functions AS caller JOIN function_calls "
+            "ON function_calls.function_id = caller.id "
+            "WHERE caller.session = functions.session "
+            f"AND caller.function_full_name IN ({', '.join(['?'] * len(values))}) "
+            "AND function_calls.callee = functions.function_full_name)"
+        )
+        parameters.extend(values)
+
+    if search_criteria.get("impact"):
+        conditions.append(
+            "EXISTS (SELECT 1 FROM scan_results WHERE scan_results.session = functions.session "
+            "AND scan_results.full_name = functions.function_full_name AND scan_results.impact = ?)"
+        )
+        parameters.append(search_criteria["impact"])
+
+    # NOTE: function_body workaround, same as filter_functions
+    for criterion in ["using_structure", "emitting"]:
+        if criterion in search_criteria:
+            values = _as_list(search_criteria[criterion])
+            conditions.append(
+                "(" + " OR ".join(["instr(functions.function_body, ?) > 0"] * len(values)) + ")"
+            )
+            parameters.extend(values)
+
+    return conditions, parameters
+
+
+def _scan_conditions(search_criteria: dict) -> Tuple[List[str], list]:
+    conditions, parameters = [], []
+    columns = {
+        "session": "session",
+        "impact": "impact",
+        "check_scanned": "check_name",
+        "function_scanned": "full_name",
+        "contract_scanned": "contract",
+        "tool": "tool",
+    }
+    for criterion, column in columns.items():
+        if search_criteria.get(criterion):
+            conditions.append(f"{column} = ?")
+            parameters.append(search_criteria[criterion])
+    return conditions, parameters
+
+
+def query_corpus(
+    search_criteria: dict,
+    table: str = "functions",
+    offset: int = 0,
+    limit: int = DEFAULT_CORPUS_LIMIT,
+    db_path: str = CORPUS_DB_PATH,
+) -> Tuple[List[dict], int]:
+    """
+    Returns (rows, total) of functions or scan_results matching searchCriteria across all sessions.
+    Besides the filter_functions/filter_results vocabulary, session and network restrict the sessions searched.
+    """
+    if table == "functions":
+        conditions, parameters = _function_conditions(search_criteria)
+        columns, source, order = FUNCTION_COLUMNS, "functions", "functions.id"
+    elif table == "scan_results":
+        conditions, parameters = _scan_conditions(search_criteria)
+        columns, source, order = SCAN_COLUMNS, "scan_results", "id"
+    else:
+        raise ValueError(f"Unknown table {table}, expected one of {CORPUS_TABLES}")
+
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    connection = connect(db_path)
+    connection.row_factory = sqlite3.Row
+    try:
+        total = connection.execute(f"SELECT COUNT(*) FROM {source}{where}", parameters).fetchone()[0]
+        rows = connection.execute(
+            f"SELECT {columns} FROM {source}{where} ORDER BY {order} LIMIT ? OFFSET ?",
+            [*parameters, limit, offset],
+        ).fetchall()
+    finally:
+        connection.close()
+
+    return [dict(row) for row in rows], total
@@ -1,12 +1,57 @@
 import os
 import re
+import gzip
 import json
+import threading
+from datetime import datetime
 from urllib.parse import urlparse
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from utils.compact import compact_session, expand_session
+from utils.session_index import SessionDirectoryIndex
+
 utils_dir = os.path.dirname(os.path.realpath(__file__))
 core_dir = os.path.dirname(utils_dir)
 files_dir = os.path.join(core_dir, "files", "out")
 
+
+def summarize_session(session_data_path, data=None):
+    """
+    Returns the /list_sessions summary of a session, data is loaded from session_data_path when not given.
+    """
+    if data is None:
+        data = load_source(session_data_path)
+    stat = os.stat(session_data_path)
+    network_info = data.get("network_info", {})
+    directory = os.path.basename(os.path.dirname(os.path.realpath(session_data_path)))
+    parts = directory.split(":")
+
+    findings = {}
+    for entry in data.get("scan_results", []):
+        impact = entry.get("impact") or "Unknown"
+        findings[impact] = findings.get(impact, 0) + 1
+
+    return {
+        "directory": directory,
+        "target": ":".join(parts[:2]).lower(),
+        "network": network_info.get("contract_network") or parts[0],
+        "address": network_info.get("contract_address") or parts[1],
+        "contract_name": network_info.get("contract_name") or ":".join(parts[2:]),
+        "function_count": len(data.get("functions_data", [])),
+        "findings": findings,
+        "findings_total": sum(findings.values()),
+        "size": stat.st_size,
+        "timestamp": datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+session_index = SessionDirectoryIndex(files_dir, summarize=summarize_session)
+
 #################### APP.PY ####################
 
 SUPPORTED_NETWORK = {
@@ -37,22 +82,36 @@ SUPPORTED_NETWORK = dict(
 
 def check_if_source_exists(path):
     """
-    Checks if a directory exists in the "files/out" directory that partially matches the provided path.
-    If a matching directory is found and contains a sessionData.json file, returns the path to the sessionData.json file.
-    Otherwise, returns None.
-    """
-    for root, dirs, _ in os.walk(files_dir):
-        for dir_name in dirs:
-            if path in dir_name:
-                session_data_path = os.path.join(root, dir_name, "sessionData.json")
-                if os.path.isfile(session_data_path):
-                    return session_data_path
-                else:
-                    print(
-                        f"check_if_source_exists: sessionData.json not found in: {dir_name}"
-                    )
+    Returns the path to sessionData.json of a network:address (or bare address) target if its session
+    exists in the "files/out" directory, otherwise returns None. Targets are matched case-insensitively
+    through the session directory index (see utils/session_index.py).
+    """
+    return session_index.find(path)
+
+
+def register_session(session_dir, data=None):
+    """
+    Adds a session directory to the session directory index once its sessionData.json is written,
+    its summary is taken from data (the saved session) when given.
+    """
+    summary = None
+    if data is not None:
+        summary = summarize_session(os.path.join(session_dir, "sessionData.json"), data)
+    session_index.register(session_dir, summary)
+
+
+def unregister_session(session_dir):
+    """
+    Removes a deleted session directory from the session directory index.
+    """
+    session_index.unregister(session_dir)
 
-    return None
+
+def rebuild_session_index():
+    """
+    Recreates the session directory index from files/out, returns the count of sessions.
+    """
+    return session_index.rebuild()
 
 
 def check_if_supported_network_in_url(path):
@@ -93,32 +152,143 @@ def get_target_from_url(path):
     return None
 
 
-def load_source(file_path):
+def load_source(file_path, expand=True):
     """
-    Loads the JSON data from a file.
+    Loads the JSON data from a file, compact sessions are expanded unless expand=False.
     """
     with open(file_path, "r") as f:
         data = json.load(f)
-    return data
+    return expand_session(data) if expand else data
+
+
+def save_source(file_path, data, compact=True):
+    """
+    Writes the JSON data to a file, replacing it atomically so readers never see a partial session.
+    Sessions are stored in the compact format (see utils/compact.py) unless compact=False.
+    """
+    if compact:
+        payload = json.dumps(compact_session(data), separators=(",", ":")).encode()
+    else:
+        payload = json.dumps(expand_session(data), indent=4).encode()
+
+    # NOTE: Siblings written by a request for the previous version can't replace the new ones
+    with _get_file_lock(file_path):
+        _write_atomic(file_path, payload)
+        write_compressed_siblings(file_path, payload)
+
+
+def _write_atomic(file_path, payload):
+    # NOTE: Threads of one process write the same file concurrently, every writer has its own temp file
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, file_path)
+
+
+_file_locks = {}
+_file_locks_lock = threading.Lock()
+
+
+def _get_file_lock(file_path):
+    with _file_locks_lock:
+        return _file_locks.setdefault(os.path.realpath(file_path), threading.Lock())
+
+
+# Content-Encoding -> suffix of the precompressed copy next to sessionData.json
+COMPRESSED_SIBLINGS = {"br": ".br", "gzip": ".gz"}
+
+# Encodings with siblings written by write_compressed_siblings, preferred first
+COMPRESSED_ENCODINGS = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def write_compressed_siblings(file_path, payload=None):
+    """
+    Writes gzip (and brotli, when installed) copies of the file so it can be served without compressing.
+    """
+    if payload is None:
+        with open(file_path, "rb") as f:
+            payload = f.read()
+
+    _write_atomic(file_path + ".gz", gzip.compress(payload, compresslevel=9, mtime=0))
+
+    if brotli is not None:
+        _write_atomic(file_path + ".br", brotli.compress(payload, quality=9))
+    elif os.path.exists(file_path + ".br"):
+        os.remove(file_path + ".br")
+
+
+def ensure_compressed_siblings(file_path):
+    """
+    Writes missing or outdated siblings of a file, concurrent requests for the same file write them once.
+    """
+    with _get_file_lock(file_path):
+        if any(
+            get_compressed_sibling(file_path, encoding) is None
+            for encoding in COMPRESSED_ENCODINGS
+        ):
+            write_compressed_siblings(file_path)
+
+
+def get_compressed_sibling(file_path, encoding):
+    """
+    Returns the precompressed copy of the file for the encoding, None when missing or older than the file.
+    """
+    suffix = COMPRESSED_SIBLINGS.get(encoding)
+    if suffix is None:
+        return None
+
+    sibling_path = file_path + suffix
+    try:
+        if os.stat(sibling_path).st_mtime_ns >= os.stat(file_path).st_mtime_ns:
+            return sibling_path
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def parse_fields(fields):
+    """
+    Returns requested field names from a list or a comma separated string, None for all fields.
+    """
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    return [field.strip() for field in fields if field.strip()]
+
+
+def project_records(records, fields):
+    """
+    Returns records reduced to the requested fields, records are returned as is without fields.
+    """
+    if not fields:
+        return records
+    return [
+        {field: record[field] for field in fields if field in record}
+        for record in records
+    ]
+
+
+def paginate_records(records, offset=0, limit=None):
+    offset = max(int(offset or 0), 0)
+    if limit in (None, ""):
+        return records[offset:]
+    return records[offset : offset + max(int(limit), 0)]
+
+
+def get_session_root_file(session_data):
+    """
+    Returns the absolute path of the root contract file of a session.
+    """
+    contract_name = session_data.get("network_info", {}).get("contract_name")
+    return session_data.get("source_code", {}).get(contract_name, {}).get("path")
 
 
 def find_all_session_data_paths():
-    dirs = os.listdir(files_dir)
-    session_data_paths = []
-    for dir_name in dirs:
-
-        if os.path.isfile(os.path.join(files_dir, dir_name)):
-            continue
-
-        session_data_path = os.path.join(files_dir, dir_name, "sessionData.json")
-        if os.path.isfile(session_data_path):
-            session_data_paths.append(session_data_path)
-        else:
-            print(
-                f"find_all_session_data_paths: sessionData.json not found in: {dir_name}"
-            )
-
-    return session_data_paths
+    """
+    Returns sessionData.json paths of all sessions in files/out (see utils/session_index.py).
+    """
+    return session_index.get_session_data_paths()
 
 
 def get_session_data(session_data_path):
@@ -1,17 +1,65 @@
+import os
+import time
 import inspect
 import subprocess
 import json
+import multiprocessing
+import threading
+from functools import lru_cache
+from multiprocessing.connection import Connection, wait
 from slither.slither import Slither
 from slither.detectors import all_detectors
 from typing import List, Tuple, Type
-from slither.detectors.abstract_detector import AbstractDetector
+from slither.detectors.abstract_detector import AbstractDetector, DetectorClassification
 from pkg_resources import iter_entry_points
 from typing import Tuple, List, Dict, Type
 import slitherin
 
+# Wall-clock limit for a single detector, in seconds
+DETECTOR_TIMEOUT = 120
+
+DEFAULT_SCAN_PROFILE = "full"
+
+# NOTE: Builds run in threads of one process (job queue, request threads), forks of them are serialized
+FORK_LOCK = threading.Lock()
+
+# Named detector selections, value is a list of detector ARGUMENTs or a filter on the detector class
+# Custom profiles are a list (or comma separated string) of detector ARGUMENTs
+SCAN_PROFILES = {
+    "full": lambda detector: True,
+    "high-impact-only": lambda detector: detector.IMPACT == DetectorClassification.HIGH,
+    # NOTE: Cheap syntactic checks for triage crawls, no reentrancy/dataflow detectors
+    "fast": [
+        "arbitrary-send-eth",
+        "arbitrary-send-erc20",
+        "controlled-delegatecall",
+        "delegatecall-loop",
+        "msg-value-loop",
+        "suicidal",
+        "unprotected-upgrade",
+        "tx-origin",
+        "unchecked-transfer",
+        "unchecked-lowlevel",
+        "unchecked-send",
+        "locked-ether",
+        "incorrect-modifier",
+        "weak-prng",
+        "pess-arbitrary-call",
+        "pess-unprotected-initialize",
+        "pess-unprotected-setter",
+        "pess-ecrecover",
+    ],
+}
+
 
 # NOTE: Removed printers because of some deep down the stack errors
 def get_detectors() -> Tuple[List[Type[AbstractDetector]]]:
+    # Catalogue is built once per process, callers get their own copy
+    return list(_load_detectors())
+
+
+@lru_cache(maxsize=None)
+def _load_detectors() -> Tuple[Type[AbstractDetector]]:
     detectors_ = [getattr(all_detectors, name) for name in dir(all_detectors)]
     detectors = [
         d for d in detectors_ if inspect.isclass(d) and issubclass(d, AbstractDetector)
@@ -33,32 +81,167 @@ def get_detectors() -> Tuple[List[Type[AbstractDetector]]]:
 
         # We convert those to lists in case someone returns a tuple
         detectors += list(plugin_detectors)
-    return detectors
+    return tuple(detectors)
 
 
 def get_slitherin_detectors() -> List[Dict]:
     return slitherin.plugin_detectors
 
 
+@lru_cache(maxsize=None)
+def get_detector_catalogue() -> Dict[str, Type[AbstractDetector]]:
+    """
+    Returns all slither and slitherin detectors by their ARGUMENT, built once per process.
+    """
+    catalogue = {}
+    for detector in get_detectors() + list(get_slitherin_detectors()):
+        catalogue.setdefault(detector.ARGUMENT, detector)
+    return catalogue
+
+
+def select_detectors(profile=DEFAULT_SCAN_PROFILE) -> List[Type[AbstractDetector]]:
+    """
+    Returns detectors for a scan profile name, a list of detector ARGUMENTs or a comma separated string of them.
+    """
+    catalogue = get_detector_catalogue()
+
+    if not profile:
+        profile = DEFAULT_SCAN_PROFILE
+
+    if isinstance(profile, str):
+        if profile in SCAN_PROFILES:
+            profile = SCAN_PROFILES[profile]
+        else:
+            profile = [name.strip() for name in profile.split(",") if name.strip()]
+
+    if callable(profile):
+        return [detector for detector in catalogue.values() if profile(detector)]
+
+    unknown = [name for name in profile if name not in catalogue]
+    if unknown:
+        raise ValueError(f"Unknown detectors in scan profile: {', '.join(unknown)}")
+
+    return [catalogue[name] for name in profile]
+
+
+def _run_detector(detector: AbstractDetector) -> Dict:
+    start = time.perf_counter()
+    try:
+        detector_results = [x for x in detector.detect() if x]
+        status, error = "ok", None
+    except Exception as e:
+        print(f"Error running detector {detector.__class__.__name__}: {e}")
+        detector_results, status, error = [], "error", str(e)
+
+    return {
+        "results": detector_results,
+        "timing": {
+            "detector": detector.ARGUMENT,
+            "duration": round(time.perf_counter() - start, 3),
+            "results": len(detector_results),
+            "status": status,
+            "error": error,
+        },
+    }
+
+
+def _detector_process(detector: AbstractDetector, conn: Connection):
+    conn.send(_run_detector(detector))
+    conn.close()
+
+
+def _run_detectors_forked(
+    detectors: List[AbstractDetector], workers: int, timeout: float
+) -> List[Dict]:
+    """
+    Runs each detector in its own process forked from the current one (Slither already built).
+    At most `workers` processes run at once, processes running longer than `timeout` are killed.
+    """
+    ctx = multiprocessing.get_context("fork")
+    outputs = [None] * len(detectors)
+    pending = list(range(len(detectors)))
+    running = {}  # conn -> (process, detector index, start time)
+
+    while pending or running:
+        while pending and len(running) < workers:
+            index = pending.pop(0)
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            process = ctx.Process(
+                target=_detector_process, args=(detectors[index], child_conn)
+            )
+            with FORK_LOCK:
+                process.start()
+            child_conn.close()
+            running[parent_conn] = (process, index, time.perf_counter())
+
+        for conn in wait(list(running), timeout=0.1):
+            process, index, start = running.pop(conn)
+            try:
+                outputs[index] = conn.recv()
+            except EOFError:
+                # NOTE: Worker died without sending results (segfault, OOM kill)
+                outputs[index] = {
+                    "results": [],
+                    "timing": {
+                        "detector": detectors[index].ARGUMENT,
+                        "duration": round(time.perf_counter() - start, 3),
+                        "results": 0,
+                        "status": "error",
+                        "error": f"detector process exited with {process.exitcode}",
+                    },
+                }
+            conn.close()
+            process.join()
+
+        for conn, (process, index, start) in list(running.items()):
+            if time.perf_counter() - start > timeout:
+                print(f"Detector {detectors[index].ARGUMENT} timed out after {timeout}s")
+                process.kill()
+                process.join()
+                conn.close()
+                del running[conn]
+                outputs[index] = {
+                    "results": [],
+                    "timing": {
+                        "detector": detectors[index].ARGUMENT,
+                        "duration": round(time.perf_counter() - start, 3),
+                        "results": 0,
+                        "status": "timeout",
+                        "error": f"timed out after {timeout}s",
+                    },
+                }
+
+    return outputs
+
+
 # NOTE: Removed printers because of some deep down the stack errors
 def run_all_detectors(
     slither: Slither,
     detector_classes: List[Type[AbstractDetector]],
-) -> Tuple[Slither, List[Dict], int]:
+    workers: int = None,
+    timeout: float = DETECTOR_TIMEOUT,
+) -> Tuple[Slither, List[Dict], int, List[Dict]]:
+    """
+    Runs detectors on a pool of processes forked after Slither is built.
+    Returns detector results and per-detector timings (detector, duration, results, status, error).
+    workers=1 or platforms without fork run detectors sequentially, without timeouts.
+    """
     for detector_cls in detector_classes:
         slither.register_detector(detector_cls)
 
     analyzed_contracts_count = len(slither.contracts)
+    workers = workers or os.cpu_count() or 1
 
-    results_detectors = []
+    if "fork" in multiprocessing.get_all_start_methods() and workers > 1:
+        outputs = _run_detectors_forked(slither._detectors, workers, timeout)
+    else:
+        outputs = [_run_detector(detector) for detector in slither._detectors]
 
-    for detector in slither._detectors:
-        try:
-            detector_results = detector.detect()
-            detector_results = [x for x in detector_results if x]
-            results_detectors.extend(detector_results)
-        except Exception as e:
-            print(f"Error running detector {detector.__class__.__name__}: {e}")
-            continue
+    results_detectors = [result for output in outputs for result in output["results"]]
+    detector_timings = sorted(
+        [output["timing"] for output in outputs],
+        key=lambda timing: timing["duration"],
+        reverse=True,
+    )
 
-    return slither, results_detectors, analyzed_contracts_count
\ No newline at end of file
+    return slither, results_detectors, analyzed_contracts_count, detector_timings
@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from utils.data import files_dir
+
+"""
+Background jobs for session builds (files/out/.jobs/jobs.db)
+
+A job is a kind (registered handler) and JSON params. submit() stores it as "queued" and returns its id,
+a bounded pool of JOB_WORKERS threads runs queued jobs in submission order. A handler returns
+(result, status_code) like generate_session_data, status 200 marks the job "done" with the result,
+anything else (or an exception) marks it "failed" with the error. Jobs are kept in SQLite, so queued
+jobs and jobs interrupted by a restart are run again when the queue is started.
+"""
+
+JOBS_DB_PATH = os.path.join(files_dir, ".jobs", "jobs.db")
+
+# NOTE: Compiles run in worker threads, solc and the download run in their own processes
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+
+JOB_STATES = ["queued", "running", "done", "failed"]
+DEFAULT_JOB_LIST_LIMIT = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    state TEXT NOT NULL,
+    status_code INTEGER,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at);
+"""
+
+JOB_COLUMNS = [
+    "id",
+    "kind",
+    "params",
+    "state",
+    "status_code",
+    "result",
+    "error",
+    "created_at",
+    "started_at",
+    "finished_at",
+]
+
+
+def connect(db_path: str = JOBS_DB_PATH) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def _to_job(row) -> dict:
+    job = dict(zip(JOB_COLUMNS, row))
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+class JobQueue:
+    def __init__(self, db_path: str = JOBS_DB_PATH, workers: int = JOB_WORKERS):
+        self.db_path = db_path
+        self.workers = max(workers, 1)
+        self.handlers: Dict[str, Callable[[dict], tuple]] = {}
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def register(self, kind: str, handler: Callable[[dict], tuple]):
+        self.handlers[kind] = handler
+
+    def _execute(self, query: str, parameters: tuple = ()) -> list:
+        connection = connect(self.db_path)
+        try:
+            with connection:
+                return connection.execute(query, parameters).fetchall()
+        finally:
+            connection.close()
+
+    def _claim(self, job_id: str) -> bool:
+        """
+        Moves a queued job to running, False if another worker (or a resubmission) claimed it first.
+        """
+        connection = connect(self.db_path)
+        try:
+            with connection:
+                cursor = connection.execute(
+                    "UPDATE jobs SET state = 'running', started_at = ? WHERE id = ? AND state = 'queued'",
+                    (time.time(), job_id),
+                )
+                return cursor.rowcount == 1
+        finally:
+            connection.close()
+
+    def start(self):
+        """
+        Starts the worker pool once and resumes jobs left queued or running by the previous process.
+        """
+        with self.lock:
+            if self.executor is not None:
+                return
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="job"
+            )
+
+        self._execute(
+            "UPDATE jobs SET state = 'queued', started_at = NULL WHERE state = 'running'"
+        )
+        for (job_id,) in self._execute(
+            "SELECT id FROM jobs WHERE state = 'queued' ORDER BY created_at"
+        ):
+            self.executor.submit(self._run, job_id)
+
+    def submit(self, kind: str, params: dict) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unsupported job kind: {kind}")
+        self.start()
+
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, kind, params, state, created_at) VALUES (?, ?, ?, 'queued', ?)",
+            (job_id, kind, json.dumps(params), time.time()),
+        )
+        self.executor.submit(self._run, job_id)
+        return job_id
+
+    def _finish(self, job_id: str, state: str, status_code: int, result=None, error=None):
+        self._execute(
+            "UPDATE jobs SET state = ?, status_code = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+            (
+                state,
+                status_code,
+                json.dumps(result) if result is not None else None,
+                error,
+                time.time(),
+                job_id,
+            ),
+        )
+
+    def _run(self, job_id: str):
+        if not self._claim(job_id):
+            return
+        job = self.get(job_id)
+
+        try:
+            result, status_code = self.handlers[job["kind"]](job["params"])
+        except Exception as e:
+            print(f"Error running job {job_id}: {e}")
+            self._finish(job_id, "failed", 500, error=str(e))
+            return
+
+        if status_code == 200:
+            self._finish(job_id, "done", status_code, result=result)
+        else:
+            error = result.get("error") if isinstance(result, dict) else result
+            self._finish(job_id, "failed", status_code, error=str(error))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        rows = self._execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        )
+        return _to_job(rows[0]) if rows else None
+
+    def list(self, state: str = None, limit: int = DEFAULT_JOB_LIST_LIMIT) -> List[dict]:
+        """
+        Returns the most recent jobs, optionally only jobs in one state.
+        """
+        query = f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs"
+        parameters = []
+        if state:
+            query += " WHERE state = ?"
+            parameters.append(state)
+        query += " ORDER BY created_at DESC"
+        if limit:
+            query += " LIMIT ?"
+            parameters.append(int(limit))
+        return [_to_job(row) for row in self._execute(query, tuple(parameters))]
+
+    def stats(self) -> dict:
+        counts = dict(self._execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+        return {
+            "workers": self.workers,
+            **{state: counts.get(state, 0) for state in JOB_STATES},
+        }
@@ -0,0 +1,247 @@
+import os
+import re
+import time
+import sqlite3
+from typing import Iterable, List, Optional, Tuple
+
+from utils.data import files_dir
+from utils.session_index import normalize_target
+
+"""
+Checkpoint ledger of batch runs (files/out/.batch/ledger.db)
+
+Every target of runner.py batch runs has one row: state, attempts, stage and class of the last error and
+stage timings. A restarted run skips targets that are done or failed permanently and retries transient
+failures once their backoff passed, a target is given up (permanent) after max_attempts attempts.
+
+states: running, done, failed_transient, failed_permanent
+"""
+
+LEDGER_DB_PATH = os.path.join(files_dir, ".batch", "ledger.db")
+
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 30
+MAX_RETRY_BACKOFF_SECONDS = 3600
+
+# NOTE: Regular expressions searched in the error message, retrying can't fix these
+PERMANENT_ERRORS = {
+    "bytecode_only": ["Bytecode only"],
+    "unverified": ["not verified", "Source code not available"],
+    "invalid_target": [
+        "Invalid Ethereum address",
+        "Invalid path format",
+        "Unsupported network",
+        "Missing target",
+    ],
+    "invalid_profile": ["Unknown detectors"],
+    "compile_error": [
+        "ParserError",
+        "TypeError:",
+        "DeclarationError",
+        "Compiler error",
+        "is not the expected format",
+    ],
+    "missing_root_file": [r"File \S+\.sol not found in .+ or its subdirectories"],
+}
+TRANSIENT_ERRORS = {
+    "rate_limit": ["rate limit", "Max calls per sec", "Too Many Requests"],
+    "network": [
+        "Name or service not known",
+        "urlopen error",
+        "Connection",
+        "timed out",
+        "Timeout",
+        "Temporary failure",
+        "Bad Gateway",
+        "Service Unavailable",
+        "Gateway Timeout",
+    ],
+    "worker_crash": ["terminated abruptly", "process pool is not usable"],
+    # NOTE: Recorded by get_runnable() for targets a dead run left running
+    "interrupted": ["^interrupted$"],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS targets (
+    target TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    stage TEXT,
+    error_class TEXT,
+    error TEXT,
+    next_attempt_at REAL,
+    download_seconds REAL,
+    analysis_seconds REAL,
+    write_seconds REAL,
+    total_seconds REAL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS targets_state ON targets (state);
+"""
+
+TIMING_COLUMNS = {
+    "download": "download_seconds",
+    "analysis": "analysis_seconds",
+    "write": "write_seconds",
+    "total": "total_seconds",
+}
+
+
+def classify_error(error) -> Tuple[str, bool]:
+    """
+    Returns (error class, permanent) of a failure, unknown errors are transient.
+    """
+    message = str(error)
+    for error_class, patterns in PERMANENT_ERRORS.items():
+        if any(re.search(pattern, message) for pattern in patterns):
+            return error_class, True
+    for error_class, patterns in TRANSIENT_ERRORS.items():
+        if any(re.search(pattern, message) for pattern in patterns):
+            return error_class, False
+    return "unknown", False
+
+
+def get_backoff(attempts: int) -> float:
+    return min(RETRY_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0), MAX_RETRY_BACKOFF_SECONDS)
+
+
+def connect(db_path: str = LEDGER_DB_PATH) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class BatchLedger:
+    def __init__(self, db_path: str = LEDGER_DB_PATH, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.max_attempts = max(max_attempts, 1)
+
+    def _execute(self, query: str, parameters: tuple = ()) -> list:
+        connection = connect(self.db_path)
+        try:
+            with connection:
+                return connection.execute(query, parameters).fetchall()
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _key(target: str) -> str:
+        return normalize_target(target) or target
+
+    def start(self, target: str):
+        """
+        Counts an attempt of the target, a run that dies while the target is running keeps the attempt.
+        """
+        self._execute(
+            "INSERT INTO targets (target, state, attempts, started_at) VALUES (?, 'running', 1, ?) "
+            "ON CONFLICT (target) DO UPDATE SET state = 'running', attempts = attempts + 1, "
+            "started_at = excluded.started_at, finished_at = NULL",
+            (self._key(target), time.time()),
+        )
+
+    def succeed(self, target: str, timings: dict = None):
+        timings = timings or {}
+        columns = [TIMING_COLUMNS[stage] for stage in timings if stage in TIMING_COLUMNS]
+        assignments = "".join(f", {column} = ?" for column in columns)
+        values = [timings[stage] for stage in timings if stage in TIMING_COLUMNS]
+        self._execute(
+            "INSERT INTO targets (target, state, finished_at) VALUES (?, 'done', ?) "
+            "ON CONFLICT (target) DO UPDATE SET state = 'done', stage = NULL, error_class = NULL, "
+            f"error = NULL, next_attempt_at = NULL, finished_at = excluded.finished_at{assignments}",
+            (self._key(target), time.time(), *values),
+        )
+
+    def fail(self, target: str, stage: str, error) -> str:
+        """
+        Records a failed attempt, returns the new state (failed_transient or failed_permanent).
+        """
+        key = self._key(target)
+        error_class, permanent = classify_error(error)
+        rows = self._execute("SELECT attempts FROM targets WHERE target = ?", (key,))
+        attempts = rows[0][0] if rows else 1
+
+        if not permanent and attempts >= self.max_attempts:
+            permanent = True
+        state = "failed_permanent" if permanent else "failed_transient"
+        next_attempt_at = None if permanent else time.time() + get_backoff(attempts)
+
+        self._execute(
+            "INSERT INTO targets (target, state, attempts, stage, error_class, error, next_attempt_at, finished_at) "
+            "VALUES (?, ?, 1, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (target) DO UPDATE SET state = excluded.state, stage = excluded.stage, "
+            "error_class = excluded.error_class, error = excluded.error, "
+            "next_attempt_at = excluded.next_attempt_at, finished_at = excluded.finished_at",
+            (key, state, stage, error_class, str(error)[:2000], next_attempt_at, time.time()),
+        )
+        return state
+
+    def get_runnable(self, targets: Iterable[str], now: float = None) -> Tuple[List[str], Optional[float]]:
+        """
+        Returns (targets to run now, earliest time a waiting transient failure can be retried).
+        Done and permanently failed targets are never returned, neither are targets out of attempts.
+        Targets a dead run left running on their last attempt are marked failed_permanent ("interrupted").
+        """
+        now = now or time.time()
+        rows = {
+            target: (state, attempts, next_attempt_at)
+            for target, state, attempts, next_attempt_at in self._execute(
+                "SELECT target, state, attempts, next_attempt_at FROM targets"
+            )
+        }
+
+        runnable, retry_at = [], None
+        for target in dict.fromkeys(targets):
+            row = rows.get(self._key(target))
+            if row is None:
+                runnable.append(target)
+                continue
+
+            state, attempts, next_attempt_at = row
+            if state == "running" and attempts >= self.max_attempts:
+                self.fail(target, None, "interrupted")
+                continue
+            if state in ("done", "failed_permanent") or attempts >= self.max_attempts:
+                continue
+            # NOTE: "running" is left by a run that died, the target is run again
+            if state == "running" or not next_attempt_at or next_attempt_at <= now:
+                runnable.append(target)
+            else:
+                retry_at = min(retry_at or next_attempt_at, next_attempt_at)
+
+        return runnable, retry_at
+
+    def reset(self, states: Iterable[str]):
+        """
+        Forgets targets in the given states, e.g. ["failed_permanent"] to try them again.
+        """
+        states = list(states)
+        self._execute(
+            f"DELETE FROM targets WHERE state IN ({', '.join('?' for _ in states)})",
+            tuple(states),
+        )
+
+    def stats(self) -> dict:
+        return dict(self._execute("SELECT state, COUNT(*) FROM targets GROUP BY state"))
+
+
+def run_resumable(targets: List[str], ledger: BatchLedger, run_pass):
+    """
+    Calls run_pass(targets) with the targets the ledger allows to run, then again with transient failures
+    once their backoff passed, until nothing is left to retry.
+    """
+    while True:
+        runnable, retry_at = ledger.get_runnable(targets)
+        if runnable:
+            print(f"run_resumable: running {len(runnable)} of {len(targets)} targets")
+            run_pass(runnable)
+        elif retry_at:
+            delay = max(retry_at - time.time(), 0)
+            print(f"run_resumable: retrying transient failures in {delay:.0f}s")
+            time.sleep(delay)
+        else:
+            break
+
+    print(f"run_resumable: ledger {ledger.stats()}")
@@ -1,7 +1,11 @@
 import os
+import sys
 import json
 import sqlite3
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+from utils.data import load_source
+
 
 def connect_to_database(db_path):
     """Connect to the SQLite database at the given path."""
@@ -11,40 +15,40 @@ def connect_to_database(db_path):
 
 def process_file(cursor, filepath):
     """Process a single JSON file and insert its data into the scan_results table."""
-    with open(filepath, "r") as file:
-        data = json.load(file)
-        scan_results = data.get("scan_results", [])
-        network_info = data.get("network_info", {})
-        target = f"{network_info.get('Network', '')}:{network_info.get('Address', '')}"
+    # NOTE: load_source expands sessions stored in the compact format
+    data = load_source(filepath)
+    scan_results = data.get("scan_results", [])
+    network_info = data.get("network_info", {})
+    target = f"{network_info.get('Network', '')}:{network_info.get('Address', '')}"
 
-        for result in scan_results:
-            # Using .get() method with a default value of 'Unknown' or an appropriate default
-            check_type = result.get("check", "Unknown")
-            confidence = result.get("confidence", "Unknown")
-            contract = result.get("contract", "Unknown")
-            description = result.get("description", "No description provided")
-            expressions = json.dumps(result.get("expressions", []))
-            full_name = result.get("full_name", "No name provided")
-            impact = result.get("impact", "No impact provided")
+    for result in scan_results:
+        # Using .get() method with a default value of 'Unknown' or an appropriate default
+        check_type = result.get("check", "Unknown")
+        confidence = result.get("confidence", "Unknown")
+        contract = result.get("contract", "Unknown")
+        description = result.get("description", "No description provided")
+        expressions = json.dumps(result.get("expressions", []))
+        full_name = result.get("full_name", "No name provided")
+        impact = result.get("impact", "No impact provided")
 
-            print(f"Inserting {full_name} into the database")
+        print(f"Inserting {full_name} into the database")
 
-            try:
-                cursor.execute(
-                    "INSERT INTO scan_results (check_type, confidence, contract, description, expressions, full_name, impact, target) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                    (
-                        check_type,
-                        confidence,
-                        contract,
-                        description,
-                        expressions,
-                        full_name,
-                        impact,
-                        target,
-                    ),
-                )
-            except sqlite3.IntegrityError as e:
-                print(f"An integrity error occurred: {e}")
+        try:
+            cursor.execute(
+                "INSERT INTO scan_results (check_type, confidence, contract, description, expressions, full_name, impact, target) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    check_type,
+                    confidence,
+                    contract,
+                    description,
+                    expressions,
+                    full_name,
+                    impact,
+                    target,
+                ),
+            )
+        except sqlite3.IntegrityError as e:
+            print(f"An integrity error occurred: {e}")
 
 
 def main():
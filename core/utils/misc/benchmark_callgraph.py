@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+from slither.slither import Slither
+from slither.tools.possible_paths.possible_paths import find_target_paths
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+from utils.cache import get_compile_kwargs
+from utils.callgraph import CallGraphIndex
+
+"""
+Compare all_paths_to_function computed with find_target_paths() per function vs CallGraphIndex.
+
+python benchmark_callgraph.py <path/to/Contract.sol> <ContractName> --config_dir <files/out/network:0x...:Name>
+python benchmark_callgraph.py --synthetic 300
+
+synthetic: generate a contract with N public functions calling a chain of internal helpers
+"""
+
+
+def generate_synthetic_contract(functions_count):
+    helpers = []
+    for i in range(functions_count):
+        next_call = f"_helper{i + 1}(x);" if i + 1 < functions_count else ""
+        helpers.append(
+            f"    function _helper{i}(uint256 x) internal {{ counter += x; {next_call} }}"
+        )
+
+    entries = [
+        f"    function entry{i}(uint256 x) external {{ _helper{i}(x); }}"
+        for i in range(functions_count)
+    ]
+
+    source = "\n".join(
+        [
+            "// SPDX-License-Identifier: MIT",
+            "pragma solidity ^0.8.0;",
+            "contract Synthetic {",
+            "    uint256 public counter;",
+            *helpers,
+            *entries,
+            "}",
+        ]
+    )
+
+    target = os.path.join(tempfile.mkdtemp(), "Synthetic.sol")
+    with open(target, "w") as f:
+        f.write(source)
+    return target, "Synthetic"
+
+
+def paths_to_names(paths):
+    return [func.full_name for tup in paths for func in tup]
+
+
+def run_benchmark(target_compile, target_name, config_dir=None):
+    config = {}
+    if config_dir:
+        with open(os.path.join(config_dir, "slither.config.json"), "r") as f:
+            config = json.load(f)
+
+    slither = Slither(target_compile, **get_compile_kwargs(config, config_dir))
+    contract = next(c for c in slither.contracts if c.name == target_name)
+    functions = contract.functions
+
+    start = time.perf_counter()
+    expected = [paths_to_names(find_target_paths(slither, [f])) for f in functions]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    call_graph = CallGraphIndex(slither)
+    actual = [paths_to_names(call_graph.find_target_paths([f])) for f in functions]
+    index_time = time.perf_counter() - start
+
+    print(f"functions analyzed: {len(functions)}")
+    print(f"find_target_paths: {legacy_time:.3f}s")
+    print(f"CallGraphIndex:    {index_time:.3f}s")
+    print(f"speedup:           {legacy_time / index_time if index_time else 0:.1f}x")
+    print(f"identical output:  {expected == actual}")
+
+    return expected == actual
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark all_paths_to_function computation"
+    )
+    parser.add_argument("target_compile", nargs="?", help="Target Contract.sol")
+    parser.add_argument("target_name", nargs="?", help="Target contract name")
+    parser.add_argument("--config_dir", default=None, help="Directory with slither.config.json")
+    parser.add_argument(
+        "--synthetic", type=int, default=None, help="Generate contract with N functions"
+    )
+    args = parser.parse_args()
+
+    if args.synthetic:
+        target_compile, target_name = generate_synthetic_contract(args.synthetic)
+    else:
+        target_compile, target_name = args.target_compile, args.target_name
+
+    identical = run_benchmark(target_compile, target_name, args.config_dir)
+    sys.exit(0 if identical else 1)
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+from utils.code_search import (
+    DEFAULT_SEARCH_LIMIT,
+    SEARCH_KINDS,
+    search,
+    update_index,
+)
+
+"""
+
+Substring or regex search over function bodies and source files of every session in files/out.
+
+python code_search.py "delegatecall("
+python code_search.py "emit\\s+OwnershipTransferred" --regex --kind function
+
+The index is updated with new or changed sessions before each search (--no_update skips it),
+--rebuild drops and recreates it.
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search code of all sessions")
+    parser.add_argument("pattern", nargs="?", help="Substring (or regex with --regex)")
+    parser.add_argument("--regex", action="store_true", help="Pattern is a regex")
+    parser.add_argument("--ignore_case", action="store_true", help="Case-insensitive search")
+    parser.add_argument("--kind", choices=SEARCH_KINDS, help="Search only functions or sources")
+    parser.add_argument("--session", help="Search only one session (files/out directory name)")
+    parser.add_argument("--limit", type=int, default=DEFAULT_SEARCH_LIMIT, help="Max hits, 0 for all")
+    parser.add_argument("--no_update", action="store_true", help="Don't index new sessions first")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the whole index")
+    args = parser.parse_args()
+
+    if args.rebuild or not args.no_update:
+        updated = update_index(rebuild=args.rebuild)
+        if updated:
+            print(f"Indexed {updated} sessions")
+
+    if not args.pattern:
+        return
+
+    start = time.perf_counter()
+    hits = search(
+        args.pattern, args.regex, args.ignore_case, args.kind, args.session, args.limit
+    )
+    elapsed = time.perf_counter() - start
+
+    for hit in hits:
+        print(f"{hit['session']} {hit['kind']} {hit['name']} {hit['path']}:{hit['line']}: {hit['text']}")
+    print(f"{len(hits)} hits in {elapsed * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
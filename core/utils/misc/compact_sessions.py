@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+from utils.data import find_all_session_data_paths, save_source
+from utils.compact import compact_session, expand_session, is_compact
+
+"""
+
+Converts sessions in files/out to the compact sessionData format and benchmarks it.
+
+python compact_sessions.py
+prints size and load time (json.loads + expand) of the regular vs compact format for every session
+
+python compact_sessions.py --convert
+rewrites sessions still in the regular format, each conversion is verified to expand back to the same data
+
+python compact_sessions.py --expand
+rewrites sessions back to the regular (indented) format
+"""
+
+
+def timed_load(text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        data = expand_session(json.loads(text))
+    return data, (time.perf_counter() - start) / repeat
+
+
+def benchmark_session(session_data_path, repeat=3):
+    with open(session_data_path, "r") as f:
+        data = expand_session(json.load(f))
+
+    regular = json.dumps(data, indent=4)
+    compact = json.dumps(compact_session(data), separators=(",", ":"))
+
+    _, regular_time = timed_load(regular, repeat)
+    expanded, compact_time = timed_load(compact, repeat)
+
+    if expanded != data:
+        raise ValueError(f"compact roundtrip mismatch for {session_data_path}")
+
+    return {
+        "regular_bytes": len(regular.encode()),
+        "compact_bytes": len(compact.encode()),
+        "regular_load": regular_time,
+        "compact_load": compact_time,
+    }
+
+
+def convert_session(session_data_path, compact=True):
+    with open(session_data_path, "r") as f:
+        data = json.load(f)
+
+    if is_compact(data) == compact:
+        return False
+
+    # NOTE: Verify before replacing the only copy of the session
+    if compact and expand_session(compact_session(data)) != data:
+        raise ValueError(f"compact roundtrip mismatch for {session_data_path}")
+
+    save_source(session_data_path, data, compact=compact)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert and benchmark the compact sessionData format"
+    )
+    parser.add_argument(
+        "--convert", action="store_true", help="Rewrite sessions in the compact format"
+    )
+    parser.add_argument(
+        "--expand", action="store_true", help="Rewrite sessions in the regular format"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Loads per session in the benchmark"
+    )
+    args = parser.parse_args()
+
+    session_data_paths = find_all_session_data_paths()
+
+    if args.convert or args.expand:
+        converted = 0
+        for session_data_path in session_data_paths:
+            try:
+                converted += convert_session(session_data_path, compact=not args.expand)
+            except Exception as e:
+                print(f"Failed to convert {session_data_path}: {e}")
+        print(f"Converted {converted}/{len(session_data_paths)} sessions")
+        return
+
+    totals = {"regular_bytes": 0, "compact_bytes": 0, "regular_load": 0, "compact_load": 0}
+    for session_data_path in session_data_paths:
+        try:
+            result = benchmark_session(session_data_path, args.repeat)
+        except Exception as e:
+            print(f"Failed to benchmark {session_data_path}: {e}")
+            continue
+
+        for key in totals:
+            totals[key] += result[key]
+
+        print(
+            f"{os.path.basename(os.path.dirname(session_data_path))}: "
+            f"{result['regular_bytes'] / 1024:.0f}KB -> {result['compact_bytes'] / 1024:.0f}KB, "
+            f"load {result['regular_load'] * 1000:.1f}ms -> {result['compact_load'] * 1000:.1f}ms"
+        )
+
+    if totals["regular_bytes"]:
+        print(
+            f"Total: {totals['regular_bytes'] / 1024 / 1024:.2f}MB -> "
+            f"{totals['compact_bytes'] / 1024 / 1024:.2f}MB "
+            f"({totals['compact_bytes'] / totals['regular_bytes']:.0%}), "
+            f"load {totals['regular_load'] * 1000:.1f}ms -> {totals['compact_load'] * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from crytic_compile import CryticCompile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+from downloader import DownloaderClass
+from utils.cache import get_compile_kwargs
+
+"""
+Compiles several targets at once in one process and checks that their outputs stay separate.
+
+python concurrent_compile.py --fixtures 4
+python concurrent_compile.py mainnet:0x... mainnet:0x... --api_key <key>
+
+fixtures: generate N local targets (Target<i>.sol importing ./Lib.sol, a different Lib<i> in every directory)
+and compile them concurrently with their directory as solc working directory, every compilation must only
+contain files and contracts of its own directory.
+targets: download and restructure network:address targets concurrently with DownloaderClass, every
+session directory must only hold its own root file and contract_info.
+
+Exits with 1 if any check failed or the working directory of the process changed.
+"""
+
+
+def write_fixture(root_dir, index):
+    fixture_dir = os.path.join(root_dir, f"fixture{index}")
+    os.makedirs(fixture_dir)
+
+    with open(os.path.join(fixture_dir, "Lib.sol"), "w") as f:
+        f.write(
+            "// SPDX-License-Identifier: MIT\n"
+            "pragma solidity ^0.8.0;\n"
+            f"library Lib{index} {{ function id() internal pure returns (uint256) {{ return {index}; }} }}\n"
+        )
+    with open(os.path.join(fixture_dir, f"Target{index}.sol"), "w") as f:
+        f.write(
+            "// SPDX-License-Identifier: MIT\n"
+            "pragma solidity ^0.8.0;\n"
+            'import "./Lib.sol";\n'
+            f"contract Target{index} {{ function id() external pure returns (uint256) {{ return Lib{index}.id(); }} }}\n"
+        )
+    return fixture_dir
+
+
+def compile_fixture(fixture_dir, index):
+    target = os.path.join(fixture_dir, f"Target{index}.sol")
+    try:
+        compilation = CryticCompile(target, **get_compile_kwargs({}, fixture_dir))
+    except Exception as e:
+        return [f"fixture{index}: compilation failed: {str(e).strip().splitlines()[0]}"]
+
+    errors = []
+    expected_names = {f"Target{index}", f"Lib{index}"}
+    for filename in compilation.filenames:
+        if not os.path.realpath(filename.absolute).startswith(os.path.realpath(fixture_dir)):
+            errors.append(f"fixture{index}: foreign file {filename.absolute}")
+
+    contract_names = set()
+    for compilation_unit in compilation.compilation_units.values():
+        for source_unit in compilation_unit.source_units.values():
+            contract_names.update(source_unit.contracts_names)
+    if contract_names != expected_names:
+        errors.append(f"fixture{index}: contracts {sorted(contract_names)}, expected {sorted(expected_names)}")
+
+    return errors
+
+
+def run_fixtures(count):
+    root_dir = tempfile.mkdtemp(prefix="concurrent_compile_")
+    try:
+        fixture_dirs = [write_fixture(root_dir, index) for index in range(count)]
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            results = executor.map(compile_fixture, fixture_dirs, range(count))
+            return [error for errors in results for error in errors]
+    finally:
+        shutil.rmtree(root_dir)
+
+
+def download_target(target, api_key):
+    source = DownloaderClass(target, api_key)
+    source.run_crytic()
+
+    errors = []
+    address = target.split(":")[1].lower()
+    if source.contract_info.get("contract_address", "").lower() != address:
+        errors.append(f"{target}: contract_info of {source.contract_info.get('contract_address')}")
+    if not source.crytic_root_file.startswith(str(source.output_dir)):
+        errors.append(f"{target}: root file {source.crytic_root_file} outside {source.output_dir}")
+    if not os.path.basename(str(source.output_dir)).lower().startswith(target.lower()):
+        errors.append(f"{target}: written to {source.output_dir}")
+    return errors
+
+
+def run_targets(targets, api_key):
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        futures = {target: executor.submit(download_target, target, api_key) for target in targets}
+
+    errors = []
+    for target, future in futures.items():
+        try:
+            errors.extend(future.result())
+        except Exception as e:
+            errors.append(f"{target}: {e}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check concurrent compilations in one process")
+    parser.add_argument("targets", nargs="*", help="network:address targets to download concurrently")
+    parser.add_argument("--fixtures", type=int, default=0, help="Generate and compile N local targets")
+    parser.add_argument("--api_key", default=None, help="API key for etherscan")
+    args = parser.parse_args()
+
+    if not args.targets and not args.fixtures:
+        parser.error("Pass targets or --fixtures N")
+
+    working_dir = os.getcwd()
+    start = time.perf_counter()
+
+    errors = []
+    if args.fixtures:
+        errors.extend(run_fixtures(args.fixtures))
+    if args.targets:
+        errors.extend(run_targets(args.targets, args.api_key))
+
+    if os.getcwd() != working_dir:
+        errors.append(f"working directory changed to {os.getcwd()}")
+
+    for error in errors:
+        print(error)
+    print(
+        f"{args.fixtures + len(args.targets)} targets in {time.perf_counter() - start:.1f}s, "
+        f"{'FAILED' if errors else 'outputs separate'}"
+    )
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
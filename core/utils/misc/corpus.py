@@ -0,0 +1,54 @@
+import os
+import sys
+import json
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+from utils.corpus import (
+    CORPUS_DB_PATH,
+    CORPUS_TABLES,
+    DEFAULT_CORPUS_LIMIT,
+    query_corpus,
+    update_corpus,
+)
+
+"""
+
+Loads every session in files/out into the corpus SQLite database and queries it with searchCriteria.
+
+python corpus.py --rebuild
+python corpus.py '{"visibility": "public", "priority": "1", "lowLvlCall": "true", "writing_to": ["owner"]}'
+python corpus.py '{"impact": "High"}' --table scan_results
+
+The database can be browsed with datasette:
+datasette files/out/.search/corpus.db
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query all sessions with searchCriteria")
+    parser.add_argument("criteria", nargs="?", help="searchCriteria as JSON")
+    parser.add_argument("--table", choices=CORPUS_TABLES, default="functions")
+    parser.add_argument("--offset", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=DEFAULT_CORPUS_LIMIT)
+    parser.add_argument("--no_update", action="store_true", help="Don't load new sessions first")
+    parser.add_argument("--rebuild", action="store_true", help="Reload every session")
+    args = parser.parse_args()
+
+    if args.rebuild or not args.no_update:
+        updated = update_corpus(rebuild=args.rebuild)
+        if updated:
+            print(f"Loaded {updated} sessions into {CORPUS_DB_PATH}")
+
+    if not args.criteria:
+        return
+
+    results, total = query_corpus(
+        json.loads(args.criteria), args.table, args.offset, args.limit
+    )
+    print(json.dumps(results, indent=4))
+    print(f"{len(results)} of {total} results")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+import app
+import runner
+from downloader import DownloaderClass
+from utils import ledger as ledger_module
+from utils.data import (
+    check_if_source_exists,
+    files_dir,
+    register_session,
+    save_source,
+    unregister_session,
+)
+from utils.ledger import BatchLedger, run_resumable
+
+"""
+Checks that targets failing after their download are retried successfully by runner.py --pipeline.
+
+python pipeline_retry.py --targets 3
+
+Offline: downloads are replaced by fixture sources restructured with DownloaderClass, the analysis of every
+target fails once with a transient error and succeeds on the retry. One target also finds a stale session
+directory of an interrupted run in its way. Every target must end "done" in the ledger with one
+sessionData.json, fixture directories are removed afterwards.
+
+Exits with 1 if any check failed.
+"""
+
+MARKERS_ENV = "PIPELINE_RETRY_MARKERS"
+
+
+def get_target(index):
+    return f"mainet:0x{index + 1:040x}"
+
+
+def get_contract_name(index):
+    return f"RetryCheck{index}"
+
+
+def download_fixture(target, api_key=None):
+    index = int(target.split(":")[1], 16) - 1
+    source = DownloaderClass(target)
+    contract_dir = (
+        source.output_dir
+        / "crytic-export"
+        / "etherscan-contracts"
+        / f"{target.split(':')[1]}-{get_contract_name(index)}"
+    )
+    os.makedirs(contract_dir)
+    with open(contract_dir / f"{get_contract_name(index)}.sol", "w") as f:
+        f.write(f"pragma solidity ^0.8.0;\ncontract {get_contract_name(index)} {{}}\n")
+    with open(contract_dir / "crytic_compile.config.json", "w") as f:
+        f.write("{}")
+    source.restructure_for_crytic_compile()
+    return source
+
+
+def analyze_fixture(target, source, scan_profile, run_semgrep, detector_workers):
+    # NOTE: Runs in the spawned analysis worker, the marker of a target exists after its first attempt
+    marker = os.path.join(os.environ[MARKERS_ENV], target.replace(":", "_"))
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        raise Exception("Connection reset during analysis")
+    return {"network_info": source.contract_info}, 0.0
+
+
+def write_fixture(source, data):
+    session_data_path = os.path.join(source.output_dir, "sessionData.json")
+    save_source(session_data_path, data)
+    register_session(source.output_dir, data)
+    return session_data_path
+
+
+def get_session_dirs(index):
+    prefix = get_target(index).lower()
+    return [
+        name
+        for name in os.listdir(files_dir)
+        if name.lower() == prefix or name.lower().startswith(prefix + ":")
+    ]
+
+
+def remove_fixtures(count):
+    for index in range(count):
+        for name in get_session_dirs(index):
+            unregister_session(name)
+            shutil.rmtree(os.path.join(files_dir, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check retries of failed pipeline targets")
+    parser.add_argument("--targets", type=int, default=3, help="Number of fixture targets")
+    args = parser.parse_args()
+
+    targets = [get_target(index) for index in range(args.targets)]
+    os.makedirs(files_dir, exist_ok=True)
+    remove_fixtures(args.targets)
+
+    # Stale directory of a run interrupted after the download of the first target
+    stale_dir = os.path.join(files_dir, f"{targets[0]}:{get_contract_name(0)}")
+    os.makedirs(stale_dir)
+    open(os.path.join(stale_dir, f"{get_contract_name(0)}.sol"), "w").close()
+
+    work_dir = tempfile.mkdtemp(prefix="pipeline_retry_")
+    os.environ[MARKERS_ENV] = work_dir
+    app.download_source = download_fixture
+    app.write_session_data = write_fixture
+    runner._analyze_target = analyze_fixture
+    ledger_module.RETRY_BACKOFF_SECONDS = 0
+
+    errors = []
+    try:
+        ledger = BatchLedger(os.path.join(work_dir, "ledger.db"))
+        run_resumable(
+            targets, ledger, lambda batch: runner.run_pipeline(batch, workers=2, ledger=ledger)
+        )
+
+        rows = {
+            target: (state, attempts)
+            for target, state, attempts in ledger._execute(
+                "SELECT target, state, attempts FROM targets"
+            )
+        }
+        for index, target in enumerate(targets):
+            if rows.get(target) != ("done", 2):
+                errors.append(f"{target}: ledger {rows.get(target)}, expected ('done', 2)")
+            if not check_if_source_exists(target):
+                errors.append(f"{target}: no sessionData.json")
+            if len(get_session_dirs(index)) != 1:
+                errors.append(f"{target}: session directories {get_session_dirs(index)}")
+    finally:
+        remove_fixtures(args.targets)
+        shutil.rmtree(work_dir)
+
+    for error in errors:
+        print(error)
+    print(f"{len(targets)} targets, {'FAILED' if errors else 'all retried successfully'}")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
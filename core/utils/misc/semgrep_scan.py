@@ -1,41 +1,37 @@
+import os
+import sys
 import argparse
 import subprocess
 import json
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+from utils.data import find_all_session_data_paths
+from utils.semgrep import (
+    DEFAULT_SEMGREP_CONFIG,
+    run_semgrep_batch_for_sessions,
+    run_semgrep_scan,
+    update_rule_bundle,
+)
+
 '''
 
 Run OSS semgrep rules for Solidity on the specified Solidity file through Python.
 
 semgrep --config p/smart-contracts <full-path-to-sol-file>
+
+Rules are read from the local bundle in files/semgrep, --update_rules downloads a new bundle version
+(run it once on a connected machine, then copy files/semgrep to air-gapped boxes)
+
+python semgrep_scan.py --batch
+scans root files of every session in files/out with one semgrep process and updates their scan_results
 '''
 
-def run_semgrep_scan(path_to_scan, config="p/smart-contracts"):
+
+def scan(path_to_scan, config=DEFAULT_SEMGREP_CONFIG):
     try:
-        # Run the Semgrep scan with the specified configuration and target path
-        command = ["semgrep", "--config", config, "--json", path_to_scan]
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-
-        # Parse the JSON output from Semgrep
-        if result.stdout:
-            scan_results = json.loads(result.stdout)
-            findings = scan_results.get("results", [])
-
-            simplified_results = [
-                {
-                    "description": finding["extra"]["message"],
-                    "check": finding["check_id"],
-                    "impact": finding["extra"]["severity"],
-                    "path": f"{finding['path']}#{finding['start']['line']}-{finding['end']['line']}",
-                    "confidence": "",
-                    "contract": "",
-                }
-                for finding in findings
-            ]
-
-            print(json.dumps(simplified_results, indent=4))
-
-            return simplified_results
-        return []
+        simplified_results = run_semgrep_scan(path_to_scan, config)
+        print(json.dumps(simplified_results, indent=4))
+        return simplified_results
 
     except subprocess.CalledProcessError as e:
         print(f"Semgrep scan failed with error: {e}")
@@ -47,12 +43,28 @@ def run_semgrep_scan(path_to_scan, config="p/smart-contracts"):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run a semgrep scan.")
-    parser.add_argument("path_to_scan", help="The path to scan.")
+    parser.add_argument("path_to_scan", nargs="?", help="The path to scan.")
     parser.add_argument(
         "--config",
-        default="p/smart-contracts",
+        default=DEFAULT_SEMGREP_CONFIG,
         help="The semgrep configuration to use.",
     )
+    parser.add_argument(
+        "--update_rules",
+        action="store_true",
+        help="Download a new version of the rule bundle for --config",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Scan every session in files/out with one semgrep process",
+    )
     args = parser.parse_args()
 
-    run_semgrep_scan(args.path_to_scan, args.config)
\ No newline at end of file
+    if args.update_rules:
+        update_rule_bundle(args.config)
+
+    if args.batch:
+        run_semgrep_batch_for_sessions(find_all_session_data_paths(), args.config)
+    elif args.path_to_scan:
+        scan(args.path_to_scan, args.config)
@@ -0,0 +1,153 @@
+from typing import Dict, Iterable, List, Set
+
+from utils.reachability import ReachabilityIndex
+
+"""
+Inverted indexes over functions_data of a session, used by filter_functions in app.py
+
+Every indexed attribute maps to the set of function ids (positions in functions_data) having it,
+a search is the intersection of the sets of each criterion. Only free-text criteria
+(functionName, using_structure, emitting) still scan, and only the remaining candidates.
+"""
+
+# searchCriteria key -> functions_data field, matched by bool(field) == (criterion == "true")
+FLAG_CRITERIA = {
+    "hasModifiers": "modifiers",
+    "hasInternalCalls": "internal_calls",
+    "hasExternalCalls": "external_calls",
+    "isInheritedFunction": "contract_inherited",
+    "containsAsm": "contains_asm",
+    "lowLvlCall": "low_level_calls",
+}
+
+# searchCriteria key -> index name, matched when any indexed value is in the criterion
+MEMBER_CRITERIA = {
+    "in_contract": "contracts",
+    "with_modifier": "modifiers",
+    "writing_to": "writers",
+    "reading_from": "readers",
+    "calling_external_contract": "external_contracts",
+}
+
+
+def _add(index: Dict[str, Set[int]], key, function_id: int):
+    if isinstance(key, (str, int, bool)):
+        index.setdefault(key, set()).add(function_id)
+
+
+class SessionIndex:
+    def __init__(self, functions_data: List[dict]):
+        self.functions = functions_data or []
+        self.all_ids = set(range(len(self.functions)))
+
+        self.by_full_name = {}
+        self.contracts = {}
+        self.readers = {}
+        self.writers = {}
+        self.modifiers = {}
+        self.external_contracts = {}
+        self.visibility = {}
+        self.priority = {}
+        self.flags = {criterion: {True: set(), False: set()} for criterion in FLAG_CRITERIA}
+        self._reachability = None
+
+        for function_id, function in enumerate(self.functions):
+            _add(self.by_full_name, function.get("function_full_name"), function_id)
+            _add(self.contracts, function.get("contract_name"), function_id)
+            _add(self.visibility, function.get("visibility"), function_id)
+            _add(self.priority, function.get("priority"), function_id)
+
+            for variable in function.get("state_vars_read") or []:
+                _add(self.readers, variable, function_id)
+            for variable in function.get("state_vars_written") or []:
+                _add(self.writers, variable, function_id)
+            for modifier in function.get("modifiers") or []:
+                _add(self.modifiers, modifier, function_id)
+            for contract in function.get("external_calls") or []:
+                _add(self.external_contracts, contract, function_id)
+
+            for criterion, field in FLAG_CRITERIA.items():
+                self.flags[criterion][bool(function.get(field))].add(function_id)
+
+    @property
+    def reachability(self) -> ReachabilityIndex:
+        """
+        Call graph closure of the session, built on the first reachability query.
+        """
+        if self._reachability is None:
+            self._reachability = ReachabilityIndex(self.functions, self.by_full_name)
+        return self._reachability
+
+    def lookup(self, index_name: str, wanted) -> Set[int]:
+        """
+        Returns ids of functions with any indexed value in wanted.
+        A list matches values equal to one of its items, a string matches values contained in it.
+        """
+        index = getattr(self, index_name)
+        if isinstance(wanted, str):
+            keys = [key for key in index if isinstance(key, str) and key in wanted]
+        else:
+            keys = wanted
+
+        ids = set()
+        for key in keys:
+            ids |= index.get(key, set())
+        return ids
+
+    def ids_for_full_names(self, full_names: Iterable[str]) -> Set[int]:
+        ids = set()
+        for full_name in full_names:
+            ids |= self.by_full_name.get(full_name, set())
+        return ids
+
+    def search(self, search_criteria: dict, restrict_to: Set[int] = None) -> List[dict]:
+        """
+        Returns functions matching all criteria in their functions_data order.
+        restrict_to is an extra id set (reachability, scan impact) computed by the caller.
+        """
+        candidates = set(self.all_ids) if restrict_to is None else set(restrict_to)
+
+        if search_criteria.get("visibility"):
+            candidates &= self.visibility.get(search_criteria["visibility"], set())
+
+        if search_criteria.get("priority"):
+            candidates &= self.priority.get(int(search_criteria["priority"]), set())
+
+        for criterion in FLAG_CRITERIA:
+            if criterion in search_criteria:
+                candidates &= self.flags[criterion][search_criteria[criterion] == "true"]
+
+        for criterion, index_name in MEMBER_CRITERIA.items():
+            if criterion in search_criteria:
+                candidates &= self.lookup(index_name, search_criteria[criterion])
+
+        # NOTE: Free-text criteria scan what is left after the indexed ones
+        function_name = search_criteria.get("functionName")
+        using_structure = search_criteria.get("using_structure")
+        emitting = search_criteria.get("emitting")
+
+        results = []
+        for function_id in sorted(candidates):
+            function = self.functions[function_id]
+
+            if function_name and function_name not in function.get(
+                "function_canonical_name"
+            ):
+                continue
+
+            # NOTE: function_body workaround, requires a PR to slihter to search in structs
+            if "using_structure" in search_criteria and not any(
+                structure in function.get("function_body", "")
+                for structure in using_structure
+            ):
+                continue
+
+            # NOTE: function_body workaround, requires a PR to slihter to search in events
+            if "emitting" in search_criteria and not any(
+                event in function.get("function_body", "") for event in emitting
+            ):
+                continue
+
+            results.append(function)
+
+        return results
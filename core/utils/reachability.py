@@ -0,0 +1,197 @@
+from typing import Dict, Iterable, List, Set
+
+"""
+Transitive reachability over the call graph of a session (functions_data)
+
+Function ids are positions in functions_data, sets of functions are int bitsets (bit i = function i).
+Edges go from a function to every function whose function_full_name is in its internal_calls or
+external_calls_functions. The full transitive closure is computed once per direction over the
+strongly connected components, depth-limited queries expand the frontier level by level.
+"""
+
+# searchCriteria value of reachable_depth for the full closure
+UNLIMITED_DEPTH = "all"
+
+
+def bits_to_ids(bits: int) -> Set[int]:
+    ids = set()
+    while bits:
+        lowest = bits & -bits
+        ids.add(lowest.bit_length() - 1)
+        bits ^= lowest
+    return ids
+
+
+def ids_to_bits(ids: Iterable[int]) -> int:
+    bits = 0
+    for function_id in ids:
+        bits |= 1 << function_id
+    return bits
+
+
+def parse_depth(depth):
+    """
+    Returns the depth of a reachable_depth criterion, None for the full closure. Direct calls by default.
+    """
+    if depth in (None, ""):
+        return 1
+    if depth == UNLIMITED_DEPTH:
+        return None
+    try:
+        depth = int(depth)
+    except (TypeError, ValueError):
+        raise ValueError(
+            f"Invalid reachable_depth {depth!r}, expected a number or {UNLIMITED_DEPTH!r}"
+        )
+    return None if depth <= 0 else depth
+
+
+class ReachabilityIndex:
+    def __init__(self, functions_data: List[dict], by_full_name: Dict[str, Set[int]]):
+        count = len(functions_data)
+        self.by_full_name = by_full_name
+        self.successors = [0] * count
+        self.predecessors = [0] * count
+        # NOTE: Callees outside functions_data (libraries, interfaces) only exist as names
+        self.callers_by_name = {}
+
+        for function_id, function in enumerate(functions_data):
+            callees = set(function.get("internal_calls") or []) | set(
+                function.get("external_calls_functions") or []
+            )
+            for callee in callees:
+                if not isinstance(callee, str):
+                    continue
+                self.callers_by_name[callee] = self.callers_by_name.get(callee, 0) | (
+                    1 << function_id
+                )
+                for callee_id in by_full_name.get(callee, ()):
+                    self.successors[function_id] |= 1 << callee_id
+                    self.predecessors[callee_id] |= 1 << function_id
+
+        self._closures = {}
+
+    def _closure(self, edges: List[int]) -> List[int]:
+        """
+        Returns for every function the bitset of functions reachable through one or more edges.
+        Tarjan's SCC algorithm (iterative) emits components in reverse topological order,
+        so every successor component is complete when a component is computed.
+        """
+        count = len(edges)
+        index_of = [-1] * count
+        lowlink = [0] * count
+        on_stack = [False] * count
+        stack = []
+        closure = [0] * count
+        counter = 0
+
+        for root in range(count):
+            if index_of[root] != -1:
+                continue
+
+            work = [(root, bits_to_ids(edges[root]))]
+            index_of[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+
+            while work:
+                node, pending = work[-1]
+                if pending:
+                    successor = pending.pop()
+                    if index_of[successor] == -1:
+                        index_of[successor] = lowlink[successor] = counter
+                        counter += 1
+                        stack.append(successor)
+                        on_stack[successor] = True
+                        work.append((successor, bits_to_ids(edges[successor])))
+                    elif on_stack[successor]:
+                        lowlink[node] = min(lowlink[node], index_of[successor])
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                if lowlink[node] != index_of[node]:
+                    continue
+
+                members = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    members.append(member)
+                    if member == node:
+                        break
+
+                member_bits = ids_to_bits(members)
+                reached = 0
+                for member in members:
+                    for successor in bits_to_ids(edges[member] & ~member_bits):
+                        reached |= (1 << successor) | closure[successor]
+
+                # NOTE: Members of a cycle (or a self-call) reach each other and themselves
+                if len(members) > 1 or edges[node] & (1 << node):
+                    reached |= member_bits
+
+                for member in members:
+                    closure[member] = reached
+
+        return closure
+
+    def _get_closure(self, direction: str) -> List[int]:
+        if direction not in self._closures:
+            edges = self.successors if direction == "forward" else self.predecessors
+            self._closures[direction] = self._closure(edges)
+        return self._closures[direction]
+
+    def _expand(self, start_bits: int, direction: str, depth) -> int:
+        """
+        Returns functions reached from start_bits through 1..depth edges (any number for None).
+        """
+        if depth is None:
+            closure = self._get_closure(direction)
+            return self._union(start_bits, closure)
+
+        edges = self.successors if direction == "forward" else self.predecessors
+        reached = 0
+        frontier = start_bits
+        for _ in range(depth):
+            frontier = self._union(frontier, edges) & ~reached
+            if not frontier:
+                break
+            reached |= frontier
+        return reached
+
+    @staticmethod
+    def _union(bits: int, sets: List[int]) -> int:
+        result = 0
+        for function_id in bits_to_ids(bits):
+            result |= sets[function_id]
+        return result
+
+    def reachable_from(self, full_names: Iterable[str], depth=1) -> Set[int]:
+        """
+        Returns ids of functions called from any function named in full_names within depth calls (None for any depth).
+        """
+        start_bits = 0
+        for full_name in full_names:
+            start_bits |= ids_to_bits(self.by_full_name.get(full_name, ()))
+        return bits_to_ids(self._expand(start_bits, "forward", depth))
+
+    def reaching(self, full_names: Iterable[str], depth=1) -> Set[int]:
+        """
+        Returns ids of functions calling any of full_names within depth calls (None for any depth).
+        """
+        direct_callers = 0
+        for full_name in full_names:
+            direct_callers |= self.callers_by_name.get(full_name, 0)
+
+        if depth == 1:
+            return bits_to_ids(direct_callers)
+
+        remaining = None if depth is None else depth - 1
+        return bits_to_ids(
+            direct_callers | self._expand(direct_callers, "backward", remaining)
+        )
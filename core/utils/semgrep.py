@@ -0,0 +1,243 @@
+import os
+import json
+import hashlib
+import datetime
+import tempfile
+import subprocess
+import requests
+from typing import Dict, List
+
+from utils.cache import get_compilation_key, load_slither_config
+from utils.corpus import index_saved_session
+from utils.data import get_session_root_file, load_source, register_session, save_source
+from utils.stages import get_semgrep_fingerprint
+
+"""
+Semgrep runner with a local, versioned rule bundle
+
+Registry configs (p/smart-contracts) are downloaded once into files/semgrep/<config>/<version>.yml,
+version is the sha256 prefix of the rules. manifest.json points to the current bundle, scans use it
+without any network round trip. Without a bundle (and no network) semgrep falls back to the registry config.
+"""
+
+utils_dir = os.path.dirname(os.path.realpath(__file__))
+core_dir = os.path.dirname(utils_dir)
+SEMGREP_RULES_DIR = os.path.join(core_dir, "files", "semgrep")
+SEMGREP_REGISTRY_URL = "https://semgrep.dev/c/"
+DEFAULT_SEMGREP_CONFIG = "p/smart-contracts"
+
+# Files per semgrep process in batch mode, keeps the command line under ARG_MAX
+SEMGREP_BATCH_SIZE = 1000
+
+
+def get_bundle_dir(config: str) -> str:
+    return os.path.join(SEMGREP_RULES_DIR, config.replace("/", "_"))
+
+
+def update_rule_bundle(config: str = DEFAULT_SEMGREP_CONFIG):
+    """
+    Downloads registry rules for config into a new bundle version and makes it current.
+    Returns (rules_path, version).
+    """
+    response = requests.get(SEMGREP_REGISTRY_URL + config, timeout=60)
+    response.raise_for_status()
+
+    version = hashlib.sha256(response.content).hexdigest()[:12]
+    bundle_dir = get_bundle_dir(config)
+    os.makedirs(bundle_dir, exist_ok=True)
+
+    rules_path = os.path.join(bundle_dir, f"{version}.yml")
+    with open(rules_path, "wb") as f:
+        f.write(response.content)
+
+    manifest = {
+        "config": config,
+        "version": version,
+        "path": rules_path,
+        "fetched": datetime.datetime.now().isoformat(),
+    }
+    with open(os.path.join(bundle_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=4)
+
+    print(f"Semgrep rule bundle {config} updated to version {version}")
+    return rules_path, version
+
+
+def get_rule_bundle(config: str = DEFAULT_SEMGREP_CONFIG):
+    """
+    Returns (rules, version) to pass to semgrep --config.
+    Local paths are used as is, registry configs resolve to the current bundle, downloading it on first use.
+    """
+    if os.path.exists(config):
+        return config, "local"
+
+    manifest_path = os.path.join(get_bundle_dir(config), "manifest.json")
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        if os.path.isfile(manifest["path"]):
+            return manifest["path"], manifest["version"]
+
+    try:
+        return update_rule_bundle(config)
+    except Exception as e:
+        print(f"Semgrep rule bundle for {config} not available, using registry: {e}")
+        return config, "registry"
+
+
+def simplify_findings(findings):
+    return [
+        {
+            "description": finding["extra"]["message"],
+            "check": finding["check_id"],
+            "impact": finding["extra"]["severity"],
+            "path": f"{finding['path']}#{finding['start']['line']}-{finding['end']['line']}",
+            "confidence": "",
+            "contract": "",
+            "tool": "semgrep",
+        }
+        for finding in findings
+    ]
+
+
+def is_semgrep_result(entry: dict) -> bool:
+    # NOTE: Sessions created before "tool" was added only differ by the empty confidence
+    return entry.get("tool") == "semgrep" or (
+        entry.get("confidence") == "" and entry.get("contract") == ""
+    )
+
+
+class SemgrepScan:
+    """
+    Semgrep process running in the background, started with start() and joined with results().
+    Output goes to a temporary file so semgrep never blocks on a full pipe.
+    """
+
+    def __init__(self, paths, config: str = DEFAULT_SEMGREP_CONFIG):
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.config = config
+        self.rules_version = None
+        self.process = None
+        self.output = None
+        self.errors = None
+
+    def start(self):
+        rules, self.rules_version = get_rule_bundle(self.config)
+        # NOTE: No metrics and no version check, scans with a local bundle never touch the network
+        command = [
+            "semgrep",
+            "--config",
+            rules,
+            "--json",
+            "--metrics=off",
+            "--disable-version-check",
+            *self.paths,
+        ]
+
+        self.output = tempfile.TemporaryFile(mode="w+")
+        self.errors = tempfile.TemporaryFile(mode="w+")
+        self.process = subprocess.Popen(
+            command, stdout=self.output, stderr=self.errors, text=True
+        )
+        return self
+
+    def results(self) -> list:
+        """
+        Waits for semgrep to finish, returns raw findings.
+        """
+        try:
+            self.process.wait()
+            self.output.seek(0)
+            stdout = self.output.read()
+            self.errors.seek(0)
+            stderr = self.errors.read()
+        finally:
+            self.output.close()
+            self.errors.close()
+
+        # NOTE: semgrep exits with 1 when findings are blocking, output is still valid
+        if self.process.returncode not in (0, 1) or not stdout:
+            raise subprocess.CalledProcessError(
+                self.process.returncode, self.process.args, stdout, stderr
+            )
+
+        return json.loads(stdout).get("results", [])
+
+
+def run_semgrep_scan(paths, config: str = DEFAULT_SEMGREP_CONFIG):
+    """
+    Blocking scan, returns simplified findings.
+    """
+    return simplify_findings(SemgrepScan(paths, config).start().results())
+
+
+def run_semgrep_batch(
+    targets: Dict[str, str], config: str = DEFAULT_SEMGREP_CONFIG
+) -> Dict[str, List[dict]]:
+    """
+    Scans root files of many targets with one semgrep process (per SEMGREP_BATCH_SIZE files),
+    findings are split back by file. targets: target -> root file path, returns target -> simplified findings.
+    """
+    targets_by_file = {}
+    for target, root_file in targets.items():
+        targets_by_file.setdefault(os.path.realpath(root_file), []).append(target)
+
+    results = {target: [] for target in targets}
+    files = list(targets_by_file)
+
+    for i in range(0, len(files), SEMGREP_BATCH_SIZE):
+        batch = files[i : i + SEMGREP_BATCH_SIZE]
+        print(f"Semgrep batch scan of {len(batch)} files")
+
+        findings = SemgrepScan(batch, config).start().results()
+        for finding in findings:
+            for target in targets_by_file.get(os.path.realpath(finding["path"]), []):
+                results[target].extend(simplify_findings([finding]))
+
+    return results
+
+
+def run_semgrep_batch_for_sessions(
+    session_data_paths: List[str], config: str = DEFAULT_SEMGREP_CONFIG
+):
+    """
+    Batch scans root files of existing sessions and replaces semgrep findings in their scan_results.
+    The semgrep stage fingerprint is updated too, refresh_session_data() won't scan them again.
+    Session summaries, the code search index and the corpus are updated like after any session write.
+    """
+    _, rules_version = get_rule_bundle(config)
+
+    targets = {}
+    for session_data_path in session_data_paths:
+        root_file = get_session_root_file(load_source(session_data_path))
+        if root_file and os.path.isfile(root_file):
+            targets[session_data_path] = root_file
+        else:
+            print(f"run_semgrep_batch_for_sessions: root file not found for {session_data_path}")
+
+    results = run_semgrep_batch(targets, config)
+
+    for session_data_path, findings in results.items():
+        session_data = load_source(session_data_path)
+        session_data["scan_results"] = [
+            entry
+            for entry in session_data.get("scan_results", [])
+            if not is_semgrep_result(entry)
+        ] + findings
+
+        try:
+            output_dir = session_data["network_info"]["data_directory"]
+            source_key = get_compilation_key(
+                targets[session_data_path], load_slither_config(output_dir), output_dir
+            )
+            session_data.setdefault("stage_fingerprints", {})["semgrep"] = get_semgrep_fingerprint(
+                source_key, rules_version
+            )
+        except Exception as e:
+            print(f"run_semgrep_batch_for_sessions: semgrep fingerprint of {session_data_path} not updated: {e}")
+
+        save_source(session_data_path, session_data)
+        register_session(os.path.dirname(session_data_path), session_data)
+        index_saved_session(session_data_path, session_data)
+
+    return results
@@ -0,0 +1,129 @@
+import os
+import threading
+from collections import OrderedDict
+
+from utils.data import load_source
+from utils.query_index import SessionIndex
+
+"""
+Process-wide LRU cache of parsed sessions
+
+Read-only consumers of sessionData.json (filter endpoints, get_session_data, ContractMap, protocol graph)
+take sessions from here instead of parsing the file again. An entry is reloaded when the mtime or size of
+the file changes, least recently used entries are evicted once the estimated size of all entries exceeds
+SESSION_CACHE_MAX_BYTES. Query indexes built from a session are cached next to it and dropped with it.
+
+Cached sessions are shared, callers that modify a session must use load_source() instead.
+"""
+
+SESSION_CACHE_MAX_BYTES = int(
+    os.environ.get("SESSION_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+)
+
+# NOTE: Parsed and expanded sessions take roughly this many times the (compact) file size in memory
+SESSION_CACHE_SIZE_FACTOR = 10
+
+
+def _get_file_version(session_data_path: str):
+    stat = os.stat(session_data_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SessionCache:
+    def __init__(self, max_bytes: int = SESSION_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remove(self, session_data_path: str):
+        entry = self.entries.pop(session_data_path, None)
+        if entry:
+            self.current_bytes -= entry["cost"]
+
+    def get_entry(self, session_data_path: str) -> dict:
+        session_data_path = os.path.realpath(session_data_path)
+        version = _get_file_version(session_data_path)
+
+        with self.lock:
+            entry = self.entries.get(session_data_path)
+            if entry and entry["version"] == version:
+                self.entries.move_to_end(session_data_path)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # NOTE: Parsed outside the lock, two concurrent misses only parse the same file twice
+        entry = {
+            "version": version,
+            "data": load_source(session_data_path),
+            "index": None,
+            "cost": version[1] * SESSION_CACHE_SIZE_FACTOR,
+        }
+
+        with self.lock:
+            self._remove(session_data_path)
+
+            # NOTE: Sessions bigger than the whole budget are returned without caching them
+            if entry["cost"] > self.max_bytes:
+                return entry
+
+            self.entries[session_data_path] = entry
+            self.current_bytes += entry["cost"]
+
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+        return entry
+
+    def invalidate(self, session_data_path: str = None):
+        """
+        Drops one session, or every session without session_data_path.
+        """
+        with self.lock:
+            if session_data_path is None:
+                self.entries.clear()
+                self.current_bytes = 0
+            else:
+                self._remove(os.path.realpath(session_data_path))
+
+    def stats(self) -> dict:
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "estimated_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / requests if requests else 0.0,
+            }
+
+
+session_cache = SessionCache()
+
+
+def get_cached_session(session_data_path: str) -> dict:
+    """
+    Returns the expanded session data, loads it from disk only when the file changed since it was cached.
+    """
+    return session_cache.get_entry(session_data_path)["data"]
+
+
+def get_cached_session_index(session_data_path: str) -> SessionIndex:
+    """
+    Returns the SessionIndex of the cached session, built on first use after each reload.
+    """
+    entry = session_cache.get_entry(session_data_path)
+    if entry.get("index") is None:
+        entry["index"] = SessionIndex(entry["data"].get("functions_data"))
+    return entry["index"]
+
+
+def get_session_cache_stats() -> dict:
+    return session_cache.stats()
@@ -0,0 +1,274 @@
+import os
+import json
+import threading
+from typing import Callable, Dict, List, Optional
+
+"""
+Persistent index of session directories in files/out
+
+Maps normalized (lowercase) network:address targets to their session directory, a directory is
+named <network>:<address>:<ContractName> and is indexed once it contains sessionData.json.
+The index is kept in files/out/.search/session_index.json. Sessions are registered when
+generate_session_data writes them and unregistered when they are deleted, any other change to
+files/out (manual copies or deletes) is picked up from the mtime of files/out by a one-level
+rescan of new and removed directories. rebuild() recreates the index from scratch.
+
+Every entry also keeps a small summary of its session for /list_sessions, written from the session
+data at registration and recomputed with the summarize callable when sessionData.json changed since.
+"""
+
+SESSION_DATA_FILE = "sessionData.json"
+SESSION_INDEX_VERSION = 2
+
+
+def normalize_target(target: str) -> Optional[str]:
+    """
+    Returns the lowercase network:address of a target or session directory name,
+    the lowercase address for bare addresses, otherwise None.
+    """
+    parts = target.strip().lower().split(":")
+    if len(parts) == 1 and parts[0].startswith("0x"):
+        return parts[0]
+    if len(parts) >= 2 and parts[1].startswith("0x"):
+        return f"{parts[0]}:{parts[1]}"
+    return None
+
+
+class SessionDirectoryIndex:
+    def __init__(
+        self, files_dir: str, index_path: str = None, summarize: Callable[[str], dict] = None
+    ):
+        self.files_dir = files_dir
+        self.summarize = summarize
+        self.index_path = index_path or os.path.join(
+            files_dir, ".search", "session_index.json"
+        )
+        self.lock = threading.RLock()
+        # directory name -> normalized network:address
+        self.sessions = {}
+        # directory name -> summary (None until computed)
+        self.summaries = {}
+        self.by_target = {}
+        self.by_address = {}
+        self.files_dir_mtime_ns = None
+        self.index_mtime_ns = None
+        self.loaded = False
+
+    def _get_mtime_ns(self, path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _has_session_data(self, dir_name: str) -> bool:
+        return os.path.isfile(os.path.join(self.files_dir, dir_name, SESSION_DATA_FILE))
+
+    def _add(self, dir_name: str, summary: dict = None):
+        target = normalize_target(dir_name)
+        if not target or ":" not in target:
+            return
+        self.sessions[dir_name] = target
+        self.summaries[dir_name] = summary
+        self.by_target.setdefault(target, set()).add(dir_name)
+        self.by_address.setdefault(target.split(":")[1], set()).add(dir_name)
+
+    def _discard(self, dir_name: str):
+        target = self.sessions.pop(dir_name, None)
+        self.summaries.pop(dir_name, None)
+        if not target:
+            return
+        address = target.split(":")[1]
+        for mapping, key in ((self.by_target, target), (self.by_address, address)):
+            dir_names = mapping.get(key, set())
+            dir_names.discard(dir_name)
+            if not dir_names:
+                mapping.pop(key, None)
+
+    def _load(self) -> bool:
+        try:
+            with open(self.index_path, "r") as f:
+                stored = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+        if stored.get("version") != SESSION_INDEX_VERSION:
+            return False
+
+        self.sessions, self.summaries, self.by_target, self.by_address = {}, {}, {}, {}
+        for dir_name, summary in stored.get("sessions", {}).items():
+            self._add(dir_name, summary)
+        self.files_dir_mtime_ns = stored.get("files_dir_mtime_ns")
+        self.index_mtime_ns = self._get_mtime_ns(self.index_path)
+        return True
+
+    def _save(self):
+        # NOTE: Nothing to persist before the first session creates files/out
+        if not os.path.isdir(self.files_dir):
+            return
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        payload = {
+            "version": SESSION_INDEX_VERSION,
+            "files_dir_mtime_ns": self.files_dir_mtime_ns,
+            "sessions": dict(sorted(self.summaries.items())),
+        }
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, self.index_path)
+        self.index_mtime_ns = self._get_mtime_ns(self.index_path)
+
+    def _list_session_dirs(self) -> List[str]:
+        if not os.path.isdir(self.files_dir):
+            return []
+        # NOTE: Skip files and internal directories like .compilations
+        return [
+            entry.name
+            for entry in os.scandir(self.files_dir)
+            if entry.is_dir() and not entry.name.startswith(".")
+        ]
+
+    def _sync(self):
+        """
+        Reloads the index written by another process and rescans files/out when it changed.
+        """
+        index_mtime_ns = self._get_mtime_ns(self.index_path)
+        if not self.loaded or index_mtime_ns != self.index_mtime_ns:
+            self.loaded = True
+            if not self._load():
+                self._rebuild()
+                return
+
+        files_dir_mtime_ns = self._get_mtime_ns(self.files_dir)
+        if files_dir_mtime_ns == self.files_dir_mtime_ns:
+            return
+
+        dir_names = set(self._list_session_dirs())
+        for dir_name in set(self.sessions) - dir_names:
+            self._discard(dir_name)
+        for dir_name in dir_names - set(self.sessions):
+            if self._has_session_data(dir_name):
+                self._add(dir_name)
+        self.files_dir_mtime_ns = files_dir_mtime_ns
+        self._save()
+
+    def _rebuild(self) -> int:
+        # NOTE: Summaries are kept, _get_summary() drops the ones whose session changed
+        summaries = self.summaries
+        self.sessions, self.summaries, self.by_target, self.by_address = {}, {}, {}, {}
+        self.files_dir_mtime_ns = self._get_mtime_ns(self.files_dir)
+        for dir_name in self._list_session_dirs():
+            if self._has_session_data(dir_name):
+                self._add(dir_name, summaries.get(dir_name))
+            else:
+                print(f"SessionDirectoryIndex: {SESSION_DATA_FILE} not found in: {dir_name}")
+        self._save()
+        return len(self.sessions)
+
+    def rebuild(self) -> int:
+        """
+        Recreates the index from the directories of files/out, returns the count of sessions.
+        """
+        with self.lock:
+            return self._rebuild()
+
+    def register(self, session_dir: str, summary: dict = None):
+        """
+        Adds (or updates) a session directory (path or name in files/out) after its sessionData.json was written.
+        """
+        dir_name = os.path.basename(os.path.normpath(str(session_dir)))
+        with self.lock:
+            self._sync()
+            if self._has_session_data(dir_name):
+                self._discard(dir_name)
+                self._add(dir_name, summary)
+                self._save()
+
+    def unregister(self, session_dir: str):
+        """
+        Drops a session directory (path or name in files/out) that was or is about to be deleted.
+        """
+        dir_name = os.path.basename(os.path.normpath(str(session_dir)))
+        with self.lock:
+            self._sync()
+            if dir_name in self.sessions:
+                self._discard(dir_name)
+                self._save()
+
+    def find(self, target: str) -> Optional[str]:
+        """
+        Returns sessionData.json of a network:address (or bare address) target, None if no session exists.
+        Other strings are matched as a substring of the directory name.
+        """
+        with self.lock:
+            self._sync()
+            key = normalize_target(target)
+            if key is None:
+                dir_names = [name for name in self.sessions if target in name]
+            elif ":" in key:
+                dir_names = self.by_target.get(key, ())
+            else:
+                dir_names = self.by_address.get(key, ())
+
+            for dir_name in sorted(dir_names):
+                if self._has_session_data(dir_name):
+                    return os.path.join(self.files_dir, dir_name, SESSION_DATA_FILE)
+                # NOTE: Deleted behind our back without changing the mtime of files/out (session file only)
+                print(f"SessionDirectoryIndex: {SESSION_DATA_FILE} not found in: {dir_name}")
+                self._discard(dir_name)
+                self._save()
+        return None
+
+    def get_session_dirs(self) -> Dict[str, str]:
+        """
+        Returns {directory name: network:address} of all indexed sessions.
+        """
+        with self.lock:
+            self._sync()
+            return dict(sorted(self.sessions.items()))
+
+    def get_session_data_paths(self) -> List[str]:
+        return [
+            os.path.join(self.files_dir, dir_name, SESSION_DATA_FILE)
+            for dir_name in self.get_session_dirs()
+        ]
+
+    def _get_summary(self, dir_name: str) -> Optional[dict]:
+        session_data_path = os.path.join(self.files_dir, dir_name, SESSION_DATA_FILE)
+        try:
+            stat = os.stat(session_data_path)
+        except FileNotFoundError:
+            return None
+
+        summary = self.summaries.get(dir_name)
+        if summary and (summary.get("mtime_ns"), summary.get("size")) == (
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            return summary
+        if self.summarize is None:
+            return None
+
+        try:
+            summary = self.summarize(session_data_path)
+        except Exception as e:
+            print(f"SessionDirectoryIndex: failed to summarize {dir_name}: {e}")
+            return None
+        self.summaries[dir_name] = summary
+        return summary
+
+    def get_session_summaries(self) -> List[dict]:
+        """
+        Returns the summaries of all indexed sessions, computing missing or outdated ones first.
+        """
+        with self.lock:
+            self._sync()
+            changed = False
+            summaries = []
+            for dir_name in sorted(self.sessions):
+                cached = self.summaries.get(dir_name)
+                summary = self._get_summary(dir_name)
+                changed = changed or summary is not cached
+                if summary:
+                    summaries.append(summary)
+            if changed:
+                self._save()
+            return summaries
@@ -0,0 +1,63 @@
+import threading
+from typing import Callable
+
+"""
+Single-flight execution of concurrent calls for the same key
+
+The first caller for a key runs the function, callers arriving while it runs wait for it and get the same
+result (or exception) instead of running it again. Used around session builds, a crawl requesting a popular
+dependency many times at once downloads and compiles it once. Works within one process only.
+"""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def run(self, key: str, function: Callable, *args, **kwargs):
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is None:
+                flight = self.flights[key] = _Flight()
+                self.calls += 1
+                leader = True
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if leader:
+            try:
+                flight.result = function(*args, **kwargs)
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self.lock:
+                    del self.flights[key]
+                flight.done.set()
+        else:
+            print(f"SingleFlight: waiting for the running call for {key}")
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": {key: flight.waiters for key, flight in self.flights.items()},
+            }
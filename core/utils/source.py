@@ -0,0 +1,64 @@
+import os
+import mmap
+from typing import Dict, Tuple
+
+"""
+Memoized source slices shared by AnalyticsClass and PropertyMatchClass
+
+Every source file is memory-mapped once per analysis run and every slice is cached by
+(filename, start, length) of its source mapping, so the same function body is built only once.
+Offsets from solc are byte offsets, slices are taken on bytes and decoded afterwards.
+"""
+
+
+class SourceProvider:
+    def __init__(self):
+        self.files: Dict[str, mmap.mmap] = {}
+        self.slices: Dict[Tuple[str, int, int], str] = {}
+
+    def get_file(self, filename: str):
+        if filename not in self.files:
+            try:
+                with open(filename, "rb") as source_file:
+                    # NOTE: mmap can't map empty files
+                    if os.fstat(source_file.fileno()).st_size == 0:
+                        self.files[filename] = b""
+                    else:
+                        self.files[filename] = mmap.mmap(
+                            source_file.fileno(), 0, access=mmap.ACCESS_READ
+                        )
+            except OSError:
+                self.files[filename] = None
+        return self.files[filename]
+
+    def content(self, obj) -> str:
+        """
+        Returns the source text of any slither object with a source_mapping (Function, Variable, Expression...).
+        """
+        source_mapping = obj.source_mapping
+        filename = source_mapping.filename.absolute
+        key = (filename, source_mapping.start, source_mapping.length)
+
+        if key not in self.slices:
+            source_file = self.get_file(filename)
+            if source_file is None:
+                # Source not on disk, fall back to slither's in-memory copy
+                self.slices[key] = source_mapping.content
+            else:
+                self.slices[key] = source_file[
+                    source_mapping.start : source_mapping.end
+                ].decode("utf8", errors="replace")
+
+        return self.slices[key]
+
+    def get_source_code(self, obj) -> str:
+        """
+        Same output as slither.printers.summary.constructor_calls._get_source_code
+        """
+        return " " * obj.source_mapping.starting_column + self.content(obj)
+
+    def close(self):
+        for source_file in self.files.values():
+            if isinstance(source_file, mmap.mmap):
+                source_file.close()
+        self.files = {}
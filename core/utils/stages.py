@@ -0,0 +1,81 @@
+import hashlib
+import json
+from importlib.metadata import version, PackageNotFoundError
+
+from utils.detectors import select_detectors
+
+"""
+Fingerprints of session pipeline stages, stored in sessionData.json under stage_fingerprints
+
+Each stage fingerprint hashes the inputs of that stage only, refresh_session_data() reruns a stage
+when its stored fingerprint differs from the current one:
+
+analysis: sources/solc/config (compilation key) + ANALYSIS_VERSION
+detectors: sources + slither/slitherin versions + detectors of the scan profile
+semgrep: sources + semgrep rule bundle version
+contract_map: sources + RPC block bucket (CONTRACT_MAP_BLOCK_INTERVAL blocks) of the last address resolution,
+              rerun with the analysis or on request, the RPC isn't asked for sessions that are up to date
+"""
+
+STAGES = ["analysis", "detectors", "semgrep", "contract_map"]
+
+# NOTE: Bump when AnalyticsClass output fields change so existing sessions get re-analyzed
+ANALYSIS_VERSION = "1"
+
+# ~1 day of mainnet blocks
+CONTRACT_MAP_BLOCK_INTERVAL = 7200
+
+
+def fingerprint(*parts) -> str:
+    return hashlib.sha256(
+        json.dumps(parts, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+
+
+def get_package_version(name: str) -> str:
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return ""
+
+
+def get_detectors_version(scan_profile) -> str:
+    detectors = sorted(detector.ARGUMENT for detector in select_detectors(scan_profile))
+    return fingerprint(
+        get_package_version("slither-analyzer"),
+        get_package_version("slitherin"),
+        detectors,
+    )
+
+
+def get_block_bucket(block_number):
+    if block_number is None:
+        return None
+    return block_number // CONTRACT_MAP_BLOCK_INTERVAL
+
+
+def get_semgrep_fingerprint(source_key: str, rules_version: str) -> str:
+    return fingerprint(source_key, rules_version)
+
+
+def get_stage_fingerprints(
+    source_key: str, scan_profile, rules_version: str, block_number
+) -> dict:
+    return {
+        "analysis": fingerprint(source_key, ANALYSIS_VERSION),
+        "detectors": fingerprint(source_key, get_detectors_version(scan_profile)),
+        "semgrep": get_semgrep_fingerprint(source_key, rules_version),
+        "contract_map": fingerprint(source_key, get_block_bucket(block_number)),
+    }
+
+
+def get_stale_stages(stored: dict, current: dict) -> list:
+    """
+    Returns stages whose inputs changed, analysis invalidates contract_map since it rewrites contract_data.
+    """
+    stale = [stage for stage in STAGES if stored.get(stage) != current.get(stage)]
+
+    if "analysis" in stale and "contract_map" not in stale:
+        stale.append("contract_map")
+
+    return stale